@@ -0,0 +1,347 @@
+"""
+ Copyright (c) 2015 Michael Bright and Bamboo HR LLC
+
+ Licensed under the Apache License, Version 2.0 (the "License");
+ you may not use this file except in compliance with the License.
+ You may obtain a copy of the License at
+
+ http://www.apache.org/licenses/LICENSE-2.0
+
+ Unless required by applicable law or agreed to in writing, software
+ distributed under the License is distributed on an "AS IS" BASIS,
+ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ See the License for the specific language governing permissions and
+ limitations under the License.
+
+ End to end dispatch simulation.
+
+ Boots the master against a throw away SQLite database, seeds pipelines, registers in-process fake
+ clients and lets the master's own queue thread (run_queue -> Queue -> StandardQueueHandler ->
+ MasterCommunicator -> ActionDal) dispatch to them. The fake clients answer /work/request,
+ /work/execute and /status like the real client does, with a configurable latency and capacity, and
+ report each piece of work done to the master's /api/action_instances/<id>/done after --work-time.
+
+ Every fake client binds its own loopback address (127.0.0.2, 127.0.0.3, ...) since the master keys its
+ clients by ip address.
+
+     python -m benchmarks.dispatch_simulation --pipelines 20 --actions 3 --slices 2 --clients 8
+"""
+# pylint: disable=broad-except,too-many-instance-attributes
+import argparse
+import json
+import logging
+import shutil
+import tempfile
+import threading
+import time
+
+import requests
+from flask import Flask, Response, request
+from werkzeug.serving import make_server
+
+logger = logging.getLogger("rapid")
+
+CONFIG_TEMPLATE = """[master]
+db_connect_string = sqlite:///{database}
+queue_manager = false
+queue_event_driven = {event_driven}
+dispatch_batch_size = {batch_size}
+dispatch_claim_size = {claim_size}
+completion_journal = {completion_journal}
+api_key = {api_key}
+register_api_key = {register_api_key}
+
+[general]
+verify_certs = false
+"""
+
+
+class Stats(object):
+    """
+    What the fake clients saw, shared between all of them.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.dispatched = 0
+        self.completed = 0
+        self.rejected = 0
+        self.duplicates = 0
+        self.first_dispatch = None
+        self.last_dispatch = None
+        self.seen = set()
+
+    def record_dispatch(self, action_instance_id):
+        now = time.time()
+        with self.lock:
+            if action_instance_id in self.seen:
+                self.duplicates += 1
+            self.seen.add(action_instance_id)
+            self.dispatched += 1
+            self.first_dispatch = self.first_dispatch or now
+            self.last_dispatch = now
+
+    def record_rejected(self):
+        with self.lock:
+            self.rejected += 1
+
+    def record_completed(self):
+        with self.lock:
+            self.completed += 1
+
+
+class FakeClient(object):
+    def __init__(self, ip_address, capacity, latency, work_time, master_uri, api_key, stats):
+        self.ip_address = ip_address
+        self.capacity = capacity
+        self.latency = latency
+        self.work_time = work_time
+        self.master_uri = master_uri
+        self.api_key = api_key
+        self.stats = stats
+        self.running = set()
+        self.lock = threading.Lock()
+
+        self.app = Flask("rapidci_fake_client_{}".format(ip_address))
+        self.app.add_url_rule('/work/request', 'work_request', self.work_request, methods=['GET'])
+        self.app.add_url_rule('/work/execute', 'work_execute', self.work_execute, methods=['POST'])
+        self.app.add_url_rule('/status', 'status', self.status, methods=['GET'])
+        self.server = make_server(ip_address, 0, self.app, threaded=True)
+        self.port = self.server.server_port
+
+    def start(self):
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+
+    def stop(self):
+        self.server.shutdown()
+
+    def work_request(self):
+        time.sleep(self.latency)
+        with self.lock:
+            busy = len(self.running) >= self.capacity
+            work = {'current_work': [{'action_instance_id': action_instance_id} for action_instance_id in self.running],
+                    'hostname': self.ip_address}
+        return Response(json.dumps(work), status=423 if busy else 200, content_type='application/json')
+
+    def work_execute(self):
+        time.sleep(self.latency)
+        work = request.get_json()
+        if isinstance(work, list):
+            accepted = [work_request['action_instance_id'] for work_request in work if self._start_work(work_request)]
+            return Response(json.dumps({'message': "Work started" if accepted else "Cannot execute work at this time.",
+                                        'accepted': accepted,
+                                        'rejected': [work_request['action_instance_id'] for work_request in work
+                                                     if work_request['action_instance_id'] not in accepted]}),
+                            status=201 if accepted else 423, content_type='application/json')
+
+        if self._start_work(work):
+            return Response(json.dumps({'message': "Work started"}), status=201, content_type='application/json')
+        return Response(json.dumps({'message': "Cannot execute work at this time."}), status=423, content_type='application/json')
+
+    def status(self):
+        with self.lock:
+            return Response(json.dumps({'current_work': list(self.running)}), content_type='application/json')
+
+    def _start_work(self, work_request):
+        action_instance_id = int(work_request['action_instance_id'])
+        with self.lock:
+            if len(self.running) >= self.capacity:
+                self.stats.record_rejected()
+                return False
+            self.running.add(action_instance_id)
+
+        self.stats.record_dispatch(action_instance_id)
+        timer = threading.Timer(self.work_time, self._finish_work, [action_instance_id])
+        timer.daemon = True
+        timer.start()
+        return True
+
+    def _finish_work(self, action_instance_id):
+        try:
+            requests.post("{}/api/action_instances/{}/done".format(self.master_uri, action_instance_id),
+                          json={'status': 'SUCCESS'}, headers={'X-Rapidci-Api-Key': self.api_key}, timeout=30)
+        except Exception as exception:
+            logger.error("Fake client {} could not finish {}: {}".format(self.ip_address, action_instance_id, exception))
+        with self.lock:
+            self.running.discard(action_instance_id)
+        self.stats.record_completed()
+
+
+def configure_master(args, work_dir):
+    config_file = "{}/master.cfg".format(work_dir)
+    with open(config_file, 'w') as config:
+        config.write(CONFIG_TEMPLATE.format(database="{}/simulation.db".format(work_dir),
+                                            event_driven='false' if args.polling else 'true',
+                                            batch_size=args.batch_size,
+                                            claim_size=args.claim_size,
+                                            completion_journal='true' if args.completion_journal else 'false',
+                                            api_key='simulation-api-key',
+                                            register_api_key='simulation-register-key'))
+
+    from rapid.master import app, configure_application
+    configure_application(app, argparse.Namespace(config_file=config_file, static_file_dir=None, basic_auth=None, db_downgrade=None))
+    return app
+
+
+def seed_pipelines(flask_app, args):
+    from rapid.lib import get_db_session
+    from rapid.workflow.data.models import Action, Pipeline, Stage, Workflow
+
+    pipeline_ids = []
+    with flask_app.app_context():
+        for session in get_db_session():
+            for pipeline_num in range(args.pipelines):
+                pipeline = Pipeline(name="simulation-{}".format(pipeline_num), active=True)
+                session.add(pipeline)
+                session.flush()
+                stage = Stage(name="stage", pipeline_id=pipeline.id, order=0, active=True)
+                session.add(stage)
+                session.flush()
+                for workflow_num in range(args.workflows):
+                    workflow = Workflow(name="workflow-{}".format(workflow_num), stage_id=stage.id, order=workflow_num, active=True)
+                    session.add(workflow)
+                    session.flush()
+                    for action_num in range(args.actions):
+                        session.add(Action(name="action-{}".format(action_num), cmd='/bin/true', executable='/bin/true', args='',
+                                           order=action_num, slices=args.slices, grain=args.grain,
+                                           workflow_id=workflow.id, pipeline_id=pipeline.id))
+                pipeline_ids.append(pipeline.id)
+            session.commit()
+    return pipeline_ids
+
+
+def start_clients(flask_app, args, master_uri, stats):
+    clients = []
+    for client_num in range(args.clients):
+        client = FakeClient("127.0.0.{}".format(client_num + 2), args.capacity, args.latency / 1000.0, args.work_time,
+                            master_uri, flask_app.rapid_config.api_key, stats)
+        client.start()
+        clients.append(client)
+
+        response = flask_app.test_client().post('/client/register',
+                                                json={'grains': args.grain, 'hostname': client.ip_address},
+                                                headers={'X-Rapidci-Register-Key': flask_app.rapid_config.register_api_key,
+                                                         'X-Rapidci-port': str(client.port),
+                                                         'X-Rapidci-time': str(time.time() * 1000),
+                                                         'X-Rapidci-Client-Key': 'simulation-client-key'},
+                                                environ_base={'REMOTE_ADDR': client.ip_address})
+        if response.status_code != 200:
+            raise Exception("Could not register fake client {}: {}".format(client.ip_address, response.status_code))
+    return clients
+
+
+def start_pipelines(flask_app, pipeline_ids):
+    from rapid.lib.framework.ioc import IOC
+    from rapid.workflow.data.dal.pipeline_dal import PipelineDal
+
+    pipeline_dal = IOC.get_class_instance(PipelineDal)
+    with flask_app.app_context():
+        for pipeline_id in pipeline_ids:
+            pipeline_dal.create_pipeline_instance(pipeline_id)
+
+
+def get_report(args, stats, started, finished):
+    from rapid.lib.queue_metrics import QueueMetrics
+
+    expected = args.pipelines * args.workflows * args.actions * max(args.slices, 1)
+    summary = QueueMetrics.get_summary()
+    dispatch_window = (stats.last_dispatch - stats.first_dispatch) if stats.dispatched > 1 else 0
+    return {'expected': expected,
+            'dispatched': stats.dispatched,
+            'completed': stats.completed,
+            'rejected': stats.rejected,
+            'duplicates': stats.duplicates,
+            'elapsed': finished - started,
+            'dispatch_per_second': stats.dispatched / dispatch_window if dispatch_window else None,
+            'ready_wait': summary['ready_wait'],
+            'dispatch_phase': summary['phases'].get('dispatch', {'count': 0}),
+            'considered': summary['considered'],
+            'dispatched_per_tick': summary['dispatched_per_tick'],
+            'probes': summary['counts']['probes'],
+            'probe_failures': summary['counts']['probe_failures']}
+
+
+def print_report(report):
+    print("Dispatched {dispatched}/{expected}, completed {completed} in {elapsed:.2f}s "
+          "({rejected} rejected by busy clients, {duplicates} sent twice)".format(**report))
+    if report['dispatch_per_second'] is not None:
+        print("Dispatch throughput: {:.2f}/s".format(report['dispatch_per_second']))
+    print("Probes: {probes} ({probe_failures} failed)".format(**report))
+    for name in ['ready_wait', 'dispatch_phase', 'considered', 'dispatched_per_tick']:
+        values = report[name]
+        if values['count']:
+            print("{:<20} n={count:<6} p50={p50:.4f} p90={p90:.4f} p99={p99:.4f} max={max:.4f}".format(name, **values))
+
+
+def run(args):
+    work_dir = tempfile.mkdtemp(prefix='rapid_simulation_')
+    clients = []
+    try:
+        flask_app = configure_master(args, work_dir)
+        logger.setLevel(logging.INFO if args.verbose else logging.WARNING)
+        logging.getLogger('werkzeug').setLevel(logging.INFO if args.verbose else logging.ERROR)
+        master = make_server('127.0.0.1', 0, flask_app, threaded=True)
+        master_thread = threading.Thread(target=master.serve_forever)
+        master_thread.daemon = True
+        master_thread.start()
+
+        stats = Stats()
+        pipeline_ids = seed_pipelines(flask_app, args)
+        clients = start_clients(flask_app, args, "http://127.0.0.1:{}".format(master.server_port), stats)
+
+        from rapid.lib.queue_metrics import QueueMetrics
+        from rapid.master import run_queue
+        QueueMetrics.reset()
+        queue_thread = threading.Thread(target=run_queue, args=[flask_app])
+        queue_thread.daemon = True
+        queue_thread.start()
+
+        started = time.time()
+        start_pipelines(flask_app, pipeline_ids)
+        expected = args.pipelines * args.workflows * args.actions * max(args.slices, 1)
+        while stats.completed < expected and time.time() - started < args.timeout:
+            time.sleep(0.05)
+        finished = time.time()
+
+        master.shutdown()
+        return get_report(args, stats, started, finished)
+    finally:
+        for client in clients:
+            client.stop()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def get_parser():
+    parser = argparse.ArgumentParser(description='Simulate the master dispatching pipelines to fake clients')
+    parser.add_argument('--pipelines', type=int, default=10, help='Pipeline instances to start')
+    parser.add_argument('--workflows', type=int, default=1, help='Parallel workflows in each pipeline')
+    parser.add_argument('--actions', type=int, default=3, help='Sequential actions in each workflow')
+    parser.add_argument('--slices', type=int, default=1, help='Slices of each action')
+    parser.add_argument('--grain', default='simulation', help='Grain of every action, and of every fake client')
+    parser.add_argument('--clients', type=int, default=4, help='Fake clients to register')
+    parser.add_argument('--capacity', type=int, default=2, help='Work each fake client runs at once')
+    parser.add_argument('--latency', type=float, default=5, help='Milliseconds each fake client takes to answer')
+    parser.add_argument('--work-time', dest='work_time', type=float, default=0.1, help='Seconds each piece of work runs')
+    parser.add_argument('--batch-size', dest='batch_size', type=int, default=1, help='dispatch_batch_size for the master')
+    parser.add_argument('--claim-size', dest='claim_size', type=int, default=0, help='dispatch_claim_size for the master')
+    parser.add_argument('--completion-journal', dest='completion_journal', action='store_true',
+                        help='Journal /done payloads and apply them on the completion workers')
+    parser.add_argument('--polling', action='store_true', help='Poll every queue_time instead of waking on queue events')
+    parser.add_argument('--timeout', type=float, default=300, help='Give up after this many seconds')
+    parser.add_argument('--json', action='store_true', help='Print the report as json')
+    parser.add_argument('--verbose', action='store_true', help="Keep the master's info logging")
+    return parser
+
+
+def main(argv=None):
+    args = get_parser().parse_args(argv)
+    report = run(args)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+
+if __name__ == '__main__':
+    main()
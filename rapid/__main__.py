@@ -16,6 +16,7 @@
 
 import argparse
 import logging
+import multiprocessing
 
 from .configuration_generator import ConfigurationGenerator
 
@@ -36,23 +37,6 @@ parser.add_argument('--downgrade', dest='db_downgrade', help="Downgrade db for a
 parser.add_argument('--create_db', action='store_true', dest='createdb', help="Create initial db")
 parser.add_argument('--create_migration', dest='migrate', help="Create Migration for alembic")
 parser.add_argument('--generate-config', dest='generate_config', help='Generate a default configuration', choices=['master', 'client'])
-args = parser.parse_args()
-
-if args.mode_client or args.run or args.upgrade:
-    from .client import app, configure_application
-elif args.mode_logging:
-    from .log_server import app, configure_application
-elif args.qa_dir:
-    from .testmapper import process_directory
-    process_directory('', args.qa_dir, True)
-    import sys
-    sys.exit(0)
-elif args.generate_config:
-    import sys
-    ConfigurationGenerator().generate(args.generate_config, args.config_file)
-    sys.exit(0)
-else:
-    from .master import app, configure_application
 
 logger = logging.getLogger("rapid")
 
@@ -62,8 +46,29 @@ def setup():
     configure_application(app, args)
 
 
-if not args.migrate:
-    setup()
+# Processes the client spawns, like its results parse pool, import the main module again before they start
+# working; only the main process parses the arguments and sets the application up.
+if multiprocessing.current_process().name == 'MainProcess':
+    args = parser.parse_args()
+
+    if args.mode_client or args.run or args.upgrade:
+        from .client import app, configure_application
+    elif args.mode_logging:
+        from .log_server import app, configure_application
+    elif args.qa_dir:
+        from .testmapper import process_directory
+        process_directory('', args.qa_dir, True)
+        import sys
+        sys.exit(0)
+    elif args.generate_config:
+        import sys
+        ConfigurationGenerator().generate(args.generate_config, args.config_file)
+        sys.exit(0)
+    else:
+        from .master import app, configure_application
+
+    if not args.migrate:
+        setup()
 
 
 def main():
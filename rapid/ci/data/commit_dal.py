@@ -18,6 +18,7 @@ from sqlalchemy.sql.expression import desc
 from rapid.lib.framework.injectable import Injectable
 from rapid.lib.exceptions import DatabaseException, InvalidObjectException
 from rapid.lib import get_db_session
+from rapid.lib.reference_cache import ReferenceCache
 from rapid.ci.data.models import Commit, CommitParameters, Version, PipelineInstanceCommit, Vcs
 
 
@@ -98,6 +99,10 @@ class CommitDal(Injectable):
         raise InvalidObjectException("Commit Identifier required.")
 
     def get_vcs_by_repo_name(self, repo_name):
+        return ReferenceCache.get(Vcs.__tablename__, repo_name, lambda: self._load_vcs_by_repo_name(repo_name))
+
+    @staticmethod
+    def _load_vcs_by_repo_name(repo_name):
         for session in get_db_session():
             vcs = session.query(Vcs).filter(Vcs.name == repo_name).first()
             return vcs.serialize() if vcs is not None else None
@@ -47,6 +47,12 @@ def setup_logger(flask_app):
     setup_logging(flask_app)
 
 
+def setup_executor_registry(flask_app, args):
+    from rapid.lib.executor_registry import ExecutorRegistry
+    # A single action instance run is its own process and must not overwrite the running client's state file.
+    ExecutorRegistry.configure(None if args.run else flask_app.rapid_config.executor_state_file)  # pylint: disable=no-member
+
+
 def load_extensions(flask_app):
     from rapid.lib.framework.ioc import IOC
     from rapid.extensions.extension_loader import ExtensionLoader
@@ -59,11 +65,16 @@ def configure_application(flask_app, args):
     setup_status_route(flask_app)
     setup_config_from_file(flask_app, args)
     setup_logger(flask_app)
+    setup_executor_registry(flask_app, args)
     load_parsers()
     register_controllers(flask_app)
     if is_primary_worker() and not args.run and not args.upgrade:
         setup_client_register_thread()
         clean_workspace()
+        if flask_app.rapid_config.heartbeat_rate:  # pylint: disable=no-member
+            setup_client_heartbeat_thread()
+        if flask_app.rapid_config.pull_work:  # pylint: disable=no-member
+            setup_client_work_lease_thread()
 
     if args.mode_logging:
         from rapid.lib.log_server import LogServer
@@ -96,6 +107,30 @@ def setup_client_register_thread():
     thread.start()
 
 
+def _heartbeat_thread():
+    from rapid.client.client_heartbeat import ClientHeartbeat
+    ClientHeartbeat(app).run()
+
+
+def setup_client_heartbeat_thread():
+    logger.info("Setting up client heartbeat thread")
+    thread = threading.Thread(target=_heartbeat_thread)
+    thread.daemon = True
+    thread.start()
+
+
+def _work_lease_thread():
+    from rapid.client.work_leaser import WorkLeaser
+    WorkLeaser(app).run()
+
+
+def setup_client_work_lease_thread():
+    logger.info("Setting up client work lease thread")
+    thread = threading.Thread(target=_work_lease_thread)
+    thread.daemon = True
+    thread.start()
+
+
 def run_action_instance(action_instance_id):
     # type: (int) -> None
     from rapid.client.action_instance_runner import ActionInstanceRunner
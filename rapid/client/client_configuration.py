@@ -35,6 +35,7 @@ class ClientConfiguration(Configuration):
         self.grains = None
         self.grain_restrict = None
         self.quarantine_directory = None
+        self.executor_state_file = None
         self.register_api_key = None
         self.api_key = None
         self.install_uri = None
@@ -45,6 +46,13 @@ class ClientConfiguration(Configuration):
         self.log_file = None
         self.os_path_override = None
         self.log_to_directory = False
+        self.pull_work = None
+        self.lease_poll_rate = None
+        self.heartbeat_rate = None
+        self.results_parse_workers = None
+        self.results_parse_python = None
+        self.http_pool_size = None
+        self.http_idle_timeout = None
 
         self.is_single_use = False
 
@@ -64,16 +72,24 @@ class ClientConfiguration(Configuration):
                 'grains': [None],
                 'grain_restrict': [False, bool],
                 'quarantine_directory': [os.path.join(tempfile.gettempdir(), 'rapid', 'quarantine')],
+                'executor_state_file': [os.path.join(tempfile.gettempdir(), 'rapid', 'executors.json')],
                 'register_api_key': [None],
                 'api_key': [str(uuid.uuid3(uuid.NAMESPACE_OID, 'ClientApiKey!')).replace('-', '')],
                 'install_uri': ['https://pypi.python.org/pypi/'],
                 'install_options': [''],
                 'get_files_basic_auth': [None, list, ':'],
-                'log_to_directory': [None, str]
+                'log_to_directory': [None, str],
+                'pull_work': [False, bool],
+                'lease_poll_rate': [5, int],
+                'heartbeat_rate': [10, int],
+                'results_parse_workers': [4, int],
+                'results_parse_python': [None]
             },
             'general': {
                 'use_ssl': [False, bool],
                 'verify_certs': [True, bool],
+                'http_pool_size': [10, int],
+                'http_idle_timeout': [300, int],
                 'log_file': [None],
                 'extensions': [None, list, ',']
             }
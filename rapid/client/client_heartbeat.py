@@ -0,0 +1,76 @@
+"""
+ Copyright (c) 2015 Michael Bright and Bamboo HR LLC
+
+ Licensed under the Apache License, Version 2.0 (the "License");
+ you may not use this file except in compliance with the License.
+ You may obtain a copy of the License at
+
+ http://www.apache.org/licenses/LICENSE-2.0
+
+ Unless required by applicable law or agreed to in writing, software
+ distributed under the License is distributed on an "AS IS" BASIS,
+ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ See the License for the specific language governing permissions and
+ limitations under the License.
+"""
+# pylint: disable=broad-except
+import os
+import time
+import socket
+import logging
+
+from rapid.client.communicator.client_communicator import ClientCommunicator
+from rapid.lib.store_service import StoreService
+from rapid.lib.version import Version
+
+logger = logging.getLogger("rapid")
+
+
+class ClientHeartbeat(object):
+    """
+    Tells the master what this client is working on every heartbeat_rate seconds, so the master can
+    answer liveness checks without probing /work/request. Re-registers when the master has forgotten
+    this client.
+    """
+
+    def __init__(self, flask_app, communicator=None):
+        self.app = flask_app
+        self.communicator = communicator or ClientCommunicator(flask_app.rapid_config.master_uri,
+                                                               flask_app.rapid_config.quarantine_directory,
+                                                               flask_app,
+                                                               flask_app.rapid_config.verify_certs)
+
+    def run(self):
+        while True:
+            self.beat()
+            time.sleep(self.app.rapid_config.heartbeat_rate)
+
+    def beat(self):
+        try:
+            if not self.communicator.send_heartbeat(self.get_heartbeat()):
+                self.communicator.register(self.app.rapid_config)
+        except Exception as exception:
+            logger.error("Heartbeat failed: {}".format(exception))
+
+    def get_heartbeat(self):
+        executors = StoreService.get_executors()
+        return {'port': self.app.rapid_config.port,
+                'hostname': socket.gethostname(),
+                'version': Version.get_version(),
+                'grains': self.app.rapid_config.grains,
+                'executor_count': self.app.rapid_config.executor_count,
+                'free_slots': max(self.app.rapid_config.executor_count - len(executors), 0),
+                'current_work': executors + self._get_quarantined_work()}
+
+    def _get_quarantined_work(self):
+        items = []
+        quarantine_directory = self.app.rapid_config.quarantine_directory
+        try:
+            for item in os.listdir(quarantine_directory):
+                try:
+                    items.append({'action_instance_id': int(item), 'pid': 'quarantined'})
+                except ValueError:
+                    pass
+        except (OSError, TypeError):
+            pass
+        return items
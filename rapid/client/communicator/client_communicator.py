@@ -18,11 +18,11 @@ import time
 import pickle
 import socket
 import logging
-import requests
 from requests.exceptions import ConnectionError  # pylint: disable=redefined-builtin
 
 from rapid.client.client_configuration import ClientConfiguration
 from rapid.lib.constants import HeaderConstants
+from rapid.lib.http_sessions import HttpSessions
 from rapid.lib.utils import OSUtil
 
 from rapid.lib.version import Version
@@ -43,7 +43,10 @@ logger = logging.getLogger("rapid")
 class ClientCommunicator(Communicator):
     DOWNLOAD_URI = '/get_file/{}'
     REGISTRATION_URI = "/client/register"
+    HEARTBEAT_URI = "/client/heartbeat"
     WORK_REQUEST_URI = "/api/action_instances/{}/work_request"
+    WORK_LEASE_URI = "/api/work/lease"
+    WORK_LEASE_RENEW_URI = "/api/work/lease/renew"
 
     def __init__(self, server_uri, quarantine_directory=None, flask_app=None, verify_certs=True, get_files_auth=None):
         """
@@ -151,7 +154,8 @@ class ClientCommunicator(Communicator):
     def _get_register_post_data(client_config):
         return json.dumps({"grains": client_config.grains,
                            "grain_restrict": client_config.grain_restrict,
-                           "hostname": socket.gethostname()})
+                           "hostname": socket.gethostname(),
+                           "pull": bool(getattr(client_config, 'pull_work', False))})
 
     @staticmethod
     def _get_register_headers(client_config):
@@ -185,6 +189,34 @@ class ClientCommunicator(Communicator):
         except Exception as exception:
             logger.error(exception)
 
+    def send_heartbeat(self, heartbeat):
+        """
+        :return: True if the master still has this client registered
+        :rtype: bool
+        """
+        response = self._default_send(self.get_uri(self.HEARTBEAT_URI), None, 'post', {'Content-Type': 'application/json'}, in_json=heartbeat)
+        return response.json().get('registered', True)
+
+    def lease_work(self, client_config, free_slots):
+        """
+        Long-poll the master for up to free_slots work requests.
+        :return: list of serialized WorkRequests leased to this client
+        """
+        response = self._default_send(self.get_uri(self.WORK_LEASE_URI), None, 'post', {'Content-Type': 'application/json'},
+                                      in_json={'grains': client_config.grains,
+                                               'grain_restrict': client_config.grain_restrict,
+                                               'port': client_config.port,
+                                               'free_slots': free_slots})
+        return response.json()['work_requests']
+
+    def renew_leases(self, client_config, action_instance_ids):
+        if action_instance_ids:
+            self._default_send(self.get_uri(self.WORK_LEASE_RENEW_URI), None, 'post', {'Content-Type': 'application/json'},
+                               in_json={'port': client_config.port, 'action_instance_ids': action_instance_ids})
+
+    def _get_session(self):
+        return HttpSessions.get_session(self.server_uri)
+
     def _string_header_values(self, headers):
         _headers = {}
         try:
@@ -202,7 +234,7 @@ class ClientCommunicator(Communicator):
         if master_key is not None:
             headers['X-Rapidci-Api-Key'] = master_key
 
-        return requests.get(uri, headers=headers)
+        return self._get_session().get(uri, headers=headers)
 
     def _default_send(self, uri, data, in_type='put', headers=None, in_json=None):
         master_key = StoreService.get_master_key(self.flask_app)
@@ -213,11 +245,11 @@ class ClientCommunicator(Communicator):
 
         request = None
         if in_type == 'put':
-            request = requests.put(uri, data=data, json=in_json, headers=headers, verify=self.verify_certs)
+            request = self._get_session().put(uri, data=data, json=in_json, headers=headers, verify=self.verify_certs)
         elif in_type == 'post':
-            request = requests.post(uri, data=data, json=in_json, headers=headers, verify=self.verify_certs)
+            request = self._get_session().post(uri, data=data, json=in_json, headers=headers, verify=self.verify_certs)
 
-        if request.status_code != 200:
+        if request.status_code not in (200, 202):
             raise Exception("Status Code Failure: {}".format(request.status_code))
         return request
 
@@ -234,9 +266,9 @@ class ClientCommunicator(Communicator):
         with open(real_file_name, 'wb') as handle:
             response = None
             if self.get_files_auth is not None:
-                response = requests.get(self.server_uri + "/get_file/{}".format(file_name), verify=self.verify_certs, auth=self.get_files_auth)
+                response = self._get_session().get(self.server_uri + "/get_file/{}".format(file_name), verify=self.verify_certs, auth=self.get_files_auth)
             else:
-                response = requests.get(self.server_uri + "/get_file/{}".format(file_name), verify=self.verify_certs)
+                response = self._get_session().get(self.server_uri + "/get_file/{}".format(file_name), verify=self.verify_certs)
 
             if not response.ok:
                 raise BaseException("File '{}' did not download".format(file_name))
@@ -21,7 +21,6 @@ except ImportError:
     import json
 
 import os
-from os.path import basename
 
 import time
 import pickle
@@ -132,7 +131,7 @@ class WorkController(BaseController):
 
         try:
             if work['action_instance_id'] is not None:
-                pid_exists = StoreService.check_for_pidfile(work['action_instance_id'])
+                pid_exists = StoreService.get_executor_pid(work['action_instance_id'])
                 if pid_exists is not None:
                     logger.info("Request was sent, but was already running, ignoring for [{}]".format(work['action_instance_id']))
         except Exception:
@@ -183,7 +182,11 @@ class WorkController(BaseController):
 
     def work_execute(self):
         try:
-            if self.can_work_on(request.get_json()):
+            work = request.get_json()
+            if isinstance(work, list):
+                return self.work_execute_batch(work)
+
+            if self.can_work_on(work):
                 self.start_work()
                 executors = StoreService.get_executors()
                 headers = {}
@@ -196,8 +199,39 @@ class WorkController(BaseController):
 
         return Response(json.dumps({"message": "Cannot execute work at this time."}), status=423, content_type='application/json')
 
-    def start_work(self):
-        executor = Executor(WorkRequest(request.get_json()),
+    def work_execute_batch(self, work_list):
+        """
+        Start as many of the given work requests as there are free executors.
+        Executors register themselves from their own thread, so free capacity is counted once up front.
+        :param work_list: list of serialized WorkRequests
+        :return: Response listing the accepted and rejected action_instance_ids
+        """
+        free_executors = self.app.rapid_config.executor_count - len(StoreService.get_executors())
+        accepted = []
+        rejected = []
+        for work in work_list:
+            action_instance_id = work.get('action_instance_id') if isinstance(work, dict) else None
+            if len(accepted) < free_executors and not self.currently_running(work):
+                try:
+                    self.start_work(work)
+                    accepted.append(action_instance_id)
+                    continue
+                except Exception as exception:
+                    logger.error(exception)
+            rejected.append(action_instance_id)
+
+        headers = {}
+        if len(accepted) >= free_executors:
+            headers["X-Exclude-Resource"] = 'true'
+        return Response(json.dumps({"message": "Work started" if accepted else "Cannot execute work at this time.",
+                                    "accepted": accepted,
+                                    "rejected": rejected}),
+                        status=201 if accepted else 423,
+                        content_type="application/json",
+                        headers=headers)
+
+    def start_work(self, work=None):
+        executor = Executor(WorkRequest(work if work is not None else request.get_json()),
                             self.app.rapid_config.master_uri,
                             workspace=self.app.rapid_config.workspace,
                             quarantine=self.app.rapid_config.quarantine_directory,
@@ -207,11 +241,10 @@ class WorkController(BaseController):
         executor.start()
 
     def work_cancel(self, action_instance_id):
-        pid_file = StoreService.check_for_pidfile(action_instance_id)
-        if pid_file is not None:
+        pid = StoreService.get_executor_pid(action_instance_id)
+        if pid is not None:
             try:
-                base_name = basename(pid_file)
-                psutil.Process(int(base_name.split('-')[-1])).kill()
+                psutil.Process(int(pid)).kill()
                 return Response(json.dumps({"message": "Killed process."}), 200)
             except Exception:
                 pass
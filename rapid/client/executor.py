@@ -16,14 +16,19 @@
 
 import glob
 import logging
+import multiprocessing
 import os
 import platform
 import shutil
 import subprocess
+import sys
 import tempfile
 import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 
 from rapid import testmapper
+from rapid.lib import UWSGI
 from rapid.client.communicator.client_communicator import ClientCommunicator
 from rapid.lib.communication import Communication
 from rapid.lib.constants import Constants
@@ -38,6 +43,12 @@ rapid_logger = logging.getLogger('rapid')
 
 
 class Executor(object):
+    RESULTS_PARSE_WORKERS = 4
+
+    _parse_pool = None
+    _parse_pool_workers = None
+    _parse_pool_lock = threading.Lock()
+
     def __init__(self, work_request, master_uri, logger=None, workspace=None, quarantine=None, verify_certs=True, rapid_config=None):
         """
 
@@ -180,6 +191,8 @@ class Executor(object):
         except (BaseException, Exception) as exception:
             self.logger.exception(exception)
             communicator.send_done(self.work_request.action_instance_id, 'FAILED', None, None, None, self.logger)
+            if self.pid is not None:
+                StoreService.clear_executor(self)
         finally:
             self.clean_workspace()
 
@@ -271,44 +284,130 @@ class Executor(object):
         return dict((k.strip(), v.strip()) for k, v in
                     (item.split('=', 1) for item in lines))
 
-    def _get_results(self, workspace, results_files):  # pylint: disable=too-many-locals
+    @classmethod
+    def get_parse_pool(cls, workers, python=None):
+        """
+        The long lived pool results files are parsed on, shared by the executors of this client and replaced only when
+        the number of workers or the python interpreter changes, or one of its processes died.
+
+        Its processes are spawned rather than forked, as forking the client while one of its other threads holds a lock
+        could leave the child waiting on that lock forever.
+        """
+        with cls._parse_pool_lock:
+            if cls._parse_pool is None or cls._parse_pool_workers != (workers, python):
+                if cls._parse_pool is not None:
+                    cls._parse_pool.shutdown(wait=False)
+                cls._parse_pool = ProcessPoolExecutor(max_workers=workers, mp_context=cls._get_parse_context(python))
+                cls._parse_pool_workers = (workers, python)
+            return cls._parse_pool
+
+    @staticmethod
+    def _get_parse_context(python=None):
+        context = multiprocessing.get_context('spawn')
+        if python is not None:
+            context.set_executable(python)
+        return context
+
+    @classmethod
+    def _discard_parse_pool(cls, pool):
+        with cls._parse_pool_lock:
+            if cls._parse_pool is pool:
+                cls._parse_pool = None
+        pool.shutdown(wait=False)
+
+    def _get_results_parse_workers(self):
+        workers = self.RESULTS_PARSE_WORKERS
+        if self.rapid_config is not None and self.rapid_config.results_parse_workers is not None:
+            workers = self.rapid_config.results_parse_workers
+        return min(workers, os.cpu_count() or 1)
+
+    def _get_results_parse_python(self):
+        """
+        The python interpreter the parse pool spawns, None when there is none to spawn.
+        """
+        if self.rapid_config is not None and self.rapid_config.results_parse_python is not None:
+            return self.rapid_config.results_parse_python
+        if not UWSGI:
+            return sys.executable
+
+        # Under uWSGI sys.executable is the uwsgi binary, look for the interpreter of the environment it runs instead.
+        python = os.path.join(sys.exec_prefix, 'bin', 'python')
+        return python if os.path.exists(python) else None
+
+    def _get_results(self, workspace, results_files):
         if results_files:
             # Wire in the registered parsers.
             results = {}
-            from .parsers import parse_file, FileWrapper
+            from .parsers import FileWrapper
 
+            parse_jobs = []
             for file_glob in results_files:
                 wrapper = FileWrapper(self.workspace, file_glob)
 
-                selected_parser = wrapper.parser
-
-                file_was_read = False
-                for results_file in glob.glob("{}/{}".format(workspace, wrapper.file_name)):
-                    file_was_read = True
-                    with open(results_file) as glob_file:
-                        try:
-                            lines = glob_file.read().splitlines(True)
-                            parsed_results = parse_file(lines, selected_parser)
-
-                            summary = parsed_results[Constants.RESULTS_SUMMARY] if Constants.RESULTS_SUMMARY in parsed_results else None
-                            if summary is not None:
-                                if Constants.RESULTS_SUMMARY not in results:
-                                    results[Constants.RESULTS_SUMMARY] = summary
-                                else:
-                                    for (key, value) in summary.items():
-                                        results[Constants.RESULTS_SUMMARY][key] += value
-                                del parsed_results[Constants.RESULTS_SUMMARY]
-
-                            results.update(parsed_results)
-                        except Exception:
-                            raise ResultsFileNotParsedException("Result file did not parse.")
-
-                if not file_was_read:
+                glob_files = sorted(glob.glob("{}/{}".format(workspace, wrapper.file_name)))
+                if not glob_files:
                     raise ResultsFileNotFoundException("Results file not read.")
+                parse_jobs.extend((results_file, wrapper.parser) for results_file in glob_files)
+
+            for parsed_results in self._parse_results_files(parse_jobs):
+                summary = parsed_results[Constants.RESULTS_SUMMARY] if Constants.RESULTS_SUMMARY in parsed_results else None
+                if summary is not None:
+                    if Constants.RESULTS_SUMMARY not in results:
+                        results[Constants.RESULTS_SUMMARY] = summary
+                    else:
+                        for (key, value) in summary.items():
+                            results[Constants.RESULTS_SUMMARY][key] += value
+                    del parsed_results[Constants.RESULTS_SUMMARY]
+
+                results.update(parsed_results)
 
             return results
         return None
 
+    def _parse_results_files(self, parse_jobs):
+        """
+        Parse every (results_file, parser) of parse_jobs, yielding their results in the same order so that they merge
+        the same way however many workers parse them. More than one file is parsed on the parse pool when
+        results_parse_workers is more than 1 and there is a python interpreter to spawn, otherwise, or once the pool
+        breaks, they are parsed one after another in this thread.
+        """
+        from .parsers import parse_results_file
+
+        workers = self._get_results_parse_workers()
+        python = self._get_results_parse_python() if workers > 1 and len(parse_jobs) > 1 else None
+        if python is None:
+            yield from self._parse_results_files_in_thread(parse_jobs)
+            return
+
+        pool = self.get_parse_pool(workers, python)
+        futures = [pool.submit(parse_results_file, results_file, parser) for (results_file, parser) in parse_jobs]
+        try:
+            for (index, future) in enumerate(futures):
+                try:
+                    parsed_results = future.result()
+                except BrokenProcessPool:
+                    rapid_logger.warning("The results parse pool broke, parsing the remaining results files in the executor.")
+                    self._discard_parse_pool(pool)
+                    yield from self._parse_results_files_in_thread(parse_jobs[index:])
+                    return
+                except Exception:
+                    raise ResultsFileNotParsedException("Result file did not parse.")
+                yield parsed_results
+        finally:
+            for future in futures:
+                future.cancel()
+
+    @staticmethod
+    def _parse_results_files_in_thread(parse_jobs):
+        from .parsers import parse_results_file
+
+        for (results_file, parser) in parse_jobs:
+            try:
+                parsed_results = parse_results_file(results_file, parser)
+            except Exception:
+                raise ResultsFileNotParsedException("Result file did not parse.")
+            yield parsed_results
+
     def _get_status(self, return_code):
         status = 'SUCCESS'
         if return_code > 0:
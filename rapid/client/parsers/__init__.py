@@ -50,6 +50,37 @@ def parse_file(lines, parser=None, workspace=None):
     return {}
 
 
+def parse_stream(stream, parser=None, workspace=None):
+    """
+    Like parse_file, for an open results file, which parsers that support it read as they go.
+    """
+    if parser is None:
+        identifier = stream.readline()
+        if not identifier:
+            raise Exception("Results file is empty")
+        if identifier.strip() not in parsers:
+            return {}
+        parser = parsers[identifier.strip()](workspace=workspace)
+
+    try:
+        return parser.parse_stream(stream, ignore_type_check=True)
+    except Exception as exception:
+        import traceback
+        traceback.print_exc()
+        raise exception
+
+
+def parse_results_file(results_file, parser=None, workspace=None):
+    """
+    parse_stream for a results file by name, so that it can be sent to another process to parse.
+    """
+    if not parsers:
+        load_parsers()
+
+    with open(results_file) as stream:
+        return parse_stream(stream, parser, workspace)
+
+
 def get_parser(identifier, workspace=None, failures_only=False, failures_count=False):
     if identifier in parsers:
         return parsers[identifier](workspace=workspace, failures_only=failures_only, failures_count=failures_count)
@@ -47,3 +47,18 @@ class AbstractParser(ABC):
             return self._parse_lines(lines)
         
         return self._parse_lines(lines[1:])
+
+    def parse_stream(self, stream, ignore_type_check=False):
+        """
+        Parse an open results file, starting at its identifier line unless ignore_type_check.
+        """
+        if not ignore_type_check and self.get_type() != stream.readline().strip():
+            raise Exception("Invalid first line identifier")
+
+        return self._parse_stream(stream)
+
+    def _parse_stream(self, stream):
+        """
+        Parsers that can work through the file as it is read override this, the others get all of its lines.
+        """
+        return self._parse_lines(stream.read().splitlines(True))
@@ -14,98 +14,106 @@
  limitations under the License.
 """
 
-from xml.dom.minidom import parseString
+from io import StringIO
+from xml.etree.ElementTree import iterparse
+
 from rapid.lib.constants import Constants
 
 from .abstract_parser import AbstractParser
 
 
 class XUnitParser(AbstractParser):
+    """
+    Streams through the report with iterparse, so only the testcase being read is held in memory. Every element
+    outside of a testcase is dropped as soon as it ends.
+    """
     @staticmethod
     def get_type():
         return "XUnit"
 
-    def _parse_lines(self, lines):  # pylint: disable=too-many-locals,too-many-branches,too-many-statements
+    def _parse_lines(self, lines):
         """
-        Removes the first line, being the identifier, then parses the rest of the lines
-        :param lines: array of the lines of the file.
+        :param lines: array of the lines of the file, without the identifier.
         :return: dict of results.
         """
+        return self._parse_stream(StringIO("".join(lines)))
+
+    def _parse_stream(self, stream):
         results = {}
-        dom = parseString("".join(lines))
         summary = self.prepare_summary()
 
-        for testsuite in dom.getElementsByTagName('testsuite'):
-            for node in testsuite.childNodes:
-                if node.nodeName != 'testcase':
-                    continue
-                testcase = node
-                name = ''
-                try:
-                    class_name = ''
-                    for class_attr in ['classname', 'class']:
-                        class_name = testcase.getAttribute(class_attr)
-                        if class_name:
-                            break
-
-                    name = "{}~{}".format(class_name, testcase.getAttribute('name'))
-                except AttributeError:
-                    import traceback
-                    traceback.print_exc()
-
-                if self.workspace:
-                    name = name.replace(self.workspace, '')
-
-                test_result = {
-                    'status': Constants.STATUS_SUCCESS,
-                    'time': testcase.getAttribute('time')
-                }
-
-                failure_tags = testcase.getElementsByTagName('failure')
-                skipped_tags = testcase.getElementsByTagName('skipped')
-                error_tags = testcase.getElementsByTagName('error')
-
-                if self.failures_only and (not failure_tags and not error_tags):
-                    continue
-
-                if failure_tags:
-                    test_result['status'] = Constants.STATUS_FAILED
-                    test_result['stacktrace'] = ""
-
-                    count = 0
-                    length = len(failure_tags)
-                    for failure in failure_tags:
-                        test_result['stacktrace'] += "\n".join(
-                            [failure.firstChild.nodeValue if failure.firstChild is not None and hasattr(failure.firstChild, 'nodeValue')
-                             else failure.attributes['message'].value])
-                        count += 1
-                        if length > count:
-                            test_result['stacktrace'] += "\n"
-
-                    summary[Constants.STATUS_FAILED] += 1
-                elif error_tags:
-                    test_result['status'] = Constants.STATUS_FAILED
-                    test_result['stacktrace'] = ""
-
-                    count = 0
-                    length = len(failure_tags)
-                    for failure in error_tags:
-                        test_result['stacktrace'] += "\n".join(
-                            ["Error - " + (failure.firstChild.nodeValue if failure.firstChild is not None and hasattr(failure.firstChild, 'nodeValue')
-                                           else failure.attributes['message'].value)])
-                        count += 1
-                        if length > count:
-                            test_result['stacktrace'] += "\n"
-
-                    summary[Constants.STATUS_FAILED] += 1
-                elif skipped_tags:
-                    test_result['status'] = Constants.STATUS_SKIPPED
-                    summary[Constants.STATUS_SKIPPED] += 1
-                else:
-                    summary[Constants.STATUS_SUCCESS] += 1
-
-                results[name] = test_result
+        elements = []
+        testcase_depth = 0
+        for event, element in iterparse(stream, events=('start', 'end')):
+            if event == 'start':
+                elements.append(element)
+                if self._tag(element) == 'testcase':
+                    testcase_depth += 1
+                continue
+
+            elements.pop()
+            parent = elements[-1] if elements else None
+            if self._tag(element) == 'testcase':
+                testcase_depth -= 1
+                if parent is not None and self._tag(parent) == 'testsuite':
+                    self._parse_testcase(element, results, summary)
+
+            if testcase_depth == 0:
+                element.clear()
+                if parent is not None:
+                    del parent[-1]
 
         results['__summary__'] = summary
 
         return results
+
+    def _parse_testcase(self, testcase, results, summary):
+        class_name = ''
+        for class_attr in ['classname', 'class']:
+            class_name = testcase.get(class_attr, '')
+            if class_name:
+                break
+
+        name = "{}~{}".format(class_name, testcase.get('name', ''))
+        if self.workspace:
+            name = name.replace(self.workspace, '')
+
+        test_result = {
+            'status': Constants.STATUS_SUCCESS,
+            'time': testcase.get('time', '')
+        }
+
+        failure_tags = self._find_all(testcase, 'failure')
+        skipped_tags = self._find_all(testcase, 'skipped')
+        error_tags = self._find_all(testcase, 'error')
+
+        if self.failures_only and (not failure_tags and not error_tags):
+            return
+
+        if failure_tags:
+            test_result['status'] = Constants.STATUS_FAILED
+            test_result['stacktrace'] = "\n".join([self._get_message(failure) for failure in failure_tags])
+            summary[Constants.STATUS_FAILED] += 1
+        elif error_tags:
+            test_result['status'] = Constants.STATUS_FAILED
+            test_result['stacktrace'] = "".join(["Error - " + self._get_message(error) for error in error_tags])
+            summary[Constants.STATUS_FAILED] += 1
+        elif skipped_tags:
+            test_result['status'] = Constants.STATUS_SKIPPED
+            summary[Constants.STATUS_SKIPPED] += 1
+        else:
+            summary[Constants.STATUS_SUCCESS] += 1
+
+        results[name] = test_result
+
+    @staticmethod
+    def _get_message(element):
+        return element.text if element.text is not None else element.attrib['message']
+
+    @classmethod
+    def _find_all(cls, testcase, tag):
+        return [element for element in testcase.iter() if element is not testcase and cls._tag(element) == tag]
+
+    @staticmethod
+    def _tag(element):
+        return element.tag.rsplit('}', 1)[-1]
@@ -0,0 +1,80 @@
+"""
+ Copyright (c) 2015 Michael Bright and Bamboo HR LLC
+
+ Licensed under the Apache License, Version 2.0 (the "License");
+ you may not use this file except in compliance with the License.
+ You may obtain a copy of the License at
+
+ http://www.apache.org/licenses/LICENSE-2.0
+
+ Unless required by applicable law or agreed to in writing, software
+ distributed under the License is distributed on an "AS IS" BASIS,
+ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ See the License for the specific language governing permissions and
+ limitations under the License.
+"""
+# pylint: disable=broad-except
+import time
+import logging
+
+from rapid.client.communicator.client_communicator import ClientCommunicator
+from rapid.client.controllers.work_controller import WorkController
+from rapid.lib.store_service import StoreService
+
+logger = logging.getLogger("rapid")
+
+
+class WorkLeaser(object):
+    """
+    Pull mode: long-polls the master for work instead of waiting for it to be pushed, and keeps the
+    leases on running work renewed so the master does not hand it to another client.
+
+    Executors register themselves from their own thread, so work that was just started is tracked
+    in _starting until it shows up in StoreService.get_executors().
+    """
+    STARTING_GRACE = 30
+
+    def __init__(self, flask_app, communicator=None, work_controller=None):
+        self.app = flask_app
+        self.communicator = communicator or ClientCommunicator(flask_app.rapid_config.master_uri,
+                                                               flask_app.rapid_config.quarantine_directory,
+                                                               flask_app,
+                                                               flask_app.rapid_config.verify_certs)
+        if work_controller is None:
+            work_controller = WorkController()
+            work_controller.app = flask_app
+        self.work_controller = work_controller
+        self._starting = {}
+
+    def run(self):
+        while True:
+            if not self.lease_once():
+                time.sleep(self.app.rapid_config.lease_poll_rate)
+
+    def lease_once(self):
+        """
+        Renew the running work's leases, then ask for as much work as there are free executors.
+        :return: True if the master was asked for work, False if the caller should back off
+        :rtype: bool
+        """
+        try:
+            running = {int(executor['action_instance_id']) for executor in StoreService.get_executors()}
+            now = time.time()
+            self._starting = {action_instance_id: started for action_instance_id, started in self._starting.items()
+                              if action_instance_id not in running and now - started < self.STARTING_GRACE}
+            self.communicator.renew_leases(self.app.rapid_config, sorted(running | set(self._starting)))
+
+            free_slots = self.app.rapid_config.executor_count - len(running) - len(self._starting)
+            if free_slots <= 0 or StoreService.is_updating(self.app):
+                return False
+
+            for work in self.communicator.lease_work(self.app.rapid_config, free_slots):
+                try:
+                    self.work_controller.start_work(work)
+                    self._starting[int(work['action_instance_id'])] = time.time()
+                except Exception as exception:
+                    logger.error("Could not start leased work {}: {}".format(work.get('action_instance_id'), exception))
+            return True
+        except Exception as exception:
+            logger.error(exception)
+        return False
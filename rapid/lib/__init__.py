@@ -82,7 +82,9 @@ def setup_config_from_file(app, args):
         IOC.register_global(master_configuration.MasterConfiguration, app.rapid_config)
 
     from .configuration import Configuration
+    from .http_sessions import HttpSessions
 
+    HttpSessions.configure(app.rapid_config.http_pool_size, app.rapid_config.http_idle_timeout)
     IOC.register_global('rapid_config', app.rapid_config)
     IOC.register_global(Configuration, app.rapid_config)
 
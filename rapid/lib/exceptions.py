@@ -91,10 +91,16 @@ class ECSConnectionError(Exception):
     pass
 
 
-class QueueHandlerShouldSleep(Exception):
+class PipelineLockTimeout(Exception):
     pass
 
 
+class QueueHandlerShouldSleep(Exception):
+    def __init__(self, message=None, throttled=False):
+        super(QueueHandlerShouldSleep, self).__init__(message)
+        self.throttled = throttled
+
+
 class InvalidProcessError(HTTPException):
     pass
 
@@ -0,0 +1,139 @@
+"""
+ Copyright (c) 2015 Michael Bright and Bamboo HR LLC
+
+ Licensed under the Apache License, Version 2.0 (the "License");
+ you may not use this file except in compliance with the License.
+ You may obtain a copy of the License at
+
+ http://www.apache.org/licenses/LICENSE-2.0
+
+ Unless required by applicable law or agreed to in writing, software
+ distributed under the License is distributed on an "AS IS" BASIS,
+ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ See the License for the specific language governing permissions and
+ limitations under the License.
+"""
+# pylint: disable=broad-except
+import json
+import logging
+import os
+import threading
+import time
+
+import psutil
+
+logger = logging.getLogger("rapid")
+
+
+class ExecutorRegistry(object):
+    """
+    The executors running in this client process, kept in memory so /work/request and the capacity checks read a
+    ready made snapshot instead of scanning the temp directory.
+
+    With a state file configured every change is written to it, and on start the executors of a previous process
+    whose pid is still alive are picked up again. Those recovered executors are dropped once their pid goes away,
+    checked at most every RECOVERED_CHECK seconds.
+    """
+    RECOVERED_CHECK = 5
+
+    _executors = {}
+    _snapshot = []
+    _recovered = set()
+    _last_recovered_check = 0
+    _state_file = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def configure(cls, state_file):
+        with cls._lock:
+            cls._state_file = state_file or None
+            cls._recover()
+
+    @classmethod
+    def register(cls, action_instance_id, pid):
+        with cls._lock:
+            cls._executors[str(action_instance_id)] = str(pid)
+            cls._recovered.discard(str(action_instance_id))
+            cls._changed()
+
+    @classmethod
+    def unregister(cls, action_instance_id):
+        with cls._lock:
+            if cls._executors.pop(str(action_instance_id), None) is not None:
+                cls._recovered.discard(str(action_instance_id))
+                cls._changed()
+
+    @classmethod
+    def get_executors(cls):
+        """
+        :return: [{'action_instance_id': str, 'pid': str}]
+        :rtype: list
+        """
+        if cls._recovered:
+            cls._prune_recovered(time.time())
+        return list(cls._snapshot)
+
+    @classmethod
+    def get_pid(cls, action_instance_id):
+        return cls._executors.get(str(action_instance_id))
+
+    @classmethod
+    def clear(cls):
+        with cls._lock:
+            cls._executors.clear()
+            cls._recovered.clear()
+            cls._changed()
+
+    @classmethod
+    def _prune_recovered(cls, now):
+        with cls._lock:
+            if now - cls._last_recovered_check < cls.RECOVERED_CHECK:
+                return
+            cls._last_recovered_check = now
+            finished = [action_instance_id for action_instance_id in cls._recovered if not cls._is_alive(cls._executors[action_instance_id])]
+            if finished:
+                for action_instance_id in finished:
+                    cls._recovered.discard(action_instance_id)
+                    del cls._executors[action_instance_id]
+                cls._changed()
+
+    @classmethod
+    def _changed(cls):
+        cls._snapshot = [{'action_instance_id': action_instance_id, 'pid': pid} for action_instance_id, pid in cls._executors.items()]
+        if cls._state_file:
+            try:
+                tmp_file = "{}.tmp".format(cls._state_file)
+                with open(tmp_file, 'w') as file_out:
+                    json.dump(cls._executors, file_out)
+                os.replace(tmp_file, cls._state_file)
+            except (IOError, OSError) as exception:
+                logger.error("Could not write the executor state file {}: {}".format(cls._state_file, exception))
+
+    @classmethod
+    def _recover(cls):
+        if cls._state_file:
+            try:
+                with open(cls._state_file) as file_in:
+                    for action_instance_id, pid in json.load(file_in).items():
+                        if action_instance_id not in cls._executors and cls._is_alive(pid):
+                            cls._executors[action_instance_id] = pid
+                            cls._recovered.add(action_instance_id)
+            except (IOError, OSError):
+                pass
+            except Exception as exception:
+                logger.error("Could not read the executor state file {}: {}".format(cls._state_file, exception))
+
+            directory = os.path.dirname(cls._state_file)
+            if directory and not os.path.isdir(directory):
+                try:
+                    os.makedirs(directory)
+                except OSError:
+                    pass
+        cls._changed()
+
+    @staticmethod
+    def _is_alive(pid):
+        try:
+            return psutil.pid_exists(int(pid))
+        except (TypeError, ValueError):
+            return False
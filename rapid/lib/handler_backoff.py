@@ -0,0 +1,107 @@
+"""
+ Copyright (c) 2015 Michael Bright and Bamboo HR LLC
+
+ Licensed under the Apache License, Version 2.0 (the "License");
+ you may not use this file except in compliance with the License.
+ You may obtain a copy of the License at
+
+ http://www.apache.org/licenses/LICENSE-2.0
+
+ Unless required by applicable law or agreed to in writing, software
+ distributed under the License is distributed on an "AS IS" BASIS,
+ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ See the License for the specific language governing permissions and
+ limitations under the License.
+"""
+import logging
+import random
+import time
+
+logger = logging.getLogger("rapid")
+
+
+class HandlerBackoff(object):
+    """
+    Decides whether a queue handler may be given work, kept across queue ticks.
+
+    Every failure reported by the handler (QueueHandlerShouldSleep) backs it off exponentially, with jitter, and
+    breaker_threshold failures in a row open the circuit for breaker_time seconds. Once that passes the circuit is half
+    open; the next success closes it, while a single failure opens it again.
+
+    When rate is set, work requests also take a token from a bucket refilled at rate per second, holding at most
+    burst tokens. A throttled failure halves the rate, which creeps back up with each success.
+    """
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    RECOVERY = 0.1
+
+    def __init__(self, name, backoff_time, max_backoff_time, breaker_threshold, breaker_time, rate=0, burst=1):
+        self.name = name
+        self.backoff_time = backoff_time
+        self.max_backoff_time = max_backoff_time
+        self.breaker_threshold = breaker_threshold
+        self.breaker_time = breaker_time
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self.tokens = self.burst
+        self.state = self.CLOSED
+        self.failures = 0
+        self.resume_at = 0
+        self.last_refill = None
+
+    def allow(self, now=None, take_token=False):
+        now = now if now is not None else time.time()
+        if now < self.resume_at:
+            return False
+
+        if self.state == self.OPEN:
+            self.state = self.HALF_OPEN
+            logger.info("Queue handler {} circuit half open, trying it again.".format(self.name))
+
+        if take_token and self.rate:
+            return self._take_token(now)
+        return True
+
+    def record_success(self):
+        if self.state != self.CLOSED:
+            logger.info("Queue handler {} circuit closed.".format(self.name))
+        self.state = self.CLOSED
+        self.failures = 0
+        self.resume_at = 0
+        if self.rate:
+            self.rate = min(self.max_rate, self.rate + self.max_rate * self.RECOVERY)
+
+    def record_failure(self, now=None, throttled=False):
+        """
+        :return: how many seconds the handler is backed off for
+        :rtype: float
+        """
+        now = now if now is not None else time.time()
+        self.failures += 1
+        if throttled and self.rate:
+            self.rate = max(self.rate / 2.0, self.max_rate * self.RECOVERY)
+
+        if self.state == self.HALF_OPEN or self.failures >= self.breaker_threshold:
+            if self.state != self.OPEN:
+                logger.warning("Queue handler {} circuit open for {} seconds after {} failures.".format(self.name, self.breaker_time, self.failures))
+            self.state = self.OPEN
+            delay = self.breaker_time
+        else:
+            delay = min(self.backoff_time * 2 ** (self.failures - 1), self.max_backoff_time)
+            delay = random.uniform(delay / 2.0, delay)
+
+        self.resume_at = now + delay
+        return delay
+
+    def _take_token(self, now):
+        if self.last_refill is not None:
+            self.tokens = min(self.burst, self.tokens + (now - self.last_refill) * self.rate)
+        self.last_refill = now
+
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
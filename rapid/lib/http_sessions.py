@@ -0,0 +1,90 @@
+"""
+ Copyright (c) 2015 Michael Bright and Bamboo HR LLC
+
+ Licensed under the Apache License, Version 2.0 (the "License");
+ you may not use this file except in compliance with the License.
+ You may obtain a copy of the License at
+
+ http://www.apache.org/licenses/LICENSE-2.0
+
+ Unless required by applicable law or agreed to in writing, software
+ distributed under the License is distributed on an "AS IS" BASIS,
+ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ See the License for the specific language governing permissions and
+ limitations under the License.
+"""
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class HttpSessions(object):
+    """
+    Keep-alive requests sessions, one per remote host, shared by everything in the process that talks to it so
+    connections (and TLS handshakes) are reused. They are kept here rather than on the Client objects, which are
+    pickled into the client store. Sessions unused for IDLE_TIMEOUT seconds are closed.
+    """
+    POOL_SIZE = 10
+    IDLE_TIMEOUT = 300
+
+    _sessions = {}
+    _lock = threading.Lock()
+    _last_sweep = 0
+
+    @classmethod
+    def configure(cls, pool_size, idle_timeout):
+        with cls._lock:
+            if (pool_size, idle_timeout) != (cls.POOL_SIZE, cls.IDLE_TIMEOUT):
+                cls.POOL_SIZE = pool_size
+                cls.IDLE_TIMEOUT = idle_timeout
+                cls._close_all()
+
+    @classmethod
+    def get_session(cls, host):
+        """
+        :param host: scheme://address:port of the remote side
+        :rtype: requests.Session
+        """
+        now = time.time()
+        with cls._lock:
+            if now - cls._last_sweep > cls.IDLE_TIMEOUT:
+                cls._last_sweep = now
+                cls._close_idle(now)
+
+            try:
+                entry = cls._sessions[host]
+            except KeyError:
+                entry = cls._sessions[host] = [cls._create_session(), now]
+            entry[1] = now
+            return entry[0]
+
+    @classmethod
+    def close(cls, host=None):
+        with cls._lock:
+            if host is None:
+                cls._close_all()
+            elif host in cls._sessions:
+                cls._sessions.pop(host)[0].close()
+
+    @classmethod
+    def _create_session(cls):
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=cls.POOL_SIZE)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    @classmethod
+    def _close_idle(cls, now):
+        for host, (session, last_used) in list(cls._sessions.items()):
+            if now - last_used > cls.IDLE_TIMEOUT:
+                del cls._sessions[host]
+                session.close()
+
+    @classmethod
+    def _close_all(cls):
+        for session, _ in cls._sessions.values():
+            session.close()
+        cls._sessions.clear()
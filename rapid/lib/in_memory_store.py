@@ -13,12 +13,21 @@ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 See the License for the specific language governing permissions and
 limitations under the License.
 """
+import threading
 
 
 class InMemoryStore(dict):
+    _lock = threading.RLock()
+
+    def lock(self):
+        self._lock.acquire()
+
+    def unlock(self):
+        self._lock.release()
 
     def cache_update(self, key, value):
         self[key] = value
+        return True
 
     def cache_get(self, key):
         return self[key]
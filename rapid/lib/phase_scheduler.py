@@ -0,0 +1,87 @@
+"""
+ Copyright (c) 2015 Michael Bright and Bamboo HR LLC
+
+ Licensed under the Apache License, Version 2.0 (the "License");
+ you may not use this file except in compliance with the License.
+ You may obtain a copy of the License at
+
+ http://www.apache.org/licenses/LICENSE-2.0
+
+ Unless required by applicable law or agreed to in writing, software
+ distributed under the License is distributed on an "AS IS" BASIS,
+ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ See the License for the specific language governing permissions and
+ limitations under the License.
+"""
+# pylint: disable=broad-except,too-few-public-methods
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from rapid.lib.queue_metrics import QueueMetrics
+
+logger = logging.getLogger("rapid")
+
+
+class Phase(object):
+    def __init__(self, name, target, interval, timeout):
+        self.name = name
+        self.target = target
+        self.interval = interval
+        self.timeout = timeout
+        self.last_start = 0
+        self.future = None
+        self.timed_out = False
+
+    def is_running(self):
+        return self.future is not None and not self.future.done()
+
+    def next_run(self):
+        return self.last_start + self.interval
+
+
+class PhaseScheduler(object):
+    """
+    Runs each phase on its own interval on a small pool of worker threads. A phase never overlaps
+    itself; while a run is still going the phase is skipped, and a run going past its timeout is
+    logged, without holding up any of the other phases.
+    """
+    MAX_WAIT = 1
+
+    def __init__(self, phases, workers):
+        self.phases = phases
+        self.executor = ThreadPoolExecutor(max_workers=max(workers, 1))
+
+    def run(self):
+        while True:
+            self.run_pending()
+            time.sleep(self.get_wait_time())
+
+    def run_pending(self, now=None):
+        now = now if now is not None else time.time()
+        for phase in self.phases:
+            if phase.is_running():
+                if not phase.timed_out and now - phase.last_start > phase.timeout:
+                    phase.timed_out = True
+                    logger.warning("Queue phase {} has been running for over {} seconds".format(phase.name, phase.timeout))
+                continue
+
+            if now >= phase.next_run():
+                phase.last_start = now
+                phase.timed_out = False
+                phase.future = self.executor.submit(self._run_phase, phase)
+
+    def get_wait_time(self, now=None):
+        now = now if now is not None else time.time()
+        waiting = [phase.next_run() - now for phase in self.phases if not phase.is_running()]
+        return max(min(waiting + [self.MAX_WAIT]), 0)
+
+    @staticmethod
+    def _run_phase(phase):
+        start = time.time()
+        try:
+            phase.target()
+        except Exception as exception:
+            logger.exception("Queue phase {} failed: {}".format(phase.name, exception))
+        QueueMetrics.record_phase(phase.name, time.time() - start)
+        QueueMetrics.publish()
@@ -0,0 +1,139 @@
+"""
+ Copyright (c) 2015 Michael Bright and Bamboo HR LLC
+
+ Licensed under the Apache License, Version 2.0 (the "License");
+ you may not use this file except in compliance with the License.
+ You may obtain a copy of the License at
+
+ http://www.apache.org/licenses/LICENSE-2.0
+
+ Unless required by applicable law or agreed to in writing, software
+ distributed under the License is distributed on an "AS IS" BASIS,
+ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ See the License for the specific language governing permissions and
+ limitations under the License.
+"""
+import datetime
+import os
+import socket
+import threading
+import time
+from collections import deque
+
+from rapid.lib.store_service import StoreService
+
+
+class QueueMetrics(object):
+    """
+    Timings and counts recorded by the master queue, kept in bounded ring buffers of the last SIZE samples.
+
+    Every process records into its own buffers and publishes a summary, at most every PUBLISH_INTERVAL
+    seconds, to the shared cache so whichever uWSGI worker serves /api/queue/metrics can report on all of them.
+    """
+    SIZE = 500
+    HISTORY = 60
+    PUBLISH_INTERVAL = 1
+    STALE_AFTER = 600
+
+    _lock = threading.Lock()
+    _phases = {}
+    _ticks = deque(maxlen=SIZE)
+    _ready_waits = deque(maxlen=SIZE)
+    _counts = {'dispatched': 0, 'leased': 0, 'probes': 0, 'probe_failures': 0}
+    _last_tick_dispatched = 0
+    _last_publish = 0
+
+    @classmethod
+    def record_phase(cls, name, duration):
+        with cls._lock:
+            if name not in cls._phases:
+                cls._phases[name] = deque(maxlen=cls.SIZE)
+            cls._phases[name].append(duration)
+
+    @classmethod
+    def record_probe(cls, failed=False):
+        with cls._lock:
+            cls._counts['probes'] += 1
+            if failed:
+                cls._counts['probe_failures'] += 1
+
+    @classmethod
+    def record_dispatch(cls, queued_dates, leased=False):
+        """
+        :param queued_dates: when each dispatched action instance was put on the ready queue, None if unknown
+        :param leased: True when the work went to a pull mode client
+        """
+        now = datetime.datetime.utcnow()
+        with cls._lock:
+            for queued_date in queued_dates:
+                cls._counts['leased' if leased else 'dispatched'] += 1
+                if queued_date is not None:
+                    cls._ready_waits.append(max((now - queued_date).total_seconds(), 0))
+
+    @classmethod
+    def record_tick(cls, considered):
+        """
+        Close out a dispatch pass that looked at considered work requests.
+        """
+        with cls._lock:
+            dispatched = cls._counts['dispatched'] - cls._last_tick_dispatched
+            cls._last_tick_dispatched = cls._counts['dispatched']
+            cls._ticks.append((time.time(), considered, dispatched))
+
+    @classmethod
+    def get_summary(cls):
+        with cls._lock:
+            ticks = list(cls._ticks)
+            return {'updated': time.time(),
+                    'phases': {name: cls.percentiles(durations) for name, durations in cls._phases.items()},
+                    'considered': cls.percentiles([tick[1] for tick in ticks]),
+                    'dispatched_per_tick': cls.percentiles([tick[2] for tick in ticks]),
+                    'ready_wait': cls.percentiles(cls._ready_waits),
+                    'counts': dict(cls._counts),
+                    'queue_depth': [{'time': tick[0], 'considered': tick[1], 'dispatched': tick[2]} for tick in ticks[-cls.HISTORY:]]}
+
+    @classmethod
+    def publish(cls, force=False):
+        if not force and time.time() - cls._last_publish < cls.PUBLISH_INTERVAL:
+            return
+        cls._last_publish = time.time()
+
+        metrics = StoreService.get_queue_metrics() or {}
+        metrics = {name: summary for name, summary in metrics.items() if cls._last_publish - summary.get('updated', 0) < cls.STALE_AFTER}
+        metrics[cls.get_process_name()] = cls.get_summary()
+        StoreService.save_queue_metrics(metrics)
+
+    @classmethod
+    def get_metrics(cls):
+        cls.publish(force=True)
+        return StoreService.get_queue_metrics() or {}
+
+    @staticmethod
+    def get_process_name():
+        return "{}:{}".format(socket.gethostname(), os.getpid())
+
+    @staticmethod
+    def percentiles(values):
+        values = sorted(values)
+        if not values:
+            return {'count': 0}
+
+        def _percentile(percent):
+            return values[min(int(round(percent / 100.0 * (len(values) - 1))), len(values) - 1)]
+
+        return {'count': len(values),
+                'p50': _percentile(50),
+                'p90': _percentile(90),
+                'p99': _percentile(99),
+                'max': values[-1]}
+
+    @classmethod
+    def reset(cls):
+        with cls._lock:
+            cls._phases.clear()
+            cls._ticks.clear()
+            cls._ready_waits.clear()
+            for key in cls._counts:
+                cls._counts[key] = 0
+            cls._last_tick_dispatched = 0
+            cls._last_publish = 0
@@ -0,0 +1,77 @@
+"""
+ Copyright (c) 2015 Michael Bright and Bamboo HR LLC
+
+ Licensed under the Apache License, Version 2.0 (the "License");
+ you may not use this file except in compliance with the License.
+ You may obtain a copy of the License at
+
+ http://www.apache.org/licenses/LICENSE-2.0
+
+ Unless required by applicable law or agreed to in writing, software
+ distributed under the License is distributed on an "AS IS" BASIS,
+ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ See the License for the specific language governing permissions and
+ limitations under the License.
+"""
+import threading
+import time
+
+from rapid.lib.store_service import StoreService
+
+
+class QueueNotifier(object):
+    """
+    Wakes the master queue thread when something happened that could produce dispatchable work.
+
+    Signals raised in the same process are delivered through a threading.Event. Signals raised in
+    other uWSGI workers are delivered through a key in the shared cache, which is checked every
+    CHECK_INTERVAL seconds while waiting.
+    """
+    CHECK_INTERVAL = 0.25
+
+    _event = threading.Event()
+    _last_signal = None
+
+    @classmethod
+    def notify(cls):
+        cls._event.set()
+        StoreService.set_queue_signal()
+
+    @classmethod
+    def wait(cls, timeout):
+        """
+        Block until notified or until timeout seconds have passed.
+        :param timeout: seconds to wait
+        :return: True if a signal was received, False if the timeout elapsed
+        :rtype: bool
+        """
+        deadline = time.time() + max(timeout, 0)
+        while True:
+            if cls._event.wait(max(min(cls.CHECK_INTERVAL, deadline - time.time()), 0)):
+                cls._event.clear()
+                cls._last_signal = StoreService.get_queue_signal()
+                return True
+
+            signal = StoreService.get_queue_signal()
+            if signal != cls._last_signal:
+                cls._last_signal = signal
+                return True
+
+            if time.time() >= deadline:
+                return False
+
+    @classmethod
+    def wait_for_signal(cls, last_signal, timeout):
+        """
+        Block until the shared signal moves past last_signal, without consuming it for the queue thread.
+        :param last_signal: value of StoreService.get_queue_signal() seen by the caller
+        :param timeout: seconds to wait
+        :return: True if a signal was received, False if the timeout elapsed
+        :rtype: bool
+        """
+        deadline = time.time() + max(timeout, 0)
+        while StoreService.get_queue_signal() == last_signal:
+            if time.time() >= deadline:
+                return False
+            time.sleep(max(min(cls.CHECK_INTERVAL, deadline - time.time()), 0))
+        return True
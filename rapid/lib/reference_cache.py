@@ -0,0 +1,113 @@
+"""
+ Copyright (c) 2015 Michael Bright and Bamboo HR LLC
+
+ Licensed under the Apache License, Version 2.0 (the "License");
+ you may not use this file except in compliance with the License.
+ You may obtain a copy of the License at
+
+ http://www.apache.org/licenses/LICENSE-2.0
+
+ Unless required by applicable law or agreed to in writing, software
+ distributed under the License is distributed on an "AS IS" BASIS,
+ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ See the License for the specific language governing permissions and
+ limitations under the License.
+"""
+import threading
+from collections import OrderedDict
+
+from rapid.lib.store_service import StoreService
+
+
+class ReferenceCache(object):
+    """
+    Read through cache of small, rarely changing tables, kept per process and keyed by table name. Values are
+    serialized rows so they can be shared between sessions.
+
+    Every table has a version stamp in the StoreService, bumped by invalidate, so a change made through one worker
+    empties the cached table in all of them. Missing rows (a loader returning None) are not cached.
+
+    Tables listed in SIZES are not small, only a working set of them is kept: the least recently used entries are
+    dropped past that many.
+    """
+    TABLES = ('statuses', 'statistics', 'vcs', 'pipeline_events', 'qa_tests')
+    SIZES = {'qa_tests': 100000}
+
+    _entries = {}
+    _versions = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def get(cls, table, key, loader):
+        entries = cls._get_entries(table)
+        try:
+            return cls._lookup(table, entries, [key])[key]
+        except KeyError:
+            value = loader()
+            if value is not None:
+                cls._store(table, entries, {key: value})
+            return value
+
+    @classmethod
+    def get_many(cls, table, keys, loader):
+        """
+        :param loader: called with the keys that are not cached, returns {key: value} for the ones it found
+        :rtype: dict
+        """
+        entries = cls._get_entries(table)
+        found = cls._lookup(table, entries, keys)
+        missing = [key for key in keys if key not in found]
+        if missing:
+            loaded = {key: value for key, value in loader(missing).items() if value is not None}
+            cls._store(table, entries, loaded)
+            found.update(loaded)
+        return found
+
+    @classmethod
+    def put(cls, table, key, value):
+        cls._store(table, cls._get_entries(table), {key: value})
+
+    @classmethod
+    def invalidate(cls, table):
+        if table in cls.TABLES:
+            StoreService.set_reference_version(table)
+            with cls._lock:
+                cls._entries.pop(table, None)
+                cls._versions.pop(table, None)
+
+    @classmethod
+    def clear(cls):
+        with cls._lock:
+            cls._entries.clear()
+            cls._versions.clear()
+
+    @classmethod
+    def _get_entries(cls, table):
+        version = StoreService.get_reference_version(table)
+        with cls._lock:
+            if table not in cls._entries or cls._versions.get(table) != version:
+                cls._entries[table] = OrderedDict() if table in cls.SIZES else {}
+                cls._versions[table] = version
+            return cls._entries[table]
+
+    @classmethod
+    def _lookup(cls, table, entries, keys):
+        if table not in cls.SIZES:
+            return {key: entries[key] for key in keys if key in entries}
+        with cls._lock:
+            found = {key: entries[key] for key in keys if key in entries}
+            for key in found:
+                entries.move_to_end(key)
+            return found
+
+    @classmethod
+    def _store(cls, table, entries, values):
+        if table in cls.SIZES:
+            with cls._lock:
+                entries.update(values)
+                for key in values:
+                    entries.move_to_end(key)
+                while len(entries) > cls.SIZES[table]:
+                    entries.popitem(last=False)
+        else:
+            entries.update(values)
@@ -14,13 +14,14 @@
  limitations under the License.
 """
 # pylint: disable=broad-except,protected-access
-import os
+import json
+import time
 import logging
-import tempfile
+from contextlib import contextmanager
 
 import jsonpickle
-import psutil
 
+from rapid.lib.executor_registry import ExecutorRegistry
 from rapid.lib.in_memory_store import InMemoryStore
 
 logger = logging.getLogger("rapid")
@@ -32,70 +33,127 @@ except ImportError:
 
 
 class StoreService(object):
+    _clients_version = None
+    _client_records = {}
 
     @staticmethod
     def get_executors():
-        executors = []
-        try:
-            tmp_dir = tempfile.gettempdir()
-            for filename in os.listdir(tmp_dir):
-                try:
-                    _sp = filename.split('-')
-                    if _sp[0] == 'rapid':
-                        try:
-                            if int(_sp[2]) in psutil.pids():
-                                executors.append({'action_instance_id': _sp[1], 'pid': _sp[2]})
-                            else:
-                                os.remove(os.path.join(tmp_dir, filename))
-                        except (IndexError, TypeError, OSError):
-                            pass
-                except Exception:
-                    pass
-        except Exception as exception:
-            logger.exception(exception)
-        return executors
-
-    @staticmethod
-    def _get_tempfile_name(executor):
-        return os.path.join(tempfile.gettempdir(), "rapid-{}-{}".format(executor.work_request.action_instance_id, executor.pid))
+        return ExecutorRegistry.get_executors()
 
     @staticmethod
     def clear_executor(executor):
-        try:
-            os.remove(StoreService._get_tempfile_name(executor))
-        except OSError:
-            pass
+        ExecutorRegistry.unregister(executor.work_request.action_instance_id)
 
     @staticmethod
     def save_executor(executor):
-        try:
-            with open(StoreService._get_tempfile_name(executor), 'w') as file_out:
-                file_out.write("{}".format(executor.pid))
-        except IOError as exception:
-            logger.exception(exception)
+        ExecutorRegistry.register(executor.work_request.action_instance_id, executor.pid)
 
     @staticmethod
-    def save_clients(clients, app):
+    def save_clients(clients, app):  # pylint: disable=unused-argument
+        """
+        Replace the whole client registry with clients. Registering or dropping a single client should go through
+        save_client and remove_clients instead, which only touch the entries that changed.
+        """
+        with StoreService.__clients_lock():
+            removed = set(StoreService._get_client_ids()) - set(clients)
+            for ip_address, client in list(clients.items()):
+                StoreService.__set_key(StoreService._get_client_key(ip_address), StoreService._dump_client(client))
+            for ip_address in removed:
+                StoreService.__clear_key(StoreService._get_client_key(ip_address))
+            StoreService.__set_key('_rapidci_client_ids', json.dumps(list(clients)))
+            StoreService.__bump_clients_version()
+
+    @staticmethod
+    def save_client(ip_address, client):
+        with StoreService.__clients_lock():
+            StoreService.__set_key(StoreService._get_client_key(ip_address), StoreService._dump_client(client))
+            client_ids = StoreService._get_client_ids()
+            if ip_address not in client_ids:
+                StoreService.__set_key('_rapidci_client_ids', json.dumps(client_ids + [ip_address]))
+            StoreService.__bump_clients_version()
+
+    @staticmethod
+    def remove_clients(ip_addresses):
+        if not ip_addresses:
+            return
+        with StoreService.__clients_lock():
+            for ip_address in ip_addresses:
+                StoreService.__clear_key(StoreService._get_client_key(ip_address))
+            StoreService.__set_key('_rapidci_client_ids', json.dumps([ip_address for ip_address in StoreService._get_client_ids() if ip_address not in ip_addresses]))
+            StoreService.__bump_clients_version()
+
+    @staticmethod
+    def get_clients_version():
         try:
-            uwsgi.cache_update("_rapidci_clients", jsonpickle.dumps(clients))
-        except (AttributeError, NameError) as exception:
-            logger.exception(exception)
-            app.rapid_config.clients = clients
+            return StoreService.get_key('_rapidci_clients_version')
+        except Exception:
+            return None
 
     @staticmethod
-    def get_clients(app):
+    def get_clients(app):  # pylint: disable=unused-argument
         """
+        Clients are decoded once per version of the registry; only the entries whose record changed since the last
+        version are decoded again. Every call hands out new Client objects, as callers mark them asleep or inactive.
         :param app:
         :type app:
         :return:
         :rtype: dict
         """
+        from rapid.master.communicator.client import Client
+        version = StoreService.get_clients_version()
+        if version is None or version != StoreService._clients_version:
+            records = {}
+            for ip_address in StoreService._get_client_ids():
+                record = StoreService.get_key(StoreService._get_client_key(ip_address))
+                if record is None:
+                    continue
+                cached = StoreService._client_records.get(ip_address)
+                if cached is not None and cached[0] == record:
+                    records[ip_address] = cached
+                else:
+                    try:
+                        records[ip_address] = (record, json.loads(record))
+                    except ValueError as exception:
+                        logger.exception(exception)
+            StoreService._client_records = records
+            StoreService._clients_version = version
+        return {ip_address: Client.from_state(state) for ip_address, (_, state) in list(StoreService._client_records.items())}
+
+    @staticmethod
+    def _get_client_key(ip_address):
+        return '_rapidci_client_{}'.format(ip_address)
+
+    @staticmethod
+    def _get_client_ids():
+        try:
+            return json.loads(StoreService.get_key('_rapidci_client_ids'))
+        except Exception:
+            return []
+
+    @staticmethod
+    def _dump_client(client):
+        return json.dumps(client.__getstate__(), separators=(',', ':'))
+
+    @staticmethod
+    def __bump_clients_version():
+        StoreService.__set_key('_rapidci_clients_version', "{}".format(time.time()))
+
+    @staticmethod
+    @contextmanager
+    def __clients_lock():
+        """
+        Guards the client id index, which is read and written back by every worker that registers a client.
+        """
         try:
-            return jsonpickle.loads(StoreService.get_key('_rapidci_clients'))
+            uwsgi.lock()
+            locked = True
         except Exception:
-            if not hasattr(app.rapid_config, 'clients'):
-                app.rapid_config.clients = {}
-            return app.rapid_config.clients
+            locked = False
+        try:
+            yield
+        finally:
+            if locked:
+                uwsgi.unlock()
 
     @staticmethod
     def save_master_key(app, api_key):  # pylint: disable=unused-argument
@@ -123,15 +181,8 @@ class StoreService(object):
             return app.rapid_config._rapidci_updating if hasattr(app.rapid_config, "_rapidci_updating") else False
 
     @staticmethod
-    def check_for_pidfile(action_instance_id):
-        try:
-            pid_name = 'rapid-{}'.format(action_instance_id)
-            for filename in os.listdir(tempfile.gettempdir()):
-                if pid_name in filename:
-                    return filename
-        except OSError:
-            pass
-        return None
+    def get_executor_pid(action_instance_id):
+        return ExecutorRegistry.get_pid(action_instance_id)
 
     @staticmethod
     def is_completing(action_instance_id):
@@ -146,16 +197,42 @@ class StoreService(object):
         return StoreService.__clear_key("_completing_{}".format(action_instance_id))
 
     @staticmethod
-    def set_calculating_workflow(pipeline_instance_id):
-        return StoreService.__set_key('_calculating_{}'.format(pipeline_instance_id), "true")
-        
+    def set_queue_signal():
+        return StoreService.__set_key('_rapidci_queue_signal', "{}".format(time.time()))
+
     @staticmethod
-    def is_calculating_workflow(pipeline_instance_id):
-        return StoreService.__is_by_key('_calculating_{}'.format(pipeline_instance_id), 'true')
+    def get_queue_signal():
+        return StoreService.get_key('_rapidci_queue_signal')
 
     @staticmethod
-    def clear_calculating_workflow(pipeline_instance_id):
-        return StoreService.__clear_key('_calculating_{}'.format(pipeline_instance_id))
+    def set_reference_version(table):
+        return StoreService.__set_key('_rapidci_reference_{}'.format(table), "{}".format(time.time()))
+
+    @staticmethod
+    def get_reference_version(table):
+        return StoreService.get_key('_rapidci_reference_{}'.format(table))
+
+    @staticmethod
+    def save_client_heartbeat(ip_address, heartbeat):
+        return StoreService.__set_key('_rapidci_heartbeat_{}'.format(ip_address), jsonpickle.dumps(heartbeat))
+
+    @staticmethod
+    def get_client_heartbeat(ip_address):
+        try:
+            return jsonpickle.loads(StoreService.get_key('_rapidci_heartbeat_{}'.format(ip_address)))
+        except Exception:
+            return None
+
+    @staticmethod
+    def save_queue_metrics(metrics):
+        return StoreService.__set_key('_rapidci_queue_metrics', jsonpickle.dumps(metrics))
+
+    @staticmethod
+    def get_queue_metrics():
+        try:
+            return jsonpickle.loads(StoreService.get_key('_rapidci_queue_metrics'))
+        except Exception:
+            return None
 
     @staticmethod
     def __is_by_key(key, value):
@@ -168,10 +245,11 @@ class StoreService(object):
     @staticmethod
     def __set_key(key, value):
         try:
-            uwsgi.cache_update(key, value)
-            return True
+            if uwsgi.cache_update(key, value):
+                return True
+            logger.warning("FAILED TO set cache-key: {}, the cache may be full.".format(key))
         except Exception:
-            pass
+            logger.warning("FAILED TO set cache-key: {}".format(key))
         return False
 
     @staticmethod
@@ -74,6 +74,11 @@ def configure_application(flask_app, args, manual_db_upgrade=False):
         else:
             run_db_upgrades(flask_app)
             setup_queue_thread(flask_app)
+    elif flask_app.rapid_config.queue_all_workers and not manual_db_upgrade and not args.db_downgrade:
+        setup_queue_thread(flask_app, housekeeping=False)
+
+    if flask_app.rapid_config.completion_journal and not manual_db_upgrade and not args.db_downgrade:
+        setup_completion_workers(flask_app)
     load_extensions(flask_app)
 
 
@@ -116,7 +121,7 @@ def configure_sub_modules(flask_app, args):  # pylint: disable=unused-argument
     logger.info("------- Done --------")
 
 
-def setup_queue_thread(flask_app):
+def setup_queue_thread(flask_app, housekeeping=True):
     if flask_app.rapid_config.queue_manager:
         import os
         logger.info("Setting up master queue thread: [{}]".format(os.getpid()))
@@ -124,41 +129,111 @@ def setup_queue_thread(flask_app):
         thread.daemon = True
         thread.start()
 
+        if housekeeping:
+            thread = threading.Thread(target=run_housekeeping, args=[flask_app])
+            thread.daemon = True
+            thread.start()
+
 
 def run_queue(flask_app):
+    from rapid.lib.queue_metrics import QueueMetrics
+    from rapid.lib.queue_notifier import QueueNotifier
     from rapid.lib.store_service import StoreService
     from rapid.workflow.queue import Queue
     with flask_app.app_context():
         queue = IOC.get_class_instance(Queue)  # type: Queue
+        rapid_config = flask_app.rapid_config
+        dispatch_time = rapid_config.queue_fallback_time if rapid_config.queue_event_driven else rapid_config.queue_time
+        last_dispatch = 0
+        signaled = True
         while True:
-            clients = []
-            try:
-                clients = StoreService.get_clients(flask_app)
-            except:
-                pass
-
-            try:
-                queue.process_queue(clients)
-            except Exception as exception:
-                logger.error(exception)
-
-            try:
-                queue.verify_still_working(clients)
-            except Exception as exception:
-                logger.error(exception)
-
-            try:
-                queue.reconcile_pipeline_instances()
-            except Exception as exception:
-                logger.error(exception)
-
-            try:
-                queue.reconcile_releases()
-            except Exception as exception:
-                logger.exception(exception)
-
-            filtered_clients = {name: client for name, client in list(clients.items()) if not hasattr(client, 'no-longer-active')}
-
-            if filtered_clients != clients:
-                StoreService.save_clients(filtered_clients, flask_app)
-            time.sleep(flask_app.rapid_config.queue_time)
+            if signaled or time.time() - last_dispatch >= dispatch_time:
+                last_dispatch = time.time()
+                clients = {}
+                try:
+                    clients = StoreService.get_clients(flask_app)
+                except:
+                    pass
+
+                try:
+                    queue.process_queue(clients)
+                except Exception as exception:
+                    logger.error(exception)
+                QueueMetrics.record_phase('dispatch', time.time() - last_dispatch)
+                QueueMetrics.publish()
+
+                expire_clients(flask_app, clients)
+
+            wait_time = last_dispatch + dispatch_time - time.time()
+            if rapid_config.queue_event_driven:
+                signaled = QueueNotifier.wait(wait_time)
+            else:
+                time.sleep(max(wait_time, 0))
+
+
+def setup_completion_workers(flask_app):
+    logger.info("Setting up {} completion workers".format(flask_app.rapid_config.completion_workers))
+    for index in range(max(flask_app.rapid_config.completion_workers, 1)):
+        thread = threading.Thread(target=run_completion_worker, args=[flask_app], name="rapid-completion-{}".format(index))
+        thread.daemon = True
+        thread.start()
+
+
+def run_completion_worker(flask_app):
+    from rapid.workflow.action_instances_service import ActionInstanceService
+    from rapid.workflow.completion_worker import CompletionWorker
+    from rapid.workflow.data.dal.ready_queue_dal import ReadyQueueDal
+    with flask_app.app_context():
+        action_instance_service = IOC.get_class_instance(ActionInstanceService)  # type: ActionInstanceService
+        rapid_config = flask_app.rapid_config
+        CompletionWorker(action_instance_service.drain_completions,
+                         "{}:{}".format(ReadyQueueDal.get_claimant(), threading.current_thread().name),
+                         rapid_config.completion_batch_size,
+                         rapid_config.completion_claim_time).run()
+
+
+def expire_clients(flask_app, clients):  # pylint: disable=unused-argument
+    from rapid.lib.store_service import StoreService
+    StoreService.remove_clients([name for name, client in list(clients.items()) if hasattr(client, 'no-longer-active')])
+
+
+def run_housekeeping(flask_app):
+    from rapid.lib.phase_scheduler import PhaseScheduler
+    with flask_app.app_context():
+        PhaseScheduler(get_housekeeping_phases(flask_app), flask_app.rapid_config.queue_workers).run()
+
+
+def get_housekeeping_phases(flask_app):
+    """
+    The queue's housekeeping, split into phases that each run on their own cadence so a slow probe
+    or a long reconcile never delays the others, nor dispatch which has its own thread in run_queue.
+    """
+    from rapid.lib.phase_scheduler import Phase
+    from rapid.lib.store_service import StoreService
+    from rapid.workflow.queue import Queue
+    queue = IOC.get_class_instance(Queue)  # type: Queue
+    rapid_config = flask_app.rapid_config
+
+    def in_app_context(*steps):
+        def run_steps():
+            with flask_app.app_context():
+                for step in steps:
+                    try:
+                        step()
+                    except Exception as exception:
+                        logger.exception(exception)
+        return run_steps
+
+    def verify_still_working():
+        clients = StoreService.get_clients(flask_app)
+        try:
+            queue.verify_still_working(clients)
+        finally:
+            expire_clients(flask_app, clients)
+
+    return [Phase('verify', in_app_context(verify_still_working),
+                  rapid_config.queue_verify_time, rapid_config.queue_verify_timeout),
+            Phase('reconcile', in_app_context(queue.reconcile_pipeline_instances, queue.reconcile_ready_queue, queue.expire_leases),
+                  rapid_config.queue_reconcile_time, rapid_config.queue_reconcile_timeout),
+            Phase('release', in_app_context(queue.reconcile_releases),
+                  rapid_config.queue_release_time, rapid_config.queue_release_timeout)]
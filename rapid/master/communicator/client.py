@@ -13,14 +13,14 @@
  See the License for the specific language governing permissions and
  limitations under the License.
 """
-import requests
+from rapid.lib.http_sessions import HttpSessions
 from rapid.lib.version import Version
 # pylint: disable=too-many-instance-attributes
 
 
 class Client(object):
 
-    def __init__(self, ip_address, port, grains, grain_restrict, api_key=None, is_ssl=False, hostname=None, time_elapse=0.5):
+    def __init__(self, ip_address, port, grains, grain_restrict, api_key=None, is_ssl=False, hostname=None, time_elapse=0.5, pull=False):
         self.ip_address = ip_address
         self.is_ssl = is_ssl
         self.port = port
@@ -29,12 +29,19 @@ class Client(object):
         self.sleep = False
         self.api_key = api_key
         self.hostname = hostname
+        self.pull = pull
         self.time_elapse = ((time_elapse / 1000) + 0.5) if time_elapse > 1 else time_elapse
 
     def __getstate__(self):
         state = self.__dict__.copy()
         return state
 
+    @classmethod
+    def from_state(cls, state):
+        client = cls.__new__(cls)
+        client.__dict__.update(state)
+        return client
+
     def get_headers(self):
         return {'X-Rapidci-Version': Version.get_version(), 'Content-Type': 'application/json', 'X-Rapidci-Api-Key': self.api_key}
 
@@ -73,10 +80,16 @@ class Client(object):
         return "{}://{}/status".format(self._get_prefix(), self.get_uri())
 
     def send_work(self, work_request, verify_certs=True):
-        return requests.post(self.get_work_uri(), json=work_request.__dict__, headers=self.get_headers(), verify=verify_certs, timeout=4)
+        return self.get_session().post(self.get_work_uri(), json=work_request.__dict__, headers=self.get_headers(), verify=verify_certs, timeout=4)
+
+    def send_work_batch(self, work_requests, verify_certs=True):
+        return self.get_session().post(self.get_work_uri(), json=[work_request.__dict__ for work_request in work_requests], headers=self.get_headers(), verify=verify_certs, timeout=4)
 
     def cancel_work(self, action_instance_id, verify_certs=True):
-        return requests.post(self.get_cancel_uri(action_instance_id), headers=self.get_headers(), verify=verify_certs, timeout=4)
+        return self.get_session().post(self.get_cancel_uri(action_instance_id), headers=self.get_headers(), verify=verify_certs, timeout=4)
+
+    def get_session(self):
+        return HttpSessions.get_session("{}://{}".format(self._get_prefix(), self.get_uri()))
 
     def get_uri(self):
         return "{}:{}".format(self.ip_address, self.port)
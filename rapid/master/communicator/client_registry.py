@@ -0,0 +1,74 @@
+"""
+ Copyright (c) 2015 Michael Bright and Bamboo HR LLC
+
+ Licensed under the Apache License, Version 2.0 (the "License");
+ you may not use this file except in compliance with the License.
+ You may obtain a copy of the License at
+
+ http://www.apache.org/licenses/LICENSE-2.0
+
+ Unless required by applicable law or agreed to in writing, software
+ distributed under the License is distributed on an "AS IS" BASIS,
+ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ See the License for the specific language governing permissions and
+ limitations under the License.
+"""
+import time
+
+from rapid.lib.store_service import StoreService
+
+
+class ClientRegistry(object):
+    """
+    The last heartbeat each client sent, keyed by ip address. Lookups never touch the network;
+    a client without a heartbeat newer than max_age is unknown and callers fall back to probing it.
+    """
+
+    @staticmethod
+    def record_heartbeat(ip_address, heartbeat):
+        heartbeat = dict(heartbeat)
+        heartbeat['ip_address'] = ip_address
+        heartbeat['last_seen'] = time.time()
+        StoreService.save_client_heartbeat(ip_address, heartbeat)
+        return heartbeat
+
+    @staticmethod
+    def get_heartbeat(ip_address, max_age):
+        heartbeat = StoreService.get_client_heartbeat(ip_address)
+        try:
+            if heartbeat and time.time() - heartbeat['last_seen'] <= max_age:
+                return heartbeat
+        except (KeyError, TypeError):
+            pass
+        return None
+
+    @staticmethod
+    def get_assigned_client(clients, assigned_to):
+        """
+        Find the client an action instance is assigned to ("ip:port") without walking every client.
+        """
+        try:
+            client = clients.get(assigned_to.split(':')[0])
+        except (AttributeError, TypeError):
+            return None
+        if client is not None and client.get_uri() == assigned_to:
+            return client
+        return None
+
+    @staticmethod
+    def is_still_working_on(action_instance_id, ip_address, max_age):
+        """
+        :return: True or False from a fresh heartbeat, None when there is no fresh heartbeat
+        :rtype: bool|None
+        """
+        heartbeat = ClientRegistry.get_heartbeat(ip_address, max_age)
+        if heartbeat is None:
+            return None
+
+        for work in heartbeat.get('current_work', []):
+            try:
+                if int(work['action_instance_id']) == int(action_instance_id):
+                    return True
+            except (KeyError, TypeError, ValueError):
+                pass
+        return False
@@ -0,0 +1,101 @@
+"""
+ Copyright (c) 2015 Michael Bright and Bamboo HR LLC
+
+ Licensed under the Apache License, Version 2.0 (the "License");
+ you may not use this file except in compliance with the License.
+ You may obtain a copy of the License at
+
+ http://www.apache.org/licenses/LICENSE-2.0
+
+ Unless required by applicable law or agreed to in writing, software
+ distributed under the License is distributed on an "AS IS" BASIS,
+ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ See the License for the specific language governing permissions and
+ limitations under the License.
+"""
+from rapid.lib.store_service import StoreService
+
+
+class GrainIndex(object):
+    """
+    Maps a grain to the registered clients that can handle it, following the same rules as Client.can_handle.
+    The index is only rebuilt when clients register or expire (StoreService.get_clients_version), and the
+    candidates for each grain are remembered until then. Sleeping, inactive and pull clients are skipped
+    at lookup time since those flags change between dispatches.
+    """
+    _current = None
+
+    def __init__(self, clients, version=None):
+        self.version = version
+        self.keys = frozenset(clients.keys())
+        self._by_grain = {}
+        self._grain_counts = {}
+        self._unlabeled = []
+        self._unrestricted = []
+        self._lookups = {}
+
+        for key, client in clients.items():
+            if not client.grain_restrict:
+                self._unrestricted.append(key)
+
+            if client.grains is None:
+                if not client.grain_restrict:
+                    self._unlabeled.append(key)
+                continue
+
+            self._grain_counts[key] = len(client.grains)
+            for grain in client.grains:
+                self._by_grain.setdefault(grain, set()).add(key)
+
+    @classmethod
+    def get_index(cls, clients):
+        """
+        :param clients: The registered clients, keyed by ip address
+        :type clients: dict
+        :rtype: GrainIndex
+        """
+        version = StoreService.get_clients_version()
+        index = cls._current
+        if index is None or version is None or index.version != version or index.keys != clients.keys():
+            index = cls(clients, version)
+            cls._current = index
+        return index
+
+    def get_clients(self, clients, grain):
+        """
+        :param clients: The same snapshot of registered clients the index was looked up with
+        :type clients: dict
+        :param grain: The grain of the work request
+        :type grain: str
+        :return: The clients that can handle the grain right now
+        :rtype: list
+        """
+        candidates = []
+        for key in self.get_candidate_keys(grain):
+            client = clients.get(key)
+            if client is None or client.sleep or hasattr(client, 'no-longer-active') or getattr(client, 'pull', False):
+                continue
+            candidates.append(client)
+        return candidates
+
+    def get_candidate_keys(self, grain):
+        try:
+            return self._lookups[grain]
+        except KeyError:
+            keys = self._lookups[grain] = self._find_candidate_keys(grain)
+            return keys
+
+    def _find_candidate_keys(self, grain):
+        if grain is None:
+            return list(self._unrestricted)
+
+        tmp_grains = grain.split(';')
+        keys = None
+        for _grain in tmp_grains:
+            matches = self._by_grain.get(_grain, set())
+            keys = matches if keys is None else keys & matches
+            if not keys:
+                break
+
+        labeled = [key for key in keys if key in self._unrestricted or self._grain_counts[key] == len(tmp_grains)]
+        return self._unlabeled + labeled
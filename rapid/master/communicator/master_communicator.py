@@ -16,41 +16,82 @@
 # pylint: disable=broad-except
 
 import logging
-from concurrent.futures import ThreadPoolExecutor
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import requests
 from requests.exceptions import ConnectTimeout, ConnectionError  # pylint: disable=redefined-builtin
 
 from rapid.lib.version import Version
 from rapid.lib.communicator import Communicator
+from rapid.lib.queue_metrics import QueueMetrics
 
 
 logger = logging.getLogger("rapid")
 
 
 class MasterCommunicator(Communicator):
+    PROBE_WORKERS = 20
+
+    _executor = None
+    _executor_workers = None
+    _executor_lock = threading.Lock()
+
+    @classmethod
+    def get_executor(cls, workers=None):
+        """
+        The long lived pool clients are probed on, replaced only when the number of workers changes.
+        """
+        workers = max(workers or cls.PROBE_WORKERS, 1)
+        with cls._executor_lock:
+            if cls._executor is None or cls._executor_workers != workers:
+                if cls._executor is not None:
+                    cls._executor.shutdown(wait=False)
+                cls._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='rapid-probe')
+                cls._executor_workers = workers
+            return cls._executor
 
     @staticmethod
     def find_available_clients(clients, grain, verify_certs=True):
-        pages = None
-        with ThreadPoolExecutor(max_workers=5) as executor:
-            pages = executor.map(MasterCommunicator.check_availability,
-                                 [(client, verify_certs) for client in MasterCommunicator.filter_clients(clients, grain)])
-
-        return pages
-
-    @staticmethod
-    def get_clients_working_on(clients, verify_certs=True):
-        pages = None
-        with ThreadPoolExecutor(max_workers=5) as executor:
-            pages = executor.map(MasterCommunicator.get_availability,
-                                 [(client, verify_certs) for client in clients])
-        return pages
+        return MasterCommunicator.check_clients_availability(MasterCommunicator.filter_clients(clients, grain), verify_certs)
+
+    @classmethod
+    def check_clients_availability(cls, clients, verify_certs=True, workers=None):
+        return list(cls.get_executor(workers).map(cls.check_availability, [(client, verify_certs) for client in clients]))
+
+    @classmethod
+    def get_available_clients(cls, clients, count, verify_certs=True, workers=None):
+        """
+        Probe all the clients at once and return the first count that answer as available, in the order they answered.
+        Probes still waiting for a worker by then are cancelled.
+        :rtype: list
+        """
+        if count < 1 or not clients:
+            return []
+
+        executor = cls.get_executor(workers)
+        futures = [executor.submit(cls.check_availability, (client, verify_certs)) for client in clients]
+        available = []
+        try:
+            for future in as_completed(futures):
+                client = future.result()
+                if client is not None and not client.sleep:
+                    available.append(client)
+                    if len(available) >= count:
+                        break
+        finally:
+            for future in futures:
+                future.cancel()
+        return available
+
+    @classmethod
+    def get_clients_working_on(cls, clients, verify_certs=True, workers=None):
+        return list(cls.get_executor(workers).map(cls.get_availability, [(client, verify_certs) for client in clients]))
 
     @staticmethod
     def filter_clients(clients, grain):
         tmp = []
         for client in clients:
-            if client.can_handle(grain) and not hasattr(client, 'no-longer-active'):
+            if client.can_handle(grain) and not hasattr(client, 'no-longer-active') and not getattr(client, 'pull', False):
                 tmp.append(client)
         return tmp
 
@@ -58,7 +99,8 @@ class MasterCommunicator(Communicator):
     def check_availability(to_check):
         client, verify_certs = to_check
         try:
-            response = requests.get(client.get_availability_uri(), headers=client.get_headers(), verify=verify_certs, timeout=client.time_elapse)
+            response = client.get_session().get(client.get_availability_uri(), headers=client.get_headers(), verify=verify_certs, timeout=client.time_elapse)
+            QueueMetrics.record_probe()
             if response.status_code == 200:
                 return client
 
@@ -66,8 +108,10 @@ class MasterCommunicator(Communicator):
                 client.sleep = True
                 return client
         except ConnectionError:
+            QueueMetrics.record_probe(failed=True)
             setattr(client, 'no-longer-active', True)
         except Exception:
+            QueueMetrics.record_probe(failed=True)
             import traceback
             traceback.print_exc()
         return None
@@ -76,7 +120,7 @@ class MasterCommunicator(Communicator):
     def get_availability(to_check):
         client, verify_certs = to_check
         try:
-            response = requests.get(client.get_availability_uri(), headers=client.get_headers(), verify=verify_certs, timeout=client.time_elapse)
+            response = client.get_session().get(client.get_availability_uri(), headers=client.get_headers(), verify=verify_certs, timeout=client.time_elapse)
             version = response.headers[Version.HEADER] if Version.HEADER in response.headers else 'Unknown'
             results = {"version": version, "ip_address": client.ip_address, "grains": client.grains}
             results.update(response.json())
@@ -90,7 +134,7 @@ class MasterCommunicator(Communicator):
     def is_still_working_on(action_instance_id, client, verify_certs=True):
         is_still_working = False
         try:
-            response = requests.get(client.get_availability_uri(), headers=client.get_headers(), verify=verify_certs)
+            response = client.get_session().get(client.get_availability_uri(), headers=client.get_headers(), verify=verify_certs, timeout=4)
             try:
                 if 'current_work' in response.json():
                     for instance in response.json()['current_work']:
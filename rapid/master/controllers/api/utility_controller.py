@@ -20,9 +20,11 @@ from flask import request, Response
 from rapid.lib import api_key_required, json_response
 from rapid.lib.constants import HeaderConstants
 from rapid.lib.exceptions import HttpException, VcsNotFoundException
+from rapid.lib.queue_notifier import QueueNotifier
 from rapid.lib.store_service import StoreService
 from rapid.lib.version import Version
 from rapid.master.communicator.client import Client
+from rapid.master.communicator.client_registry import ClientRegistry
 from rapid.master.communicator.master_communicator import MasterCommunicator
 from rapid.workflow.action_dal import ActionDal
 
@@ -42,6 +44,7 @@ class UtilityRouter(object):
     def register_url_rules(self):
         self.flask_app.add_url_rule('/clients/show', 'get_clients', api_key_required(self.show_clients))
         self.flask_app.add_url_rule('/client/register', 'register_client', self.register_client, methods=["POST"])
+        self.flask_app.add_url_rule('/client/heartbeat', 'client_heartbeat', api_key_required(self.client_heartbeat), methods=["POST"])
         self.flask_app.add_url_rule('/clients/working', 'get_clients_working', api_key_required(self.working_clients), methods=['GET'])
         self.flask_app.add_url_rule('/clients/<path:client_ip>/still_working/<path:action_instance_id>', 'client_still_working_on', api_key_required(self.client_still_working_on), methods=['GET'])
         self.flask_app.add_url_rule('/clients/verify_working', 'client_verify_working', api_key_required(self.client_verify_working), methods=['GET'])
@@ -64,7 +67,10 @@ class UtilityRouter(object):
             pass
 
         if client_ip in clients:
-            return {'status': MasterCommunicator.is_still_working_on(action_instance_id, clients[client_ip], self.flask_app.rapid_config.verify_certs)}
+            status = ClientRegistry.is_still_working_on(action_instance_id, client_ip, self.flask_app.rapid_config.heartbeat_timeout)
+            if status is None:
+                status = MasterCommunicator.is_still_working_on(action_instance_id, clients[client_ip], self.flask_app.rapid_config.verify_certs)
+            return {'status': status}
 
         return {"status": "No client found"}
 
@@ -75,13 +81,34 @@ class UtilityRouter(object):
 
     def working_clients(self):
         clients = {}
-        for client in MasterCommunicator.get_clients_working_on(StoreService.get_clients(self.flask_app).values(), self.flask_app.rapid_config.verify_certs):
+        results = []
+        to_probe = []
+        for client in StoreService.get_clients(self.flask_app).values():
+            heartbeat = ClientRegistry.get_heartbeat(client.ip_address, self.flask_app.rapid_config.heartbeat_timeout)
+            if heartbeat is None:
+                to_probe.append(client)
+            else:
+                results.append({'version': heartbeat.get('version', 'Unknown'),
+                                'ip_address': client.ip_address,
+                                'grains': client.grains,
+                                'hostname': heartbeat.get('hostname'),
+                                'current_work': heartbeat.get('current_work', [])})
+
+        if to_probe:
+            results.extend(MasterCommunicator.get_clients_working_on(to_probe, self.flask_app.rapid_config.verify_certs,
+                                                                     self.flask_app.rapid_config.probe_workers))
+
+        for client in results:
             if client is not None:
                 if client['version'] not in clients:
                     clients[client['version']] = []
                 clients[client['version']].append(client)
         return Response(json.dumps(clients), content_type='application/json')
 
+    def client_heartbeat(self):
+        heartbeat = ClientRegistry.record_heartbeat(request.remote_addr, request.get_json())
+        return Response(json.dumps({'registered': heartbeat['ip_address'] in self._get_clients()}), content_type='application/json')
+
     def register_client(self):
         return self.register_request(request)
 
@@ -98,6 +125,7 @@ class UtilityRouter(object):
                 grains = in_request.json['grains'] if 'grains' in in_request.json else ''
                 hostname = in_request.json['hostname'] if 'hostname' in in_request.json else 'unknown'
                 grain_restrict = in_request.json['grain_restrict'] if 'grain_restrict' in in_request.json else False
+                pull = in_request.json['pull'] if 'pull' in in_request.json else False
 
                 api_key = in_request.headers['X-Rapidci-Client-Key'] if 'X-Rapidci-Client-Key' in in_request.headers else False
                 is_ssl = in_request.headers['X-Is-Ssl'].lower() == 'true' if 'X-is_ssl' in in_request.headers else False
@@ -107,7 +135,7 @@ class UtilityRouter(object):
 
                 if not api_key:
                     raise Exception("NO API KEY!")
-                client = Client(remote_addr, int(remote_port), grains, grain_restrict, api_key, is_ssl, hostname, time_elapse)
+                client = Client(remote_addr, int(remote_port), grains, grain_restrict, api_key, is_ssl, hostname, time_elapse, pull)
 
                 if HeaderConstants.SINGLE_USE not in in_request.headers:
                     self.store_client(remote_addr, client)
@@ -119,12 +147,8 @@ class UtilityRouter(object):
         raise Exception('Not Allowed')
 
     def store_client(self, remote_addr, definition):
-        clients = self._get_clients()
-        clients[remote_addr] = definition
-        self._save_clients(clients)
-
-    def _save_clients(self, clients):
-        StoreService.save_clients(clients, self.flask_app)
+        StoreService.save_client(remote_addr, definition)
+        QueueNotifier.notify()
 
     def _get_clients(self):
         return StoreService.get_clients(self.flask_app)
@@ -13,6 +13,7 @@
  See the License for the specific language governing permissions and
  limitations under the License.
 """
+from rapid.lib.reference_cache import ReferenceCache
 
 
 class GeneralDal:
@@ -28,6 +29,7 @@ class GeneralDal:
         self._set_attributes(instance, in_json)
         session.add(instance)
         session.commit()
+        ReferenceCache.invalidate(clazz.__tablename__)
 
         return instance
 
@@ -35,6 +37,7 @@ class GeneralDal:
         instance = session.query(clazz).filter(clazz.id == _id).one()
         session.delete(instance)
         session.commit()
+        ReferenceCache.invalidate(clazz.__tablename__)
 
         return instance
 
@@ -52,4 +55,5 @@ class GeneralDal:
         instance = self.get_instance(clazz, in_json)
         session.add(instance)
         session.commit()
+        ReferenceCache.invalidate(clazz.__tablename__)
         return instance.serialize()
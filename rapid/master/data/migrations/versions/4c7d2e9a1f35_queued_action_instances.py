@@ -0,0 +1,80 @@
+"""
+Copyright (c) 2015 Michael Bright and Bamboo HR LLC
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+queued_action_instances
+
+Revision ID: 4c7d2e9a1f35
+Revises: cf1a4a9becad
+Create Date: 2026-10-18 09:12:41.318204
+
+"""
+
+# revision identifiers, used by Alembic.
+from rapid.lib.constants import StatusConstants
+from rapid.workflow.data.models import ActionInstance, PipelineInstance, QueuedActionInstance
+
+revision = '4c7d2e9a1f35'
+down_revision = 'cf1a4a9becad'
+branch_labels = None
+depends_on = None
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    op.create_table('queued_action_instances',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('action_instance_id', sa.Integer(), nullable=False),
+    sa.Column('pipeline_instance_id', sa.Integer(), nullable=False),
+    sa.Column('priority', sa.Integer(), nullable=False),
+    sa.Column('pipeline_created_date', sa.DateTime(), nullable=True),
+    sa.Column('order', sa.Integer(), nullable=False),
+    sa.Column('slice', sa.String(length=25), nullable=True),
+    sa.ForeignKeyConstraint(['action_instance_id'], ['action_instances.id'], ),
+    sa.ForeignKeyConstraint(['pipeline_instance_id'], ['pipeline_instances.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    mysql_engine='InnoDB'
+    )
+    op.create_index(op.f('ix_queued_action_instances_id'), 'queued_action_instances', ['id'], unique=False)
+    op.create_index(op.f('ix_queued_action_instances_action_instance_id'), 'queued_action_instances', ['action_instance_id'], unique=False)
+    op.create_index(op.f('ix_queued_action_instances_pipeline_instance_id'), 'queued_action_instances', ['pipeline_instance_id'], unique=False)
+    op.create_index('ix_queued_action_instances_dispatch', 'queued_action_instances',
+                    [sa.text('priority DESC'), 'pipeline_created_date', 'pipeline_instance_id', 'order', 'slice'], unique=False)
+
+    ready = sa.select(ActionInstance.id,
+                      ActionInstance.pipeline_instance_id,
+                      sa.func.coalesce(PipelineInstance.priority, 0),
+                      PipelineInstance.created_date,
+                      sa.func.coalesce(ActionInstance.order, 0),
+                      sa.func.coalesce(ActionInstance.slice, '')) \
+        .join(PipelineInstance, PipelineInstance.id == ActionInstance.pipeline_instance_id) \
+        .where(ActionInstance.status_id == StatusConstants.READY) \
+        .where(ActionInstance.manual == 0) \
+        .where(PipelineInstance.status_id == StatusConstants.INPROGRESS)
+    op.execute(QueuedActionInstance.__table__.insert().from_select(['action_instance_id',
+                                                                    'pipeline_instance_id',
+                                                                    'priority',
+                                                                    'pipeline_created_date',
+                                                                    'order',
+                                                                    'slice'], ready))
+
+
+def downgrade():
+    op.drop_index('ix_queued_action_instances_dispatch', table_name='queued_action_instances')
+    op.drop_index(op.f('ix_queued_action_instances_pipeline_instance_id'), table_name='queued_action_instances')
+    op.drop_index(op.f('ix_queued_action_instances_action_instance_id'), table_name='queued_action_instances')
+    op.drop_index(op.f('ix_queued_action_instances_id'), table_name='queued_action_instances')
+    op.drop_table('queued_action_instances')
@@ -0,0 +1,41 @@
+"""
+Copyright (c) 2015 Michael Bright and Bamboo HR LLC
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+action_instance_leases
+
+Revision ID: 8e1b5c3d7a20
+Revises: 4c7d2e9a1f35
+Create Date: 2026-10-18 11:40:05.207731
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '8e1b5c3d7a20'
+down_revision = '4c7d2e9a1f35'
+branch_labels = None
+depends_on = None
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    op.add_column('action_instances', sa.Column('lease_expiration', sa.DateTime(), nullable=True))
+    op.create_index(op.f('ix_action_instances_lease_expiration'), 'action_instances', ['lease_expiration'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_action_instances_lease_expiration'), table_name='action_instances')
+    op.drop_column('action_instances', 'lease_expiration')
@@ -0,0 +1,43 @@
+"""
+Copyright (c) 2015 Michael Bright and Bamboo HR LLC
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+queued_action_instance_claims
+
+Revision ID: b3f6a2d8c914
+Revises: 8e1b5c3d7a20
+Create Date: 2026-10-18 17:52:41.618204
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = 'b3f6a2d8c914'
+down_revision = '8e1b5c3d7a20'
+branch_labels = None
+depends_on = None
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    op.add_column('queued_action_instances', sa.Column('claimed_by', sa.String(length=100), nullable=True))
+    op.add_column('queued_action_instances', sa.Column('claim_expiration', sa.DateTime(), nullable=True))
+    op.create_index(op.f('ix_queued_action_instances_claim_expiration'), 'queued_action_instances', ['claim_expiration'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_queued_action_instances_claim_expiration'), table_name='queued_action_instances')
+    op.drop_column('queued_action_instances', 'claim_expiration')
+    op.drop_column('queued_action_instances', 'claimed_by')
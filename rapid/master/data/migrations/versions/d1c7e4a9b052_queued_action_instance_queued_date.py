@@ -0,0 +1,39 @@
+"""
+Copyright (c) 2015 Michael Bright and Bamboo HR LLC
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+queued_action_instance_queued_date
+
+Revision ID: d1c7e4a9b052
+Revises: b3f6a2d8c914
+Create Date: 2026-10-18 18:21:09.430172
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = 'd1c7e4a9b052'
+down_revision = 'b3f6a2d8c914'
+branch_labels = None
+depends_on = None
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    op.add_column('queued_action_instances', sa.Column('queued_date', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    op.drop_column('queued_action_instances', 'queued_date')
@@ -0,0 +1,61 @@
+"""
+Copyright (c) 2015 Michael Bright and Bamboo HR LLC
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+pending_completions
+
+Revision ID: e7b2d9f4a610
+Revises: d1c7e4a9b052
+Create Date: 2026-10-18 21:04:37.512846
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = 'e7b2d9f4a610'
+down_revision = 'd1c7e4a9b052'
+branch_labels = None
+depends_on = None
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    op.create_table('pending_completions',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('action_instance_id', sa.Integer(), nullable=False),
+    sa.Column('pipeline_instance_id', sa.Integer(), nullable=False),
+    sa.Column('payload', sa.Text(), nullable=False),
+    sa.Column('received_date', sa.DateTime(), nullable=False),
+    sa.Column('statistics_saved', sa.Boolean(), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('claimed_by', sa.String(length=100), nullable=True),
+    sa.Column('claim_expiration', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['action_instance_id'], ['action_instances.id'], ),
+    sa.ForeignKeyConstraint(['pipeline_instance_id'], ['pipeline_instances.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    mysql_engine='InnoDB'
+    )
+    op.create_index(op.f('ix_pending_completions_id'), 'pending_completions', ['id'], unique=False)
+    op.create_index(op.f('ix_pending_completions_action_instance_id'), 'pending_completions', ['action_instance_id'], unique=False)
+    op.create_index(op.f('ix_pending_completions_pipeline_instance_id'), 'pending_completions', ['pipeline_instance_id'], unique=False)
+    op.create_index(op.f('ix_pending_completions_claim_expiration'), 'pending_completions', ['claim_expiration'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_pending_completions_claim_expiration'), table_name='pending_completions')
+    op.drop_index(op.f('ix_pending_completions_pipeline_instance_id'), table_name='pending_completions')
+    op.drop_index(op.f('ix_pending_completions_action_instance_id'), table_name='pending_completions')
+    op.drop_index(op.f('ix_pending_completions_id'), table_name='pending_completions')
+    op.drop_table('pending_completions')
@@ -0,0 +1,59 @@
+"""
+Copyright (c) 2015 Michael Bright and Bamboo HR LLC
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+qa_test_name_hash
+
+Revision ID: f3c8a5e1b742
+Revises: e7b2d9f4a610
+Create Date: 2026-10-18 22:16:03.281954
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = 'f3c8a5e1b742'
+down_revision = 'e7b2d9f4a610'
+branch_labels = None
+depends_on = None
+
+import hashlib
+
+from alembic import op
+import sqlalchemy as sa
+
+BATCH_SIZE = 1000
+
+
+def upgrade():
+    op.add_column('qa_tests', sa.Column('name_hash', sa.String(length=40), nullable=True))
+    op.create_index(op.f('ix_qa_tests_name_hash'), 'qa_tests', ['name_hash'], unique=False)
+
+    qa_tests = sa.table('qa_tests', sa.column('id', sa.Integer), sa.column('name', sa.String), sa.column('name_hash', sa.String))
+    connection = op.get_bind()
+    last_id = 0
+    while True:
+        rows = connection.execute(sa.select(qa_tests.c.id, qa_tests.c.name)
+                                  .where(qa_tests.c.id > last_id)
+                                  .order_by(qa_tests.c.id)
+                                  .limit(BATCH_SIZE)).fetchall()
+        if not rows:
+            break
+        connection.execute(qa_tests.update().where(qa_tests.c.id == sa.bindparam('_id')).values(name_hash=sa.bindparam('_name_hash')),
+                           [{'_id': _id, '_name_hash': hashlib.sha1(name.encode('utf-8')).hexdigest()} for _id, name in rows])
+        last_id = rows[-1][0]
+
+
+def downgrade():
+    op.drop_index(op.f('ix_qa_tests_name_hash'), table_name='qa_tests')
+    op.drop_column('qa_tests', 'name_hash')
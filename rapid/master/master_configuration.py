@@ -25,6 +25,34 @@ class MasterConfiguration(Configuration, Injectable):
     def __init__(self, file_name=None):
         self.port = None
         self.queue_time = None
+        self.queue_event_driven = None
+        self.queue_fallback_time = None
+        self.queue_workers = None
+        self.queue_verify_time = None
+        self.queue_verify_timeout = None
+        self.queue_reconcile_time = None
+        self.queue_reconcile_timeout = None
+        self.queue_release_time = None
+        self.queue_release_timeout = None
+        self.dispatch_batch_size = None
+        self.dispatch_claim_size = None
+        self.dispatch_claim_time = None
+        self.dispatch_probe_count = None
+        self.probe_workers = None
+        self.queue_all_workers = None
+        self.handler_backoff_time = None
+        self.handler_backoff_max_time = None
+        self.handler_breaker_threshold = None
+        self.handler_breaker_time = None
+        self.handler_create_rate = None
+        self.handler_create_burst = None
+        self.lease_time = None
+        self.lease_poll_timeout = None
+        self.heartbeat_timeout = None
+        self.completion_journal = None
+        self.completion_workers = None
+        self.completion_batch_size = None
+        self.completion_claim_time = None
         self.db_connect_string = None
         self.data_type = None
         self.queue_manager = None
@@ -38,6 +66,8 @@ class MasterConfiguration(Configuration, Injectable):
         self.install_uri = None
         self.install_options = None
         self.verify_certs = None
+        self.http_pool_size = None
+        self.http_idle_timeout = None
         self.custom_reports_dir = None
         self.static_file_directory = None
         self.basic_auth_user = None
@@ -62,6 +92,34 @@ class MasterConfiguration(Configuration, Injectable):
             'master': {
                 'port': [8080, int],
                 'queue_time': [6, int],
+                'queue_event_driven': [True, bool],
+                'queue_fallback_time': [60, int],
+                'queue_workers': [3, int],
+                'queue_verify_time': [6, int],
+                'queue_verify_timeout': [120, int],
+                'queue_reconcile_time': [6, int],
+                'queue_reconcile_timeout': [120, int],
+                'queue_release_time': [30, int],
+                'queue_release_timeout': [300, int],
+                'dispatch_batch_size': [1, int],
+                'dispatch_claim_size': [0, int],
+                'dispatch_claim_time': [30, int],
+                'dispatch_probe_count': [3, int],
+                'probe_workers': [20, int],
+                'queue_all_workers': [False, bool],
+                'handler_backoff_time': [2, float],
+                'handler_backoff_max_time': [300, int],
+                'handler_breaker_threshold': [5, int],
+                'handler_breaker_time': [120, int],
+                'handler_create_rate': [0, float],
+                'handler_create_burst': [10, int],
+                'lease_time': [60, int],
+                'lease_poll_timeout': [20, int],
+                'heartbeat_timeout': [45, int],
+                'completion_journal': [False, bool],
+                'completion_workers': [2, int],
+                'completion_batch_size': [50, int],
+                'completion_claim_time': [120, int],
                 'db_connect_string': ['sqlite:///data.db'],
                 'data_type': ['inmemory'],
                 'queue_manager': [True, bool],
@@ -80,6 +138,8 @@ class MasterConfiguration(Configuration, Injectable):
                 'install_uri': ['https://pypi.python.org/pypi/'],
                 'install_options': [''],
                 'verify_certs': [True, bool],
+                'http_pool_size': [10, int],
+                'http_idle_timeout': [300, int],
                 'log_file': [None],
                 'extensions': [None, list, ',']
             },
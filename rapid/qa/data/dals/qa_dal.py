@@ -19,6 +19,7 @@ from sqlalchemy.orm import joinedload
 from sqlalchemy.sql.functions import func
 
 from rapid.lib.framework.injectable import Injectable
+from rapid.lib.reference_cache import ReferenceCache
 from rapid.lib.results_serializer import ResultsSerializer
 from rapid.qa.data.models import QaProduct
 from rapid.lib.utils import ORMUtil
@@ -26,12 +27,15 @@ from rapid.lib.constants import Constants, StatusConstants
 from rapid.lib import get_db_session
 from rapid.master.data.database.dal.general_dal import GeneralDal
 from rapid.qa.data.models import QaTestHistory, QaStatusSummary, Stacktrace, QaTest, QaArea, QaFeature, QaBehaviorPoint, QaTestMapping
+from rapid.workflow.data.dal.status_dal import StatusDal
 from rapid.workflow.data.models import Status
 from rapid.ci.data.models import Vcs
 from rapid.workflow.data.models import PipelineInstance
 
 
 class QaDal(GeneralDal, Injectable):
+    CHUNK_SIZE = 500
+
     def reset_results(self, action_instance_id, session):
         """
 
@@ -225,18 +229,22 @@ class QaDal(GeneralDal, Injectable):
         session.flush()
 
         if test_keys:
-            for test, qa_test_mapping in session.query(QaTest, QaTestMapping) \
-                    .outerjoin(QaTestMapping, QaTest.id == QaTestMapping.test_id) \
-                    .filter(QaTest.name.in_(test_keys)).all():
-                if test.name in test_mapper:
-                    (area, feature, _bp) = test_mapper[test.name]['__key__'].split(':', 2)
-                    if qa_test_mapping is None:
-                        qa_test_mapping = QaTestMapping(area_id=area_mapper[area]['model'].id,
-                                                        test_id=test.id,
-                                                        feature_id=feature_mapper[feature]['model'].id,
-                                                        behavior_id=bp_mapper[_bp]['model'].id)
-                        session.add(qa_test_mapping)
-                    else:
+            test_ids = self._get_test_ids(session, test_keys, create=False)
+            test_mappings = {}
+            for chunk in self._chunks(list(test_ids.values())):
+                for qa_test_mapping in session.query(QaTestMapping).filter(QaTestMapping.test_id.in_(chunk)):
+                    test_mappings.setdefault(qa_test_mapping.test_id, []).append(qa_test_mapping)
+
+            for name, test_id in test_ids.items():
+                (area, feature, _bp) = test_mapper[name]['__key__'].split(':', 2)
+                if test_id not in test_mappings:
+                    qa_test_mapping = QaTestMapping(area_id=area_mapper[area]['model'].id,
+                                                    test_id=test_id,
+                                                    feature_id=feature_mapper[feature]['model'].id,
+                                                    behavior_id=bp_mapper[_bp]['model'].id)
+                    session.add(qa_test_mapping)
+                else:
+                    for qa_test_mapping in test_mappings[test_id]:
                         if qa_test_mapping.area_id != area_mapper[area]['model'].id:
                             qa_test_mapping.area_id = area_mapper[area]['model'].id
                         if qa_test_mapping.feature_id != feature_mapper[feature]['model'].id:
@@ -286,58 +294,104 @@ class QaDal(GeneralDal, Injectable):
                     pass
 
                 results = self._save_summary(action_instance, post_data['results'], session)
+                created_test_ids = {}
+                test_ids = self._get_test_ids(session, list(results.keys()), created=created_test_ids)
 
-                should_create = dict(results)
-                test_cache = {}
-                for qa_test in session.query(QaTest).filter(QaTest.name.in_(list(results.keys()))):
-                    if qa_test.name in should_create:
-                        del should_create[qa_test.name]
-                        test_cache[qa_test.name] = qa_test
-
-                for name in should_create.keys():
-                    qa_test = QaTest(name=name)
-                    session.add(qa_test)
-                    test_cache[qa_test.name] = qa_test
-
-                session.flush()
-
-                status_cache = {}
+                status_dal = StatusDal(session)
+                histories = []
+                stacktraces = {}
                 for test, value in results.items():
-                    status_id = None
-                    if 'status' not in value:
-                        status_id = StatusConstants.UNKNOWN
-
+                    status_id = StatusConstants.UNKNOWN
                     if 'status' in value:
-                        _check_status = value['status'].lower()
-                        if _check_status not in status_cache:
-                            status = session.query(Status).filter(func.lower(Status.name) == func.lower(_check_status)).first()
-                            if status:
-                                status_id = status.id
-                                status_cache[status.name.lower()] = status
-                            else:
-                                status_id = StatusConstants.UNKNOWN
-                        else:
-                            status_id = status_cache[_check_status].id
+                        status = status_dal.get_status_by_name(value['status'])
+                        if status:
+                            status_id = status.id
 
                     if not failures_count or status_id == StatusConstants.FAILED:
-                        qa_test_history = QaTestHistory(test_id=test_cache[test].id,
-                                                        pipeline_instance_id=action_instance.pipeline_instance_id,
-                                                        action_instance_id=action_instance.id,
-                                                        status_id=status_id,
-                                                        duration=value['time'] if 'time' in value and value['time'] else 0)
-
-                        session.add(qa_test_history)
-
-                        session.flush()
-
+                        histories.append({'test_id': test_ids[test],
+                                          'pipeline_instance_id': action_instance.pipeline_instance_id,
+                                          'action_instance_id': action_instance.id,
+                                          'status_id': status_id,
+                                          'duration': value['time'] if 'time' in value and value['time'] else 0})
                         if 'stacktrace' in value:
-                            session.add(Stacktrace(qa_test_history_id=qa_test_history.id, stacktrace=value['stacktrace']))
+                            stacktraces[test_ids[test]] = value['stacktrace']
+
+                history_ids = self._insert_test_histories(session, action_instance.id, histories, list(stacktraces.keys()))
+                if stacktraces:
+                    session.execute(Stacktrace.__table__.insert(), [{'qa_test_history_id': history_ids[test_id], 'stacktrace': stacktrace}
+                                                                    for test_id, stacktrace in stacktraces.items()])
 
                 session.commit()
+                for name, test_id in created_test_ids.items():
+                    ReferenceCache.put(QaTest.__tablename__, name, test_id)
             except:
                 import traceback
                 traceback.print_exc()
 
+    @classmethod
+    def _get_test_ids(cls, session, names, create=True, created=None):
+        """
+        QaTest ids by name, through the reference cache. The ones not cached are looked up by name hash, CHUNK_SIZE at
+        a time, and with create the tests seen for the first time are inserted in one executemany.
+        :param created: filled with the ids of the tests inserted, for the caller to cache once they are committed
+        :rtype: dict
+        """
+        test_ids = ReferenceCache.get_many(QaTest.__tablename__, list(set(names)), lambda missing: cls._load_test_ids(session, missing))
+        if create:
+            missing = [name for name in set(names) if name not in test_ids]
+            if missing:
+                session.execute(QaTest.__table__.insert(), [{'name': name, 'name_hash': QaTest.hash_name(name), 'active': True} for name in missing])
+                new_test_ids = cls._load_test_ids(session, missing)
+                if created is not None:
+                    created.update(new_test_ids)
+                test_ids.update(new_test_ids)
+        return test_ids
+
+    @classmethod
+    def _load_test_ids(cls, session, names):
+        hashes = {}
+        for name in names:
+            hashes.setdefault(QaTest.hash_name(name), []).append(name)
+
+        test_ids = {}
+        for chunk in cls._chunks(list(hashes.keys())):
+            for _id, name, name_hash in session.query(QaTest.id, QaTest.name, QaTest.name_hash).filter(QaTest.name_hash.in_(chunk)):
+                if name in hashes[name_hash] and name not in test_ids:
+                    test_ids[name] = _id
+        return test_ids
+
+    @classmethod
+    def _chunks(cls, values):
+        for index in range(0, len(values), cls.CHUNK_SIZE):
+            yield values[index:index + cls.CHUNK_SIZE]
+
+    @classmethod
+    def _insert_test_histories(cls, session, action_instance_id, histories, test_ids):
+        """
+        Insert the QaTestHistory rows in one executemany.
+        :param test_ids: the tests whose new QaTestHistory id is needed
+        :return: {test_id: qa_test_history_id} for those tests
+        :rtype: dict
+        """
+        if not histories:
+            return {}
+
+        table = QaTestHistory.__table__
+        if test_ids and getattr(session.get_bind().dialect, 'insert_executemany_returning', False):
+            return {test_id: _id for _id, test_id in session.execute(table.insert().returning(table.c.id, table.c.test_id), histories)}
+
+        session.execute(table.insert(), histories)
+        if not test_ids:
+            return {}
+        # Without RETURNING, the newest history of each of the tests in this action instance is the one just inserted.
+        history_ids = {}
+        for chunk in cls._chunks(list(test_ids)):
+            history_ids.update(session.query(QaTestHistory.test_id, func.max(QaTestHistory.id))
+                               .filter(QaTestHistory.action_instance_id == action_instance_id)
+                               .filter(QaTestHistory.test_id.in_(chunk))
+                               .group_by(QaTestHistory.test_id))
+        return history_ids
+
     def get_qa_testmap_coverage(self, pipeline_instance_id):
         objects = []
         for session in get_db_session():
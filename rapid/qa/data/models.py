@@ -14,6 +14,8 @@
  limitations under the License.
 """
 import datetime
+import hashlib
+
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql.schema import UniqueConstraint
 from sqlalchemy import Column, String, ForeignKey, Integer, DateTime, Boolean, Text
@@ -25,11 +27,23 @@ from rapid.master.data.database.models.base.base_model import BaseModel
 Base = get_declarative_base()
 
 
+def _name_hash_default(context):
+    return QaTest.hash_name(context.get_current_parameters()['name'])
+
+
 class QaTest(BaseModel, Base):
     name = Column(String(1000), nullable=False)
+    name_hash = Column(String(40), index=True, default=_name_hash_default)
     active = Column(Boolean, default=True)
     qa_test_type_id = Column(Integer, ForeignKey('qa_test_types.id'), nullable=True, index=True)
 
+    @staticmethod
+    def hash_name(name):
+        """
+        Test names are too long to index everywhere, they are looked up by this fixed width hash instead.
+        """
+        return hashlib.sha1(name.encode('utf-8')).hexdigest()
+
 
 class QaStatusSummary(BaseModel, Base):
     action_instance_id = Column(Integer, ForeignKey('action_instances.id'), nullable=False, index=True)
@@ -21,8 +21,10 @@ def register_ioc_globals(flask_app):  # pylint: disable=unused-argument
     from rapid.workflow.workflow_service import WorkflowService
     from rapid.lib.queue_handler_constants import QueueHandlerConstants
     from rapid.workflow.queue_handlers import setup_queue_handlers
+    from rapid.workflow.data.dal.ready_queue_dal import ReadyQueueDal
 
     setup_queue_handlers()
+    ReadyQueueDal.register_listeners()
     constants = IOC.get_class_instance(QueueHandlerConstants)
 
     workflow_service = IOC.get_class_instance(WorkflowService)
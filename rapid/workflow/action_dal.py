@@ -16,30 +16,36 @@
 # pylint: disable=singleton-comparison,broad-except
 import logging
 import datetime
-import random
 
-import time
 from typing import Dict, List
 
 from flask import Flask
-from sqlalchemy import func, and_, asc
+from sqlalchemy import func, and_, asc, select, or_
 from sqlalchemy.orm import joinedload, aliased
 from sqlalchemy.orm.scoping import ScopedSession
 from sqlalchemy.sql.expression import exists
 
 from rapid.lib.queue_handler_constants import QueueHandlerConstants
-from rapid.lib.filters import ObjectFilters
 from rapid.lib.exceptions import InvalidObjectException
+from rapid.lib.queue_metrics import QueueMetrics
+from rapid.lib.queue_notifier import QueueNotifier
+from rapid.lib.reference_cache import ReferenceCache
 from rapid.lib.store_service import StoreService
 from rapid.lib.constants import StatusConstants, StatusTypes
 from rapid.lib.work_request import WorkRequest
 from rapid.lib.framework.injectable import Injectable
+from rapid.master.communicator.client import Client
 from rapid.lib.modules import QaModule
 from rapid.lib import get_db_session
+from rapid.workflow.pipeline_locks import PipelineLocks
 from rapid.workflow.workflow_engine import InstanceWorkflowEngine
+from rapid.workflow.queue_handlers.queue_handler import QueueHandler
+from rapid.workflow.data.dal.completion_journal_dal import CompletionJournalDal
+from rapid.workflow.data.dal.ready_queue_dal import ReadyQueueDal
 from rapid.workflow.data.dal.status_dal import StatusDal
-from rapid.workflow.data.models import ActionInstance, PipelineInstance, PipelineParameters, Status, \
-    PipelineStatistics, Statistics, StageInstance, WorkflowInstance, ActionInstanceConfig, AppConfiguration
+from rapid.workflow.data.models import ActionInstance, PipelineInstance, PipelineParameters, \
+    PipelineStatistics, Statistics, StageInstance, WorkflowInstance, ActionInstanceConfig, AppConfiguration, \
+    QueuedActionInstance, PendingCompletion
 from rapid.master.data.database.dal.general_dal import GeneralDal
 from rapid.workflow.event_service import EventService
 
@@ -47,6 +53,8 @@ logger = logging.getLogger('rapid')
 
 
 class ActionDal(GeneralDal, Injectable):
+    COMPLETION_ATTEMPTS = 5
+
     last_sent = None
 
     def __init__(self, qa_module: QaModule=None,
@@ -54,30 +62,30 @@ class ActionDal(GeneralDal, Injectable):
                  event_service: EventService=None,
                  flask_app: Flask=None,
                  status_dal: StatusDal=None,
-                 queue_constants: QueueHandlerConstants=None):
+                 queue_constants: QueueHandlerConstants=None,
+                 ready_queue_dal: ReadyQueueDal=None):
         self.qa_module = qa_module
         self.store_service = store_service
         self.event_service = event_service
         self.flask_app = flask_app
         self.status_dal = status_dal
         self.queue_constants = queue_constants
-
-    def _get_ready_work_requests(self, session: ScopedSession, work_requests: Dict, results: List) -> None:
-        for action_instance, pipeline_parameters, action_instance_config in session.query(ActionInstance, PipelineParameters, ActionInstanceConfig) \
-                .outerjoin(PipelineParameters, PipelineParameters.pipeline_instance_id == ActionInstance.pipeline_instance_id) \
-                .outerjoin(ActionInstanceConfig, ActionInstanceConfig.action_instance_id == ActionInstance.id) \
-                .filter(ActionInstance.status_id == StatusConstants.READY) \
-                .filter(ActionInstance.manual == 0) \
-                .filter(ActionInstance.pipeline_instance_id == PipelineInstance.id) \
-                .filter(PipelineInstance.status_id == StatusConstants.INPROGRESS) \
-                .order_by(PipelineInstance.priority.desc(),
-                          PipelineInstance.created_date.asc(),
-                          PipelineInstance.id.asc(),
-                          ActionInstance.order.asc(),
-                          ActionInstance.slice.asc()).all():
+        self.ready_queue_dal = ready_queue_dal
+
+    def _get_ready_work_requests(self, session: ScopedSession, work_requests: Dict, results: List, claimant: str = None) -> None:
+        query = session.query(ActionInstance, PipelineParameters, ActionInstanceConfig) \
+            .join(QueuedActionInstance, QueuedActionInstance.action_instance_id == ActionInstance.id) \
+            .outerjoin(PipelineParameters, PipelineParameters.pipeline_instance_id == ActionInstance.pipeline_instance_id) \
+            .outerjoin(ActionInstanceConfig, ActionInstanceConfig.action_instance_id == ActionInstance.id) \
+            .filter(ActionInstance.status_id == StatusConstants.READY)
+        if claimant is not None:
+            query = query.filter(ReadyQueueDal.is_claimed_by(claimant))
+
+        for action_instance, pipeline_parameters, action_instance_config in query.order_by(*ReadyQueueDal.dispatch_order()).all():
+            action_instance.configuration = action_instance_config
             self.configure_work_request(action_instance, pipeline_parameters, work_requests, results)
 
-    def _get_stalled_work_requests(self, session: ScopedSession, work_requests: Dict, results: List) -> None:
+    def _promote_stalled_action_instances(self, session: ScopedSession) -> int:
         action_alias = aliased(ActionInstance)
         inner_query = ~exists()\
             .where(action_alias.workflow_instance_id == WorkflowInstance.id) \
@@ -85,22 +93,18 @@ class ActionDal(GeneralDal, Injectable):
             .where(action_alias.end_date == None)\
             .correlate(ActionInstance) \
             .correlate(WorkflowInstance)
-        for action_instance, pipeline_parameters, action_instance_config in session.query(ActionInstance, PipelineParameters, ActionInstanceConfig) \
+        count = 0
+        for action_instance in session.query(ActionInstance) \
                 .join(PipelineInstance, PipelineInstance.id == ActionInstance.pipeline_instance_id) \
                 .join(WorkflowInstance, WorkflowInstance.id == ActionInstance.workflow_instance_id) \
-                .outerjoin(PipelineParameters, PipelineParameters.pipeline_instance_id == ActionInstance.pipeline_instance_id) \
-                .outerjoin(ActionInstanceConfig, ActionInstanceConfig.action_instance_id == ActionInstance.id) \
                 .filter(ActionInstance.status_id == StatusConstants.NEW) \
                 .filter(ActionInstance.manual == 0) \
                 .filter(PipelineInstance.status_id == StatusConstants.INPROGRESS) \
-                .filter(inner_query) \
-                .order_by(PipelineInstance.priority.desc(),
-                          PipelineInstance.created_date.asc(),
-                          PipelineInstance.id.asc(),
-                          ActionInstance.order.asc(),
-                          ActionInstance.slice.asc()).all():
-            action_instance.configuration = action_instance_config
-            self.configure_work_request(action_instance, pipeline_parameters, work_requests, results)
+                .filter(inner_query).all():
+            logger.info("Promoting stalled ActionInstance: {}".format(action_instance.id))
+            action_instance.status_id = StatusConstants.READY
+            count += 1
+        return count
 
     def configure_work_request(self, action_instance: ActionInstance, pipeline_parameters: PipelineParameters, work_requests: Dict, results: List, include_configuration: bool = True) -> None:
         work_request = None
@@ -131,10 +135,183 @@ class ActionDal(GeneralDal, Injectable):
             if not app_configuration or app_configuration.process_queue:
                 work_requests = {}
                 self._get_ready_work_requests(session, work_requests, results)
-                self._get_stalled_work_requests(session, work_requests, results)
 
         return results
 
+    def claim_workable_work_requests(self, claimant: str, count: int, claim_time: int) -> List:
+        """
+        Claim up to count READY work requests for this dispatcher, see ReadyQueueDal.claim, and return every
+        work request the dispatcher holds a claim on. When count were claimed there may be more behind them,
+        so the queue is signaled to run again instead of leaving them to the next tick.
+        """
+        results = []
+        for session in get_db_session():
+            app_configuration = session.query(AppConfiguration).get(1)
+            if app_configuration and not app_configuration.process_queue:
+                return results
+
+            claimed = ReadyQueueDal.claim(session, claimant, count, claim_time)
+            session.commit()
+            self._get_ready_work_requests(session, {}, results, claimant)
+            if count and claimed >= count:
+                QueueNotifier.notify()
+        return results
+
+    def claim_action_instance(self, action_instance_id: int, assigned_to: str) -> bool:
+        """
+        Assign a READY, unassigned action instance to assigned_to and mark it INPROGRESS in a single conditional
+        UPDATE. Only one of several dispatchers, or a dispatch racing a reset, can win the claim.
+        :return: True if this call claimed the action instance
+        """
+        for session in get_db_session():
+            table = ActionInstance.__table__
+            result = session.execute(table.update()
+                                     .where(table.c.id == action_instance_id)
+                                     .where(table.c.status_id == StatusConstants.READY)
+                                     .where(or_(table.c.assigned_to == None, table.c.assigned_to == ''))
+                                     .values(status_id=StatusConstants.INPROGRESS,
+                                             start_date=datetime.datetime.utcnow(),
+                                             assigned_to=assigned_to,
+                                             lease_expiration=None))
+            claimed = result.rowcount == 1
+            if claimed:
+                QueueMetrics.record_dispatch(ReadyQueueDal.dequeue_dispatched(session.connection(), [action_instance_id]))
+            session.commit()
+            return claimed
+        return False
+
+    def lease_work_requests(self, client: Client, count: int, lease_time: int) -> List:
+        """
+        Lease up to count READY work requests the client can handle to it, in queue order.
+        Only the queued rows whose grain the client can handle are read, a page of count at a time, picked with
+        SKIP LOCKED where the database supports it and leased with one conditional UPDATE, so a work request is
+        only ever leased to one client.
+        """
+        leased = []
+        grain_filter = self._get_lease_grain_filter(client)
+        if count < 1 or grain_filter is None:
+            return leased
+
+        for session in get_db_session():
+            app_configuration = session.query(AppConfiguration).get(1)
+            if app_configuration and not app_configuration.process_queue:
+                return leased
+
+            now = datetime.datetime.utcnow()
+            table = ActionInstance.__table__
+            candidates = select(QueuedActionInstance.action_instance_id, ActionInstance.grain) \
+                .join(ActionInstance, ActionInstance.id == QueuedActionInstance.action_instance_id) \
+                .where(ActionInstance.status_id == StatusConstants.READY) \
+                .where(grain_filter) \
+                .order_by(*ReadyQueueDal.dispatch_order())
+            if ReadyQueueDal.supports_skip_locked(session):
+                candidates = candidates.with_for_update(skip_locked=True, of=QueuedActionInstance)
+
+            leased_ids = []
+            offset = 0
+            while len(leased_ids) < count:
+                page_size = count - len(leased_ids)
+                rows = session.execute(candidates.offset(offset).limit(page_size)).all()
+                action_instance_ids = [action_instance_id for (action_instance_id, grain) in rows if client.can_handle(grain)]
+                # Rows this lease takes, or loses to another one, are no longer READY; only the rejected ones stay ahead.
+                offset += len(rows) - len(action_instance_ids)
+                if action_instance_ids:
+                    session.execute(table.update()
+                                    .where(table.c.id.in_(action_instance_ids))
+                                    .where(table.c.status_id == StatusConstants.READY)
+                                    .values(status_id=StatusConstants.INPROGRESS,
+                                            start_date=now,
+                                            assigned_to=client.get_uri(),
+                                            lease_expiration=now + datetime.timedelta(seconds=lease_time)))
+                    leased_ids.extend(row[0] for row in session.execute(select(table.c.id)
+                                                                        .where(table.c.id.in_(action_instance_ids))
+                                                                        .where(table.c.status_id == StatusConstants.INPROGRESS)
+                                                                        .where(table.c.assigned_to == client.get_uri())
+                                                                        .where(table.c.lease_expiration != None)))
+                if len(rows) < page_size:
+                    break
+
+            if leased_ids:
+                QueueMetrics.record_dispatch(ReadyQueueDal.dequeue_dispatched(session.connection(), leased_ids), leased=True)
+                leased = self._get_work_requests(session, leased_ids)
+            session.commit()
+        return leased
+
+    @staticmethod
+    def _get_lease_grain_filter(client: Client):
+        """
+        client.can_handle as SQL, exact for single grains. Compound grains (a;b) are left for can_handle to
+        decide, and grains handed to a queue handler (image://...) are never leased.
+        :return: the filter, or None when the client can not handle any work
+        """
+        if client.sleep:
+            return None
+
+        grain = ActionInstance.grain
+        not_for_handlers = or_(grain == None, ~grain.contains(QueueHandler._GRAIN_SPLIT))  # pylint: disable=protected-access
+        if client.grains is None:
+            return None if client.grain_restrict else not_for_handlers
+
+        handled = [grain.contains(';')]
+        if not client.grain_restrict:
+            handled.extend([grain == None, grain.in_(client.grains)])
+        elif len(client.grains) == 1:
+            handled.append(grain.in_(client.grains))
+        return and_(or_(*handled), not_for_handlers)
+
+    def _get_work_requests(self, session: ScopedSession, action_instance_ids: List[int]) -> List:
+        """
+        The work requests of action_instance_ids, in the same order.
+        """
+        work_requests = {}
+        results = []
+        for action_instance, pipeline_parameters, action_instance_config in session.query(ActionInstance, PipelineParameters, ActionInstanceConfig) \
+                .outerjoin(PipelineParameters, PipelineParameters.pipeline_instance_id == ActionInstance.pipeline_instance_id) \
+                .outerjoin(ActionInstanceConfig, ActionInstanceConfig.action_instance_id == ActionInstance.id) \
+                .filter(ActionInstance.id.in_(action_instance_ids)).all():
+            action_instance.configuration = action_instance_config
+            self.configure_work_request(action_instance, pipeline_parameters, work_requests, results)
+
+        order = {action_instance_id: index for (index, action_instance_id) in enumerate(action_instance_ids)}
+        return sorted(results, key=lambda work_request: order[work_request.action_instance_id])
+
+    def renew_leases(self, action_instance_ids: List[int], assigned_to: str, lease_time: int) -> int:
+        if not action_instance_ids:
+            return 0
+
+        for session in get_db_session():
+            table = ActionInstance.__table__
+            result = session.execute(table.update()
+                                     .where(table.c.id.in_(action_instance_ids))
+                                     .where(table.c.status_id == StatusConstants.INPROGRESS)
+                                     .where(table.c.assigned_to == assigned_to)
+                                     .values(lease_expiration=datetime.datetime.utcnow() + datetime.timedelta(seconds=lease_time)))
+            session.commit()
+            return result.rowcount
+        return 0
+
+    def expire_leases(self) -> int:
+        """
+        Put INPROGRESS work whose lease ran out back on the ready queue.
+        """
+        count = 0
+        for session in get_db_session():
+            for action_instance in session.query(ActionInstance) \
+                    .filter(ActionInstance.status_id == StatusConstants.INPROGRESS) \
+                    .filter(ActionInstance.lease_expiration < datetime.datetime.utcnow()).all():
+                if StoreService.is_completing(action_instance.id):
+                    continue
+                logger.info("Lease expired for ActionInstance:{} assigned to: {}".format(action_instance.id, action_instance.assigned_to))
+                action_instance.status_id = StatusConstants.READY
+                action_instance.start_date = None
+                action_instance.assigned_to = None
+                action_instance.lease_expiration = None
+                count += 1
+            session.commit()
+        if count:
+            QueueNotifier.notify()
+        return count
+
     def get_verify_working(self, time_difference: int):
         results = []
         for session in get_db_session():
@@ -177,24 +354,123 @@ class ActionDal(GeneralDal, Injectable):
 
             session.commit()
 
+        QueueNotifier.notify()
+        return True
+
+    def journal_completion(self, _id: int, post_data: Dict):
+        """
+        Keep the /done payload in the completion journal for the completion workers to apply. The action instance
+        is flagged as completing until then, so it is not taken for lost work in the meantime.
+        """
+        for session in get_db_session():
+            action_instance = self.get_action_instance_by_id(_id, session)
+            if action_instance is None:
+                raise InvalidObjectException("Action Instance not found", 404)
+
+            CompletionJournalDal.append(session, action_instance, post_data)
+            self.store_service.set_completing(_id)
+            session.commit()
         return True
 
+    def drain_completions(self, claimant: str, count: int, claim_time: int) -> int:
+        """
+        Claim up to count journaled completions and apply them. The completions of one pipeline instance go through
+        a single workflow engine pass, under one hold of its lock and one commit. A batch that fails keeps its claim,
+        so it is applied again once the claim expires, until it has been tried COMPLETION_ATTEMPTS times.
+        :return: how many completions were applied
+        :rtype: int
+        """
+        for session in get_db_session():
+            completions = CompletionJournalDal.claim(session, claimant, count, claim_time)
+            session.commit()
+
+            batches = {}
+            for completion in completions:
+                batches.setdefault(completion.pipeline_instance_id, []).append(completion)
+
+            applied = 0
+            for pipeline_instance_id, batch in batches.items():
+                try:
+                    self._apply_completions(session, pipeline_instance_id, batch)
+                    applied += len(batch)
+                except Exception as exception:
+                    logger.error("Could not apply the completions of pipeline instance {}: {}".format(pipeline_instance_id, exception))
+                    session.rollback()
+
+            if applied:
+                QueueNotifier.notify()
+            return applied
+        return 0
+
+    def _apply_completions(self, session: ScopedSession, pipeline_instance_id: int, completions: List[PendingCompletion]):
+        abandoned = [completion for completion in completions if completion.attempts > self.COMPLETION_ATTEMPTS]
+        if abandoned:
+            for completion in abandoned:
+                logger.error("Dropping the completion of action instance {} after {} attempts.".format(completion.action_instance_id, completion.attempts - 1))
+            completions = [completion for completion in completions if completion not in abandoned]
+
+        # A client retrying /done sends the same payload again, only the last one counts.
+        latest = {}
+        for completion in completions:
+            latest[completion.action_instance_id] = completion
+
+        finished = []
+        for action_instance_id, completion in latest.items():
+            action_instance = session.query(ActionInstance).get(action_instance_id)
+            if action_instance is None:
+                continue
+
+            post_data = CompletionJournalDal.get_post_data(completion)
+            if not completion.statistics_saved:
+                action_instance.end_date = completion.received_date
+                completion.statistics_saved = True
+                self._save_statistics(action_instance, session, post_data)
+                session.commit()
+
+            status = self._get_final_status(action_instance, session, post_data)
+            if status is not None:
+                finished.append((action_instance, status))
+
+        action_instance_ids = {completion.action_instance_id for completion in completions + abandoned}
+        if finished:
+            with PipelineLocks.hold(session, pipeline_instance_id):
+                pipeline_instance = session.query(PipelineInstance).get(pipeline_instance_id)
+                workflow_engine = InstanceWorkflowEngine(StatusDal(session), pipeline_instance, session)
+                for action_instance, status in finished:
+                    workflow_engine.complete_an_action(action_instance.id, status.id)
+                for instance in workflow_engine.instances_to_add:
+                    session.add(instance)
+                CompletionJournalDal.remove(session, completions + abandoned)
+                session.commit()
+
+            for action_instance, _ in finished:
+                self.event_service.trigger_possible_event(pipeline_instance, action_instance, session)
+        else:
+            CompletionJournalDal.remove(session, completions + abandoned)
+            session.commit()
+
+        for action_instance_id in action_instance_ids:
+            self.store_service.clear_completing(action_instance_id)
+
     def callback_action_instance(self, _id: int, post_data: Dict):
         for session in get_db_session():
             self._save_status(self.get_action_instance_by_id(_id, session), session, post_data, True)
+        QueueNotifier.notify()
         return True
 
     def reset_pipeline_instance(self, pipeline_instance_id: int):
         for session in get_db_session():
-            pipeline_instance = session.query(PipelineInstance)\
-                                              .options(
-                                                  joinedload(PipelineInstance.stage_instances)
-                                                  .joinedload(StageInstance.workflow_instances)
-                                                  .joinedload(WorkflowInstance.action_instances)).filter(PipelineInstance.id == pipeline_instance_id).first()
-
-            instance_workflow_engine = InstanceWorkflowEngine(self.status_dal, pipeline_instance)
-            instance_workflow_engine.reset_pipeline()
-            session.commit()
+            with PipelineLocks.hold(session, pipeline_instance_id):
+                pipeline_instance = session.query(PipelineInstance)\
+                                                  .options(
+                                                      joinedload(PipelineInstance.stage_instances)
+                                                      .joinedload(StageInstance.workflow_instances)
+                                                      .joinedload(WorkflowInstance.action_instances)).filter(PipelineInstance.id == pipeline_instance_id).first()
+
+                instance_workflow_engine = InstanceWorkflowEngine(self.status_dal, pipeline_instance)
+                instance_workflow_engine.reset_pipeline()
+                session.commit()
+        QueueNotifier.notify()
         return True
 
     @staticmethod
@@ -207,38 +483,29 @@ class ActionDal(GeneralDal, Injectable):
                 for action_instance in workflow_instance.action_instances:
                     print("    action: {}, Status: {}, Start Date: {}, End Date: {}, Order: {}, Slice: {}".format(action_instance.id, action_instance.status_id, action_instance.start_date, action_instance.end_date, action_instance.order, action_instance.slice))
 
-    def _get_loaded_pipeline_instance(self, session: ScopedSession, action_instance: ActionInstance) -> PipelineInstance:
-        return session.query(PipelineInstance) \
-            .options(
-            joinedload(PipelineInstance.action_instances),
-            joinedload(PipelineInstance.stage_instances) \
-                .joinedload(StageInstance.workflow_instances) \
-                .joinedload(WorkflowInstance.action_instances)).get(action_instance.pipeline_instance_id)
-
-    def reset_action_instance(self, _id: int, complete_reset: bool = False, check_status: bool = False):  # pylint: disable=unused-argument
+    def reset_action_instance(self, _id: int, complete_reset: bool = False, check_status: bool = False):
         for session in get_db_session():
             action_instance = session.query(ActionInstance).get(_id)
-            if check_status and action_instance.status_id != StatusConstants.INPROGRESS:
+            if action_instance is None:
                 return False
 
-            pipeline_instance = self._get_loaded_pipeline_instance(session, action_instance)
+            with PipelineLocks.hold(session, action_instance.pipeline_instance_id):
+                # The status may have changed while waiting on the lock.
+                session.refresh(action_instance)
+                if check_status and action_instance.status_id != StatusConstants.INPROGRESS:
+                    return False
 
-            action_instances = ObjectFilters.by_attribute('id', action_instance.id, pipeline_instance.action_instances)
-            if not action_instances:
-                return False
-
-            action_instance =  action_instances[0]
-
-            instance_workflow_engine = InstanceWorkflowEngine(self.status_dal, pipeline_instance)
-            reset_ids = instance_workflow_engine.reset_action(action_instance, complete_reset=complete_reset)
+                instance_workflow_engine = InstanceWorkflowEngine(self.status_dal, action_instance.pipeline_instance, session)
+                reset_ids = instance_workflow_engine.reset_action(action_instance, complete_reset=complete_reset)
 
-            session.commit()
+                session.commit()
 
             if self.qa_module is not None and reset_ids:
                 for action_instance_id in reset_ids:
                     self.qa_module.reset_results(action_instance_id, session)
 
                 session.commit()
+        QueueNotifier.notify()
         return True
 
     def cancel_action_instance(self, action_instance_id: int):
@@ -247,99 +514,137 @@ class ActionDal(GeneralDal, Injectable):
 
             if action_instance:
                 serialized = action_instance.serialize()
-                instance_workflow_engine = InstanceWorkflowEngine(StatusDal(session), action_instance.pipeline_instance)
-                instance_workflow_engine.complete_an_action(action_instance_id, StatusConstants.CANCELED)
+                with PipelineLocks.hold(session, action_instance.pipeline_instance_id):
+                    instance_workflow_engine = InstanceWorkflowEngine(StatusDal(session), action_instance.pipeline_instance, session)
+                    instance_workflow_engine.complete_an_action(action_instance_id, StatusConstants.CANCELED)
+                    session.commit()
                 self.queue_constants.cancel_worker(serialized)
-                session.commit()
             else:
                 raise InvalidObjectException("Action Instance not found", 404)
         return {"message": "Action Instance has been canceled."}
 
+    def reconcile_ready_queue(self):
+        """
+        Promote stalled NEW ActionInstances to READY and bring the ready queue back in step with the
+        ActionInstance statuses.
+        """
+        for session in get_db_session():
+            promoted = self._promote_stalled_action_instances(session)
+            session.flush()
+            queued = self.ready_queue_dal.reconcile(session)
+            session.commit()
+            if promoted or queued:
+                QueueNotifier.notify()
+
     def reconcile_pipeline_instances(self):
+        """
+        Finish the in progress pipeline instances that have no action instances left to run. The highest status and
+        latest end date are rolled up from actions to workflows, stages and pipelines with a single GROUP BY query
+        over the stuck pipelines, and written back with bulk UPDATEs.
+        """
         for session in get_db_session():
-            action_query = session.query(ActionInstance).filter(ActionInstance.status_id <= StatusConstants.INPROGRESS).subquery('ai')
-            pipeline_instances = session.query(PipelineInstance).filter(PipelineInstance.status_id == StatusConstants.INPROGRESS)\
-                .filter(~exists().where(PipelineInstance.id == action_query.c.pipeline_instance_id))
-            
-            for pipeline_instance in pipeline_instances.all():
-                query = session.query(StageInstance, WorkflowInstance, ActionInstance).filter(and_(
-                    StageInstance.pipeline_instance_id == pipeline_instance.id,
-                    WorkflowInstance.stage_instance_id == StageInstance.id,
-                    ActionInstance.workflow_instance_id == WorkflowInstance.id
-                )).order_by(asc(StageInstance.id), asc(WorkflowInstance.id), asc(ActionInstance.id))
-
-                highest_status_id = None
-                highest_end_date = None
-                mappings = {}
-                for stage_instance, workflow_instance, action_instance in query.all():
-                    if stage_instance.end_date is None:
-                        work_name = 'workflow_{}'.format(workflow_instance.id)
-                        if work_name not in mappings:
-                            mappings[work_name] = {'obj': workflow_instance,
-                                                   'highest_status_id': workflow_instance.status_id,
-                                                   'highest_end_date': workflow_instance.end_date,
-                                                   'stage_obj': stage_instance}
-
-                        if workflow_instance.end_date is None:
-                            workflow_check = mappings[work_name]
-                            if workflow_check['highest_status_id'] < action_instance.status_id:
-                                workflow_check['highest_status_id'] = action_instance.status_id
-
-                            if (workflow_check['highest_end_date'] is None and action_instance.end_date) or \
-                               (action_instance.end_date and workflow_check['highest_end_date'] < action_instance.end_date):
-                                workflow_check['highest_end_date'] = action_instance.end_date
-
-                for mapping in list(mappings.values()):
-                    workflow = mapping['obj']
-                    stage = mapping['stage_obj']
-
-                    workflow.status_id = mapping['highest_status_id']
-                    workflow.end_date = mapping['highest_end_date']
-                    
-                    if stage.status_id < workflow.status_id:
-                        stage.status_id = workflow.status_id
-                        highest_status_id = stage.status_id
-
-                    if (stage.end_date is None and workflow.end_date) or (workflow.end_date and stage.end_date < workflow.end_date):
-                        stage.end_date = workflow.end_date
-                        highest_end_date = stage.end_date
-
-                if highest_status_id is not None and highest_end_date is not None:
-                    logger.info("Reconciling PipelineInstance: {}".format(pipeline_instance.id))
-                    pipeline_instance.status_id = highest_status_id
-                    pipeline_instance.end_date = highest_end_date
+            workflow_changes = []
+            stages = {}
+            for row in self._get_stuck_workflow_rollups(session):
+                workflow_status_id = row.workflow_status_id
+                workflow_end_date = row.workflow_end_date
+                if workflow_end_date is None:
+                    workflow_status_id = max(workflow_status_id, row.highest_status_id)
+                    workflow_end_date = row.highest_end_date
+                    if workflow_status_id != row.workflow_status_id or workflow_end_date is not None:
+                        workflow_changes.append({'id': row.workflow_instance_id, 'status_id': workflow_status_id,
+                                                 'end_date': workflow_end_date})
+
+                stage = stages.setdefault(row.stage_instance_id, {'pipeline_instance_id': row.pipeline_instance_id,
+                                                                  'original_status_id': row.stage_status_id,
+                                                                  'status_id': row.stage_status_id,
+                                                                  'end_date': None})
+                stage['status_id'] = max(stage['status_id'], workflow_status_id)
+                stage['end_date'] = self._latest(stage['end_date'], workflow_end_date)
+
+            stage_changes = []
+            pipelines = {}
+            for stage_instance_id, stage in stages.items():
+                raised_status = stage['status_id'] > stage['original_status_id']
+                if not raised_status and stage['end_date'] is None:
+                    continue
+
+                change = {'id': stage_instance_id}
+                pipeline = pipelines.setdefault(stage['pipeline_instance_id'], {'id': stage['pipeline_instance_id'], 'status_id': None, 'end_date': None})
+                if raised_status:
+                    change['status_id'] = stage['status_id']
+                    pipeline['status_id'] = max(pipeline['status_id'] or 0, stage['status_id'])
+                if stage['end_date'] is not None:
+                    change['end_date'] = stage['end_date']
+                    pipeline['end_date'] = self._latest(pipeline['end_date'], stage['end_date'])
+                stage_changes.append(change)
+
+            pipeline_changes = [pipeline for pipeline in pipelines.values() if pipeline['status_id'] is not None and pipeline['end_date'] is not None]
+            for pipeline in pipeline_changes:
+                logger.info("Reconciling PipelineInstance: {}".format(pipeline['id']))
+
+            if workflow_changes:
+                session.bulk_update_mappings(WorkflowInstance, workflow_changes)
+            if stage_changes:
+                session.bulk_update_mappings(StageInstance, stage_changes)
+            if pipeline_changes:
+                session.bulk_update_mappings(PipelineInstance, pipeline_changes)
 
             session.commit()
 
-    def _wait_for_parallel_calculations(self, action_instance: ActionInstance):
-        is_calculating = StoreService.is_calculating_workflow(action_instance.pipeline_instance_id)
-        if is_calculating:
-            count = 0
-            while count < 5 and is_calculating:
-                time.sleep(.1)
-                is_calculating = StoreService.is_calculating_workflow(action_instance.pipeline_instance_id)
-                count += 1
+    @staticmethod
+    def _latest(current, other):
+        if other is not None and (current is None or current < other):
+            return other
+        return current
 
-    def _save_status(self, action_instance: ActionInstance, session: ScopedSession, post_data: Dict, allow_save: bool = False):
+    @staticmethod
+    def _get_stuck_workflow_rollups(session):
+        """
+        One row per workflow instance in an unfinished stage of an in progress pipeline instance without any action
+        instances left to run, with the highest status and latest end date of its action instances.
+        """
+        active_actions = select(ActionInstance.id).where(and_(ActionInstance.pipeline_instance_id == PipelineInstance.id,
+                                                             ActionInstance.status_id <= StatusConstants.INPROGRESS))
+        stuck_pipelines = select(PipelineInstance.id).where(and_(PipelineInstance.status_id == StatusConstants.INPROGRESS,
+                                                                ~active_actions.exists()))
+        query = select(StageInstance.pipeline_instance_id,
+                       StageInstance.id.label('stage_instance_id'),
+                       StageInstance.status_id.label('stage_status_id'),
+                       WorkflowInstance.id.label('workflow_instance_id'),
+                       WorkflowInstance.status_id.label('workflow_status_id'),
+                       WorkflowInstance.end_date.label('workflow_end_date'),
+                       func.max(ActionInstance.status_id).label('highest_status_id'),
+                       func.max(ActionInstance.end_date).label('highest_end_date'))\
+            .where(and_(StageInstance.pipeline_instance_id.in_(stuck_pipelines),
+                        StageInstance.end_date == None,
+                        WorkflowInstance.stage_instance_id == StageInstance.id,
+                        ActionInstance.workflow_instance_id == WorkflowInstance.id))\
+            .group_by(StageInstance.pipeline_instance_id, StageInstance.id, StageInstance.status_id,
+                      WorkflowInstance.id, WorkflowInstance.status_id, WorkflowInstance.end_date)\
+            .order_by(asc(StageInstance.id), asc(WorkflowInstance.id))
+        return session.execute(query).all()
+
+    def _get_final_status(self, action_instance: ActionInstance, session: ScopedSession, post_data: Dict, allow_save: bool = False):
         if 'status' in post_data:
             status = self.get_status_by_name(post_data['status'], session)
 
             if action_instance.callback_required and status.type == StatusTypes.SUCCESS and not allow_save:
                 # Allow_save comes from callback_method.
-                return
-
-            self._wait_for_parallel_calculations(action_instance)
-
-            pipeline_instance = session.query(PipelineInstance).options(
-                joinedload(PipelineInstance.stage_instances)
-                .joinedload(StageInstance.workflow_instances)
-                .joinedload(WorkflowInstance.action_instances)
-            ).options(joinedload(PipelineInstance.parameters)).get(action_instance.pipeline_instance_id)
-            workflow_engine = InstanceWorkflowEngine(StatusDal(session), pipeline_instance)
-            workflow_engine.complete_an_action(action_instance.id, status.id)
-            for instance in workflow_engine.instances_to_add:
-                session.add(instance)
-            session.commit()
+                return None
+            return status
+        return None
+
+    def _save_status(self, action_instance: ActionInstance, session: ScopedSession, post_data: Dict, allow_save: bool = False):
+        status = self._get_final_status(action_instance, session, post_data, allow_save)
+        if status is not None:
+            with PipelineLocks.hold(session, action_instance.pipeline_instance_id):
+                pipeline_instance = session.query(PipelineInstance).get(action_instance.pipeline_instance_id)
+                workflow_engine = InstanceWorkflowEngine(StatusDal(session), pipeline_instance, session)
+                workflow_engine.complete_an_action(action_instance.id, status.id)
+                for instance in workflow_engine.instances_to_add:
+                    session.add(instance)
+                session.commit()
 
             self.event_service.trigger_possible_event(pipeline_instance, action_instance, session)
 
@@ -353,16 +658,10 @@ class ActionDal(GeneralDal, Injectable):
             logger.error(exception)
 
     def _save_status_information(self, action_instance: ActionInstance, session: ScopedSession, post_data: Dict):
-        check = '{}__{}'.format(action_instance.pipeline_instance_id, action_instance.action_id)
-        if self.store_service.is_completing(check):
-            time.sleep(random.randint(3, 10) * 0.01)
-
-        self.store_service.set_completing(check)
         try:
             self._save_status(action_instance, session, post_data)
         except Exception as exception:
             logger.error(exception)
-        self.store_service.clear_completing(check)
 
     def _save_parameters(self, pipeline_instance_id: int , session: ScopedSession, post_data: Dict):
         if 'parameters' in post_data:
@@ -381,48 +680,41 @@ class ActionDal(GeneralDal, Injectable):
                 pipeline_parameter.value = str(value)
             session.commit()
 
-    def _save_stats(self, pipeline_instance_id:int , session: ScopedSession, post_data: Dict):  # pylint: disable=too-many-locals
+    def _save_stats(self, pipeline_instance_id:int , session: ScopedSession, post_data: Dict):
         if 'stats' in post_data:
-            statistics_cache = {}
-            stats_needed = list(post_data['stats'].keys())
-
-            for stat in session.query(Statistics).filter(Statistics.name.in_(list(post_data['stats'].keys()))):
-                try:
-                    if stat.name in stats_needed:
-                        clone_stats = list(stats_needed)
-                        for index, item in enumerate(stats_needed):
-                            if item == stat.name:
-                                del clone_stats[index]
-                                break
-                        stats_needed = clone_stats
-                    statistics_cache[stat.name] = stat
-                except Exception:
-                    import traceback
-                    traceback.print_exc()
-
-            for stat_to_create in stats_needed:
-                stat = Statistics(name=stat_to_create)
-                session.add(stat)
-
-                statistics_cache[stat.name] = stat
-
-            session.flush()
-            session.commit()
+            statistics_ids = self._get_statistics_ids(session, list(post_data['stats'].keys()))
 
             for key, value in post_data['stats'].items():
-                stats = PipelineStatistics(pipeline_instance_id=pipeline_instance_id, statistics_id=statistics_cache[key].id, value=value)
+                stats = PipelineStatistics(pipeline_instance_id=pipeline_instance_id, statistics_id=statistics_ids[key], value=value)
                 session.add(stats)
 
             session.commit()
 
+    @staticmethod
+    def _get_statistics_ids(session: ScopedSession, names: List[str]) -> Dict:
+        """
+        Statistics ids by name, through the reference cache, creating the statistics seen for the first time.
+        """
+        def load(missing):
+            return {stat.name: stat.id for stat in session.query(Statistics).filter(Statistics.name.in_(missing))}
+
+        statistics_ids = ReferenceCache.get_many(Statistics.__tablename__, names, load)
+        created = [Statistics(name=name) for name in names if name not in statistics_ids]
+        if created:
+            session.add_all(created)
+            session.flush()
+            session.commit()
+            for stat in created:
+                statistics_ids[stat.name] = stat.id
+                ReferenceCache.put(Statistics.__tablename__, stat.name, stat.id)
+        return statistics_ids
+
     def partial_edit(self, _id:int , changes: Dict):
+        if changes.get('status_id') is not None and 'lease_expiration' not in changes:
+            # Pushed work is not leased, don't let an old lease expire it.
+            changes = dict(changes, lease_expiration=None)
         for session in get_db_session():
             return self.edit_object(session, ActionInstance, _id, changes).serialize()
 
     def get_status_by_name(self, name:str, session: ScopedSession = None):
-        if session is not None:
-            return session.query(Status).filter(func.lower(Status.name) == name.lower()).first()
-
-        for new_session in get_db_session():
-            status = new_session.query(Status).filter(func.lower(Status.name) == name.lower()).first()
-            return status.serialize() if status else None
+        return StatusDal(session).get_status_by_name(name)
@@ -15,23 +15,40 @@
 """
 
 from rapid.lib.framework.injectable import Injectable
+from rapid.master.master_configuration import MasterConfiguration
 from rapid.workflow.action_dal import ActionDal
+from rapid.workflow.completion_worker import CompletionWorker
 
 
 class ActionInstanceService(Injectable):
 
-    def __init__(self, action_dal: ActionDal):
+    def __init__(self, action_dal: ActionDal, rapid_config: MasterConfiguration = None):
         self.action_dal = action_dal
+        self.rapid_config = rapid_config
+
+    @property
+    def journals_completions(self):
+        return bool(self.rapid_config is not None and self.rapid_config.completion_journal)
 
     def finish_action_instance(self, _id, post_data):
         self.action_dal.complete_action_instance(_id, post_data)
 
+    def journal_finished_action_instance(self, _id, post_data):
+        self.action_dal.journal_completion(_id, post_data)
+        CompletionWorker.notify()
+
+    def drain_completions(self, claimant, count, claim_time):
+        return self.action_dal.drain_completions(claimant, count, claim_time)
+
     def get_action_instance_by_id(self, _id):
         return self.action_dal.get_action_instance_by_id(_id)
 
     def edit_action_instance(self, _id, changes):
         return self.action_dal.partial_edit(_id, changes)
 
+    def claim_action_instance(self, _id, assigned_to):
+        return self.action_dal.claim_action_instance(_id, assigned_to)
+
     def reset_action_instance(self, _id, complete_reset=False, check_status=False):
         return self.action_dal.reset_action_instance(_id, complete_reset, check_status)
 
@@ -43,3 +60,15 @@ class ActionInstanceService(Injectable):
 
     def reconcile_pipeline_instances(self):
         return self.action_dal.reconcile_pipeline_instances()
+
+    def reconcile_ready_queue(self):
+        return self.action_dal.reconcile_ready_queue()
+
+    def lease_work_requests(self, client, count, lease_time):
+        return self.action_dal.lease_work_requests(client, count, lease_time)
+
+    def renew_leases(self, action_instance_ids, assigned_to, lease_time):
+        return self.action_dal.renew_leases(action_instance_ids, assigned_to, lease_time)
+
+    def expire_leases(self):
+        return self.action_dal.expire_leases()
@@ -15,6 +15,7 @@
 """
 # pylint: disable=broad-except,too-many-public-methods
 import logging
+import time
 from typing import Dict, List, Tuple
 
 from flask_sqlalchemy.query import Query
@@ -37,10 +38,13 @@ from rapid.lib.constants import Constants
 from rapid.lib.modules import QaModule
 from rapid.lib import json_response, api_key_required, get_declarative_base, get_db_session
 from rapid.lib.utils import ORMUtil, RoutingUtil
+from rapid.lib.queue_metrics import QueueMetrics
+from rapid.lib.queue_notifier import QueueNotifier
 from rapid.lib.store_service import StoreService
 from rapid.lib.version import Version
 from rapid.lib.work_request import WorkRequestEncoder
 from rapid.lib.framework.injectable import Injectable
+from rapid.master.communicator.client import Client
 from rapid.master.data.database.dal import get_dal
 from rapid.release.release_service import ReleaseService
 from rapid.workflow.action_instances_service import ActionInstanceService
@@ -51,6 +55,9 @@ logger = logging.getLogger("rapid")
 
 
 class APIRouter(Injectable):
+    LEASE_BACKOFF_TIME = 0.25
+    LEASE_BACKOFF_MAX_TIME = 2
+
     classes, models, table_names = None, None, None
     class_map = {}
 
@@ -88,6 +95,9 @@ class APIRouter(Injectable):
 
         flask_app.add_url_rule('/api/pipeline_instances/<int:_id>/failure_count', 'failure_count_instance', api_key_required(self.failure_count_instance))
         flask_app.add_url_rule('/api/queue', 'get_queue', api_key_required(self.get_queue), methods=['GET'])
+        flask_app.add_url_rule('/api/queue/metrics', 'get_queue_metrics', api_key_required(self.get_queue_metrics), methods=['GET'])
+        flask_app.add_url_rule('/api/work/lease', 'lease_work', api_key_required(self.lease_work), methods=['POST'])
+        flask_app.add_url_rule('/api/work/lease/renew', 'renew_work_leases', api_key_required(self.renew_work_leases), methods=['POST'])
         flask_app.add_url_rule('/api/pipeline_instances/<int:_id>/reset', 'reset_pipeline_instance', api_key_required(self.reset_pipeline_instance), methods=['POST', 'GET'])
 
         flask_app.add_url_rule("/api/reports/canned/<path:report_name>", 'canned_report', api_key_required(self.canned_report), methods=['GET'])
@@ -116,6 +126,46 @@ class APIRouter(Injectable):
     def get_queue(self):
         return Response(json.dumps(self.queue_service.get_current_work(), cls=WorkRequestEncoder), content_type='application/json')
 
+    def get_queue_metrics(self):
+        return Response(json.dumps(QueueMetrics.get_metrics()), content_type='application/json')
+
+    def lease_work(self):
+        """
+        Long-poll for work on behalf of a pull mode client. Holds the request open until work the client
+        can handle is leased to it, or lease_poll_timeout passes. Empty polls back off, doubling from
+        LEASE_BACKOFF_TIME up to LEASE_BACKOFF_MAX_TIME, before waiting for the next queue signal.
+        """
+        current_request = self.http_wrapper.current_request()
+        data = current_request.get_json()
+        client = Client(current_request.remote_addr, int(data['port']), data.get('grains'), data.get('grain_restrict', False))
+        free_slots = int(data.get('free_slots', 1))
+        lease_time = self.app.rapid_config.lease_time
+        deadline = time.time() + min(float(data.get('wait', self.app.rapid_config.lease_poll_timeout)), self.app.rapid_config.lease_poll_timeout)
+
+        work_requests = []
+        backoff_time = self.LEASE_BACKOFF_TIME
+        while free_slots > 0:
+            signal = StoreService.get_queue_signal()
+            work_requests = self.action_instance_service.lease_work_requests(client, free_slots, lease_time)
+            if work_requests or deadline <= time.time():
+                break
+            time.sleep(min(backoff_time, max(deadline - time.time(), 0)))
+            backoff_time = min(backoff_time * 2, self.LEASE_BACKOFF_MAX_TIME)
+            if not QueueNotifier.wait_for_signal(signal, deadline - time.time()):
+                break
+
+        return Response(json.dumps({'lease_time': lease_time, 'work_requests': work_requests}, cls=WorkRequestEncoder),
+                        content_type='application/json',
+                        headers={Version.HEADER: Version.get_version()})
+
+    def renew_work_leases(self):
+        current_request = self.http_wrapper.current_request()
+        data = current_request.get_json()
+        renewed = self.action_instance_service.renew_leases(data.get('action_instance_ids', []),
+                                                            "{}:{}".format(current_request.remote_addr, data['port']),
+                                                            self.app.rapid_config.lease_time)
+        return Response(json.dumps({'renewed': renewed, 'lease_time': self.app.rapid_config.lease_time}), content_type='application/json')
+
     def failure_count_instance(self, _id):
         pass
 
@@ -367,7 +417,11 @@ class APIRouter(Injectable):
 
     def finish_action_instance(self, _id):
         try:
-            return Response(json.dumps(self.action_instance_service.finish_action_instance(_id, self.http_wrapper.current_request().get_json())), content_type='application/json')
+            post_data = self.http_wrapper.current_request().get_json()
+            if self.action_instance_service.journals_completions:
+                self.action_instance_service.journal_finished_action_instance(_id, post_data)
+                return Response(json.dumps({"message": "Completion accepted"}), content_type='application/json', status=202)
+            return Response(json.dumps(self.action_instance_service.finish_action_instance(_id, post_data)), content_type='application/json')
         except Exception as exception:
             logger.error(exception)
             return Response("Something went wrong!", status=500)
@@ -0,0 +1,62 @@
+"""
+ Copyright (c) 2015 Michael Bright and Bamboo HR LLC
+
+ Licensed under the Apache License, Version 2.0 (the "License");
+ you may not use this file except in compliance with the License.
+ You may obtain a copy of the License at
+
+ http://www.apache.org/licenses/LICENSE-2.0
+
+ Unless required by applicable law or agreed to in writing, software
+ distributed under the License is distributed on an "AS IS" BASIS,
+ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ See the License for the specific language governing permissions and
+ limitations under the License.
+"""
+# pylint: disable=broad-except
+import logging
+import threading
+
+logger = logging.getLogger("rapid")
+
+
+class CompletionWorker(object):
+    """
+    Applies the completions journaled by /done. Every worker loops claiming a batch of pending completions and
+    handing it to drain, which applies the ones of the same pipeline instance together.
+
+    Completions journaled in this process wake the workers straight away through a threading.Event; the ones
+    journaled elsewhere, or left behind by a worker that died, are picked up every POLL_TIME seconds.
+    """
+    POLL_TIME = 2
+
+    _event = threading.Event()
+
+    def __init__(self, drain, claimant, batch_size, claim_time):
+        """
+        :param drain: called with (claimant, batch_size, claim_time), returns how many completions it applied
+        """
+        self.drain = drain
+        self.claimant = claimant
+        self.batch_size = batch_size
+        self.claim_time = claim_time
+
+    @classmethod
+    def notify(cls):
+        cls._event.set()
+
+    def run(self):
+        while True:
+            if not self.run_once():
+                self._wait()
+
+    def run_once(self):
+        try:
+            return self.drain(self.claimant, self.batch_size, self.claim_time)
+        except Exception as exception:
+            logger.exception(exception)
+        return 0
+
+    def _wait(self):
+        if self._event.wait(self.POLL_TIME):
+            self._event.clear()
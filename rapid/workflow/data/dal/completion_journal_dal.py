@@ -0,0 +1,93 @@
+"""
+ Copyright (c) 2015 Michael Bright and Bamboo HR LLC
+
+ Licensed under the Apache License, Version 2.0 (the "License");
+ you may not use this file except in compliance with the License.
+ You may obtain a copy of the License at
+
+ http://www.apache.org/licenses/LICENSE-2.0
+
+ Unless required by applicable law or agreed to in writing, software
+ distributed under the License is distributed on an "AS IS" BASIS,
+ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ See the License for the specific language governing permissions and
+ limitations under the License.
+"""
+# pylint: disable=singleton-comparison
+import datetime
+
+from sqlalchemy import select, or_
+
+from rapid.lib.framework.injectable import Injectable
+from rapid.workflow.data.dal.ready_queue_dal import ReadyQueueDal
+from rapid.workflow.data.models import PendingCompletion
+
+try:
+    import simplejson as json
+except ImportError:
+    import json
+
+
+class CompletionJournalDal(Injectable):
+    """
+    The pending_completions table, where /done payloads wait for the completion workers when completion_journal
+    is on.
+    """
+
+    @staticmethod
+    def append(session, action_instance, post_data):
+        completion = PendingCompletion(action_instance_id=action_instance.id,
+                                       pipeline_instance_id=action_instance.pipeline_instance_id,
+                                       payload=json.dumps(post_data),
+                                       received_date=datetime.datetime.utcnow(),
+                                       statistics_saved=False,
+                                       attempts=0)
+        session.add(completion)
+        return completion
+
+    @staticmethod
+    def claim(session, claimant, count, claim_time):
+        """
+        Claim up to count pending completions for claimant, oldest first, following ReadyQueueDal.claim. Every
+        claim counts as an attempt at applying the completion, and a claimed completion, claimant's own included,
+        is only claimed again once its claim expires.
+        Commit before applying them to release the row locks.
+        :return: the claimed completions, oldest first
+        :rtype: list
+        """
+        table = PendingCompletion.__table__
+        now = datetime.datetime.utcnow()
+        claimable = or_(table.c.claimed_by == None, table.c.claim_expiration < now)
+
+        candidates = select(table.c.id).where(claimable).order_by(table.c.id.asc())
+        if count:
+            candidates = candidates.limit(count)
+        if ReadyQueueDal.supports_skip_locked(session):
+            candidates = candidates.with_for_update(skip_locked=True)
+        ids = [row[0] for row in session.execute(candidates)]
+        if not ids:
+            return []
+
+        session.execute(table.update()
+                        .where(table.c.id.in_(ids))
+                        .where(claimable)
+                        .values(claimed_by=claimant,
+                                claim_expiration=now + datetime.timedelta(seconds=claim_time),
+                                attempts=table.c.attempts + 1))
+        return session.query(PendingCompletion)\
+            .filter(PendingCompletion.id.in_(ids))\
+            .filter(PendingCompletion.claimed_by == claimant)\
+            .order_by(PendingCompletion.id.asc())\
+            .populate_existing()\
+            .all()
+
+    @staticmethod
+    def remove(session, completions):
+        ids = [completion.id for completion in completions]
+        if ids:
+            table = PendingCompletion.__table__
+            session.execute(table.delete().where(table.c.id.in_(ids)))
+
+    @staticmethod
+    def get_post_data(completion):
+        return json.loads(completion.payload)
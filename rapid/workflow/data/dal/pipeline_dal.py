@@ -30,7 +30,10 @@ from sqlalchemy.sql.expression import asc
 
 from rapid.lib.queue_handler_constants import QueueHandlerConstants
 from rapid.lib.exceptions import InvalidObjectException
+from rapid.lib.queue_notifier import QueueNotifier
+from rapid.lib.reference_cache import ReferenceCache
 from rapid.lib.store_service import StoreService
+from rapid.master.communicator.client_registry import ClientRegistry
 from rapid.workflow.data.models import PipelineEvent
 from rapid.lib import api_key_required, get_db_session
 from rapid.lib.constants import StatusConstants
@@ -96,11 +99,14 @@ class PipelineDal(GeneralDal, Injectable):
             return session.query(Pipeline).get(pipeline_id)
 
     def get_pipeline_events_by_pipeline_id(self, pipeline_id, session=None):
+        return ReferenceCache.get(PipelineEvent.__tablename__, pipeline_id, lambda: self._load_pipeline_events(pipeline_id, session))
+
+    @staticmethod
+    def _load_pipeline_events(pipeline_id, session=None):
         if session is None:
             for db_session in get_db_session():
                 return [event.serialize() for event in db_session.query(PipelineEvent).filter(PipelineEvent.pipeline_id == pipeline_id).all()]
-        else:
-            return session.query(PipelineEvent).filter(PipelineEvent.pipeline_id == pipeline_id).all()
+        return [event.serialize() for event in session.query(PipelineEvent).filter(PipelineEvent.pipeline_id == pipeline_id).all()]
 
     def get_pipeline_instance_by_id(self, pipeline_instance_id, session=None):
         if session is None:
@@ -237,6 +243,7 @@ class PipelineDal(GeneralDal, Injectable):
                 logger.error(exception)
 
             session.commit()
+            QueueNotifier.notify()
             create_pipeline_instance = pipeline_instance.serialize()
             return create_pipeline_instance
         try:
@@ -249,10 +256,10 @@ class PipelineDal(GeneralDal, Injectable):
         for session in get_db_session():
             pipeline_instance = self.get_pipeline_instance_by_id(pipeline_instance_id, session)
             if pipeline_instance:
+                clients = StoreService.get_clients(self.app)
                 for action_instance in pipeline_instance.action_instances:
-                    for client in StoreService.get_clients(self.app).values():
-                        if action_instance.status_id <= StatusConstants.SUCCESS and client.get_uri() == action_instance.assigned_to:
-                            self.queue_constants.cancel_worker(action_instance.serialize())
+                    if action_instance.status_id <= StatusConstants.SUCCESS and ClientRegistry.get_assigned_client(clients, action_instance.assigned_to):
+                        self.queue_constants.cancel_worker(action_instance.serialize())
                 pipeline_instance.status_id = StatusConstants.CANCELED
                 pipeline_instance.end_date = datetime.datetime.utcnow()
                 session.commit()
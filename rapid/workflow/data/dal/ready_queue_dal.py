@@ -0,0 +1,252 @@
+"""
+ Copyright (c) 2015 Michael Bright and Bamboo HR LLC
+
+ Licensed under the Apache License, Version 2.0 (the "License");
+ you may not use this file except in compliance with the License.
+ You may obtain a copy of the License at
+
+ http://www.apache.org/licenses/LICENSE-2.0
+
+ Unless required by applicable law or agreed to in writing, software
+ distributed under the License is distributed on an "AS IS" BASIS,
+ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ See the License for the specific language governing permissions and
+ limitations under the License.
+"""
+# pylint: disable=singleton-comparison
+import datetime
+import logging
+import os
+import socket
+
+from sqlalchemy import event, func, select, or_, literal, DateTime
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import get_history
+from sqlalchemy.sql.expression import exists
+
+from rapid.lib.constants import StatusConstants
+from rapid.lib.framework.injectable import Injectable
+from rapid.workflow.data.models import ActionInstance, PipelineInstance, QueuedActionInstance
+
+logger = logging.getLogger("rapid")
+
+
+class ReadyQueueDal(Injectable):
+    """
+    Keeps the queued_action_instances table in step with ActionInstances entering and leaving READY.
+
+    Every ORM flush is inspected, so the InstanceWorkflowEngine, PipelineDal._setup_pipeline, resets and
+    queue handler assignments are all covered without having to call in here. Anything that changes
+    statuses outside of the ORM is picked up by reconcile.
+    """
+
+    @staticmethod
+    def register_listeners():
+        if not event.contains(Session, 'after_flush', ReadyQueueDal.after_flush):
+            event.listen(Session, 'after_flush', ReadyQueueDal.after_flush)
+
+    @staticmethod
+    def after_flush(session, flush_context):  # pylint: disable=unused-argument
+        to_enqueue = []
+        to_dequeue = set()
+        finished_pipelines = set()
+        priorities = {}
+
+        for instance in session.new:
+            if isinstance(instance, ActionInstance):
+                ReadyQueueDal._sort_action_instance(instance, to_enqueue, to_dequeue)
+
+        for instance in session.dirty:
+            if isinstance(instance, ActionInstance):
+                if ReadyQueueDal._has_changes(instance, 'status_id', 'manual'):
+                    ReadyQueueDal._sort_action_instance(instance, to_enqueue, to_dequeue)
+            elif isinstance(instance, PipelineInstance):
+                if ReadyQueueDal._has_changes(instance, 'status_id') and instance.status_id != StatusConstants.INPROGRESS:
+                    finished_pipelines.add(instance.id)
+                elif ReadyQueueDal._has_changes(instance, 'priority'):
+                    priorities[instance.id] = instance.priority or 0
+
+        for instance in session.deleted:
+            if isinstance(instance, ActionInstance):
+                to_dequeue.add(instance.id)
+
+        if to_enqueue or to_dequeue or finished_pipelines or priorities:
+            connection = session.connection()
+            ReadyQueueDal.dequeue(connection, list(to_dequeue) + [instance.id for instance in to_enqueue])
+            ReadyQueueDal._dequeue_pipelines(connection, finished_pipelines)
+            ReadyQueueDal._update_priorities(connection, priorities)
+            ReadyQueueDal.enqueue(connection, to_enqueue)
+
+    @staticmethod
+    def _has_changes(instance, *fields):
+        for field in fields:
+            if get_history(instance, field).has_changes():
+                return True
+        return False
+
+    @staticmethod
+    def _sort_action_instance(action_instance, to_enqueue, to_dequeue):
+        if action_instance.status_id == StatusConstants.READY and not action_instance.manual:
+            to_enqueue.append(action_instance)
+        else:
+            to_dequeue.add(action_instance.id)
+
+    @staticmethod
+    def enqueue(connection, action_instances):
+        if not action_instances:
+            return
+
+        table = QueuedActionInstance.__table__
+        pipeline_instance_ids = {action_instance.pipeline_instance_id for action_instance in action_instances}
+        pipelines = {}
+        for _id, priority, created_date in connection.execute(select(PipelineInstance.id, PipelineInstance.priority, PipelineInstance.created_date)
+                                                              .where(PipelineInstance.id.in_(pipeline_instance_ids))
+                                                              .where(PipelineInstance.status_id == StatusConstants.INPROGRESS)):
+            pipelines[_id] = (priority or 0, created_date)
+
+        rows = []
+        now = datetime.datetime.utcnow()
+        for action_instance in action_instances:
+            if action_instance.pipeline_instance_id in pipelines:
+                priority, created_date = pipelines[action_instance.pipeline_instance_id]
+                rows.append({'action_instance_id': action_instance.id,
+                             'pipeline_instance_id': action_instance.pipeline_instance_id,
+                             'priority': priority,
+                             'pipeline_created_date': created_date,
+                             'order': action_instance.order or 0,
+                             'slice': action_instance.slice or '',
+                             'queued_date': now})
+        if rows:
+            connection.execute(table.insert(), rows)
+
+    @staticmethod
+    def dequeue(connection, action_instance_ids):
+        if action_instance_ids:
+            table = QueuedActionInstance.__table__
+            connection.execute(table.delete().where(table.c.action_instance_id.in_(action_instance_ids)))
+
+    @staticmethod
+    def dequeue_dispatched(connection, action_instance_ids):
+        """
+        Dequeue action instances that were just handed out.
+        :return: when each of them was queued, for QueueMetrics
+        :rtype: list
+        """
+        if not action_instance_ids:
+            return []
+        table = QueuedActionInstance.__table__
+        queued_dates = [row[0] for row in connection.execute(select(table.c.queued_date).where(table.c.action_instance_id.in_(action_instance_ids)))]
+        ReadyQueueDal.dequeue(connection, action_instance_ids)
+        return queued_dates
+
+    @staticmethod
+    def _dequeue_pipelines(connection, pipeline_instance_ids):
+        if pipeline_instance_ids:
+            table = QueuedActionInstance.__table__
+            connection.execute(table.delete().where(table.c.pipeline_instance_id.in_(pipeline_instance_ids)))
+
+    @staticmethod
+    def _update_priorities(connection, priorities):
+        table = QueuedActionInstance.__table__
+        for pipeline_instance_id, priority in priorities.items():
+            connection.execute(table.update().where(table.c.pipeline_instance_id == pipeline_instance_id).values(priority=priority))
+
+    @staticmethod
+    def dispatch_order():
+        return (QueuedActionInstance.priority.desc(),
+                QueuedActionInstance.pipeline_created_date.asc(),
+                QueuedActionInstance.pipeline_instance_id.asc(),
+                QueuedActionInstance.order.asc(),
+                QueuedActionInstance.slice.asc())
+
+    @staticmethod
+    def get_claimant():
+        return "{}:{}".format(socket.gethostname(), os.getpid())
+
+    @staticmethod
+    def is_claimed_by(claimant):
+        return QueuedActionInstance.claimed_by == claimant
+
+    @staticmethod
+    def supports_skip_locked(session):
+        dialect = session.get_bind().dialect
+        if dialect.name in ('postgresql', 'oracle'):
+            return True
+        if dialect.name == 'mysql' and not getattr(dialect, 'is_mariadb', False):
+            return (dialect.server_version_info or (0,)) >= (8, 0, 1)
+        return False
+
+    @staticmethod
+    def claim(session, claimant, count, claim_time):
+        """
+        Claim up to count queued action instances for claimant, in dispatch order, so several dispatchers can
+        work the queue at once without handing out the same work. Rows held by any dispatcher, claimant included,
+        are skipped until their claim expires, so rows claimant could not dispatch yet do not hold back the ones
+        behind them: every claim starts after them, and they are only claimed again once their claim expires.
+
+        Rows are picked with SELECT ... FOR UPDATE SKIP LOCKED where the database supports it, so concurrent
+        dispatchers pick disjoint rows straight away. Everywhere else the UPDATE itself only takes rows that
+        are still claimable, so of two dispatchers racing for the same rows only one gets each row.
+        Commit before dispatching to release the row locks.
+        :param count: most rows to claim, 0 for all of them
+        :return: number of rows claimed
+        :rtype: int
+        """
+        table = QueuedActionInstance.__table__
+        now = datetime.datetime.utcnow()
+        claimable = or_(table.c.claimed_by == None, table.c.claim_expiration < now)
+
+        candidates = select(table.c.action_instance_id).where(claimable).order_by(*ReadyQueueDal.dispatch_order())
+        if count:
+            candidates = candidates.limit(count)
+        if ReadyQueueDal.supports_skip_locked(session):
+            candidates = candidates.with_for_update(skip_locked=True)
+        action_instance_ids = [row[0] for row in session.execute(candidates)]
+        if not action_instance_ids:
+            return 0
+
+        result = session.execute(table.update()
+                                 .where(table.c.action_instance_id.in_(action_instance_ids))
+                                 .where(claimable)
+                                 .values(claimed_by=claimant, claim_expiration=now + datetime.timedelta(seconds=claim_time)))
+        return result.rowcount
+
+    def reconcile(self, session):
+        """
+        Remove rows whose ActionInstance is no longer dispatchable, and queue READY ActionInstances that
+        were changed outside of the ORM.
+        :return: number of rows queued
+        :rtype: int
+        """
+        table = QueuedActionInstance.__table__
+        dispatchable = select(ActionInstance.id) \
+            .join(PipelineInstance, PipelineInstance.id == ActionInstance.pipeline_instance_id) \
+            .where(ActionInstance.status_id == StatusConstants.READY) \
+            .where(ActionInstance.manual == 0) \
+            .where(PipelineInstance.status_id == StatusConstants.INPROGRESS)
+
+        session.execute(table.delete().where(~table.c.action_instance_id.in_(dispatchable)))
+
+        missing = session.query(ActionInstance.id,
+                                ActionInstance.pipeline_instance_id,
+                                func.coalesce(PipelineInstance.priority, 0),
+                                PipelineInstance.created_date,
+                                ActionInstance.order,
+                                func.coalesce(ActionInstance.slice, ''),
+                                literal(datetime.datetime.utcnow(), DateTime)) \
+            .join(PipelineInstance, PipelineInstance.id == ActionInstance.pipeline_instance_id) \
+            .filter(ActionInstance.status_id == StatusConstants.READY) \
+            .filter(ActionInstance.manual == 0) \
+            .filter(PipelineInstance.status_id == StatusConstants.INPROGRESS) \
+            .filter(~exists().where(table.c.action_instance_id == ActionInstance.id))
+
+        result = session.execute(table.insert().from_select(['action_instance_id',
+                                                             'pipeline_instance_id',
+                                                             'priority',
+                                                             'pipeline_created_date',
+                                                             'order',
+                                                             'slice',
+                                                             'queued_date'], missing.statement))
+        if result.rowcount:
+            logger.info("Queued {} READY action instances missing from the ready queue.".format(result.rowcount))
+        return result.rowcount
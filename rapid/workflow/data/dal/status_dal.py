@@ -14,7 +14,10 @@
  limitations under the License.
 """
 
+from sqlalchemy import func
+
 from rapid.lib import get_db_session
+from rapid.lib.reference_cache import ReferenceCache
 from rapid.master.data.database.dal.general_dal import GeneralDal
 from rapid.workflow.data.models import Status
 
@@ -25,7 +28,15 @@ class StatusDal(GeneralDal):
         self.session = db_session
 
     def get_status_by_id(self, _id):
+        return ReferenceCache.get(Status.__tablename__, ('id', _id), lambda: self._load_status(Status.id == _id))
+
+    def get_status_by_name(self, name):
+        return ReferenceCache.get(Status.__tablename__, ('name', name.lower()), lambda: self._load_status(func.lower(Status.name) == name.lower()))
+
+    def _load_status(self, criterion):
         if self.session:
-            return self.session.query(Status).get(_id).serialize()
+            status = self.session.query(Status).filter(criterion).first()
+            return status.serialize() if status else None
         for session in get_db_session():
-            return session.query(Status).get(_id).serialize()
+            status = session.query(Status).filter(criterion).first()
+            return status.serialize() if status else None
@@ -17,7 +17,7 @@
 import datetime
 
 from sqlalchemy.orm import relationship
-from sqlalchemy import Column, String, ForeignKey, Integer, Boolean, Text
+from sqlalchemy import Column, String, ForeignKey, Integer, Boolean, Text, DateTime, Index
 
 from rapid.lib import get_declarative_base
 from rapid.lib.constants import StatusConstants
@@ -73,6 +73,7 @@ class ActionInstance(DateModel, BaseModel, Base):
     grain = Column(String(100))
     assigned_to = Column(String(150), nullable=True)
     slice = Column(String(25), default='')
+    lease_expiration = Column(DateTime, nullable=True, index=True)
 
     status_id = Column(Integer, ForeignKey('statuses.id'), nullable=False, index=True)
     action_id = Column(Integer, ForeignKey('actions.id'), nullable=False, index=True)
@@ -111,6 +112,22 @@ class Integration(BaseModel, Base):
     value = Column(String(500), nullable=False)
 
 
+class PendingCompletion(BaseModel, Base):
+    """
+    A /done payload accepted from a client but not yet applied, written when completion_journal is on. The
+    completion workers claim rows the same way the dispatchers claim QueuedActionInstances, apply them a
+    pipeline instance at a time and delete them.
+    """
+    action_instance_id = Column(Integer, ForeignKey('action_instances.id'), nullable=False, index=True)
+    pipeline_instance_id = Column(Integer, ForeignKey('pipeline_instances.id'), nullable=False, index=True)
+    payload = Column(Text, nullable=False)
+    received_date = Column(DateTime, nullable=False)
+    statistics_saved = Column(Boolean, default=False, nullable=False)
+    attempts = Column(Integer, default=0, nullable=False)
+    claimed_by = Column(String(100))
+    claim_expiration = Column(DateTime, index=True)
+
+
 class Pipeline(ActiveModel, Base):
     stages = relationship("Stage", backref="pipeline", order_by="asc(Stage.order)")
 
@@ -160,6 +177,32 @@ class PipelineStatistics(BaseModel, Base):
     statistics = relationship('Statistics', backref="pipeline_statistics")
 
 
+class QueuedActionInstance(BaseModel, Base):
+    """
+    An ActionInstance that is READY to be dispatched. Rows are maintained by ReadyQueueDal as
+    ActionInstances move in and out of READY, and carry the pipeline ordering so dispatch does
+    not have to join through the pipeline instances. A dispatcher claims rows before dispatching
+    them so several queue threads can share the table without handing out the same work.
+    """
+    action_instance_id = Column(Integer, ForeignKey('action_instances.id'), nullable=False, index=True)
+    pipeline_instance_id = Column(Integer, ForeignKey('pipeline_instances.id'), nullable=False, index=True)
+    priority = Column(Integer, nullable=False, default=0)
+    pipeline_created_date = Column(DateTime)
+    order = Column(Integer, nullable=False, default=0)
+    slice = Column(String(25), default='')
+    queued_date = Column(DateTime)
+    claimed_by = Column(String(100))
+    claim_expiration = Column(DateTime, index=True)
+
+
+Index('ix_queued_action_instances_dispatch',
+      QueuedActionInstance.priority.desc(),
+      QueuedActionInstance.pipeline_created_date,
+      QueuedActionInstance.pipeline_instance_id,
+      QueuedActionInstance.order,
+      QueuedActionInstance.slice)
+
+
 class Stage(ActiveModel, Base):
     order = Column(Integer, nullable=False, default=0, index=True)
     pipeline_id = Column(Integer, ForeignKey("pipelines.id"), nullable=False, index=True)
@@ -0,0 +1,84 @@
+"""
+ Copyright (c) 2015 Michael Bright and Bamboo HR LLC
+
+ Licensed under the Apache License, Version 2.0 (the "License");
+ you may not use this file except in compliance with the License.
+ You may obtain a copy of the License at
+
+ http://www.apache.org/licenses/LICENSE-2.0
+
+ Unless required by applicable law or agreed to in writing, software
+ distributed under the License is distributed on an "AS IS" BASIS,
+ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ See the License for the specific language governing permissions and
+ limitations under the License.
+"""
+import logging
+import threading
+from contextlib import contextmanager
+
+from sqlalchemy import text
+
+from rapid.lib.exceptions import PipelineLockTimeout
+from rapid.workflow.data.models import PipelineInstance
+
+logger = logging.getLogger("rapid")
+
+
+class PipelineLocks(object):
+    """
+    Serializes completions, cancels and resets of the same pipeline instance.
+
+    Inside the process each pipeline instance id has its own lock, waited on for at most WAIT_TIME seconds, after which
+    PipelineLockTimeout is raised without running the caller's block. Where the database can lock rows the pipeline
+    instance row is also selected FOR UPDATE, which serializes the other processes and is released by the database when
+    the session's transaction ends, even if the process dies holding it.
+    """
+    WAIT_TIME = 30
+
+    _locks = {}
+    _guard = threading.Lock()
+
+    @classmethod
+    @contextmanager
+    def hold(cls, session, pipeline_instance_id, wait_time=None):
+        wait_time = wait_time if wait_time is not None else cls.WAIT_TIME
+        lock = cls._checkout(pipeline_instance_id)
+        if not lock.acquire(timeout=wait_time):
+            cls._checkin(pipeline_instance_id)
+            logger.warning("Waited {} seconds for the lock on pipeline instance {}.".format(wait_time, pipeline_instance_id))
+            raise PipelineLockTimeout("Timed out waiting for the lock on pipeline instance {}".format(pipeline_instance_id))
+        try:
+            cls._lock_row(session, pipeline_instance_id, wait_time)
+            yield
+        finally:
+            lock.release()
+            cls._checkin(pipeline_instance_id)
+
+    @classmethod
+    def _checkout(cls, pipeline_instance_id):
+        with cls._guard:
+            entry = cls._locks.get(pipeline_instance_id)
+            if entry is None:
+                entry = cls._locks[pipeline_instance_id] = [threading.RLock(), 0]
+            entry[1] += 1
+            return entry[0]
+
+    @classmethod
+    def _checkin(cls, pipeline_instance_id):
+        with cls._guard:
+            entry = cls._locks[pipeline_instance_id]
+            entry[1] -= 1
+            if entry[1] <= 0:
+                del cls._locks[pipeline_instance_id]
+
+    @staticmethod
+    def supports_row_locks(session):
+        return session.get_bind().dialect.name in ('postgresql', 'mysql', 'oracle')
+
+    @staticmethod
+    def _lock_row(session, pipeline_instance_id, wait_time):
+        if PipelineLocks.supports_row_locks(session):
+            if session.get_bind().dialect.name == 'postgresql':
+                session.execute(text("SET LOCAL lock_timeout = '{}s'".format(int(wait_time))))
+            session.query(PipelineInstance.id).filter(PipelineInstance.id == pipeline_instance_id).with_for_update().first()
@@ -20,9 +20,12 @@ from rapid.lib.queue_handler_constants import QueueHandlerConstants
 from rapid.lib.constants import StatusConstants
 from rapid.lib.exceptions import QueueHandlerShouldSleep
 from rapid.lib.framework.injectable import Injectable
+from rapid.lib.handler_backoff import HandlerBackoff
+from rapid.lib.queue_metrics import QueueMetrics
 from rapid.master.master_configuration import MasterConfiguration
 from rapid.release.release_service import ReleaseService
 from rapid.workflow.action_instances_service import ActionInstanceService
+from rapid.workflow.data.dal.ready_queue_dal import ReadyQueueDal
 from rapid.workflow.queue_handlers.queue_handler import QueueHandler
 from rapid.workflow.queue_service import QueueService
 
@@ -40,6 +43,8 @@ class Queue(Injectable):
         self.rapid_config = rapid_config
         self.handler_constants = queue_constants
         self.release_service = release_service
+        self._handler_routes = {}
+        self._backoffs = {}
 
     @property
     def queue_handlers(self): # type: () -> list[QueueHandler]
@@ -47,15 +52,31 @@ class Queue(Injectable):
 
     def process_queue(self, clients):
         sleeping_queue_handlers = []
-        for work_request in self.queue_service.get_current_work():
-            for queue_handler in self.queue_handlers:
+        batches = {}
+        batching = (self.rapid_config.dispatch_batch_size or 1) > 1
+        work_requests = self.queue_service.claim_current_work(ReadyQueueDal.get_claimant(),
+                                                              self.rapid_config.dispatch_claim_size,
+                                                              self.rapid_config.dispatch_claim_time)
+        for work_request in work_requests:
+            for queue_handler, routed in self._get_handler_routes(work_request.grain):
                 if queue_handler in sleeping_queue_handlers:
                     continue
 
-                if queue_handler.can_process_work_request(work_request):
+                if routed or queue_handler.can_process_work_request(work_request):
+                    if batching and queue_handler.can_batch_work_requests:
+                        batches.setdefault(queue_handler, []).append(work_request)
+                        break
+
+                    backoff = self._get_backoff(queue_handler)
+                    if not backoff.allow(take_token=queue_handler.is_rate_limited):
+                        sleeping_queue_handlers.append(queue_handler)
+                        continue
+
                     try:
                         queue_handler.process_work_request(work_request, clients)
-                    except QueueHandlerShouldSleep:
+                        backoff.record_success()
+                    except QueueHandlerShouldSleep as should_sleep:
+                        backoff.record_failure(throttled=should_sleep.throttled)
                         sleeping_queue_handlers.append(queue_handler)
                     except Exception as exception:
                         logger.error(exception)
@@ -64,6 +85,57 @@ class Queue(Injectable):
                                                                                                             'end_date': datetime.utcnow()})
                     break
 
+        for queue_handler, batch in batches.items():
+            backoff = self._get_backoff(queue_handler)
+            if not backoff.allow():
+                continue
+
+            try:
+                queue_handler.process_work_requests(batch, clients)
+                backoff.record_success()
+            except QueueHandlerShouldSleep as should_sleep:
+                backoff.record_failure(throttled=should_sleep.throttled)
+            except Exception as exception:
+                logger.error(exception)
+
+        QueueMetrics.record_tick(len(work_requests))
+
+    def _get_backoff(self, queue_handler):
+        """
+        The handler's backoff, circuit breaker and create rate limit, which outlive the tick that tripped them.
+        """
+        try:
+            return self._backoffs[queue_handler]
+        except KeyError:
+            backoff = HandlerBackoff(type(queue_handler).__name__,
+                                     self.rapid_config.handler_backoff_time,
+                                     self.rapid_config.handler_backoff_max_time,
+                                     self.rapid_config.handler_breaker_threshold,
+                                     self.rapid_config.handler_breaker_time,
+                                     self.rapid_config.handler_create_rate,
+                                     self.rapid_config.handler_create_burst)
+            self._backoffs[queue_handler] = backoff
+            return backoff
+
+    def _get_handler_routes(self, grain):
+        """
+        The handlers that may process a grain, in order, paired with whether the handler's grain_type already
+        matched. Handlers without a grain_type are asked can_process_work_request by the caller.
+        """
+        grain_type = QueueHandler.get_grain_type(grain)
+        try:
+            return self._handler_routes[grain_type]
+        except KeyError:
+            routes = []
+            for queue_handler in self.queue_handlers:
+                handler_grain_type = queue_handler.grain_type
+                if not isinstance(handler_grain_type, str):
+                    routes.append((queue_handler, False))
+                elif handler_grain_type == grain_type:
+                    routes.append((queue_handler, True))
+            self._handler_routes[grain_type] = routes
+            return routes
+
     def verify_still_working(self, clients):
         action_instances = self.queue_service.get_verify_working(self.rapid_config.queue_consider_late_time)
         for queue_handler in self.queue_handlers:
@@ -75,6 +147,12 @@ class Queue(Injectable):
     def reconcile_pipeline_instances(self):
         self.action_instance_service.reconcile_pipeline_instances()
 
+    def reconcile_ready_queue(self):
+        self.action_instance_service.reconcile_ready_queue()
+
+    def expire_leases(self):
+        self.action_instance_service.expire_leases()
+
     def reconcile_releases(self):
         return self.release_service.reconcile_releases()
 
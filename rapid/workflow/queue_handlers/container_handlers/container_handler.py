@@ -23,6 +23,14 @@ class ContainerHandler(QueueHandler, ABC):
     def assigned_to_prefix(self) -> str:
         return ''
 
+    @property
+    def grain_type(self):
+        return self.container_identifier
+
+    @property
+    def is_rate_limited(self):
+        return True
+
     def can_process_work_request(self, work_request):
         # type: (WorkRequest) -> bool
         try:
@@ -70,7 +70,7 @@ class ECSQueueHandler(ContainerHandler, Injectable):
                     self._set_task_status(work_request.action_instance_id, status_id, assigned_to, start_date=datetime.datetime.utcnow())
             except ECSLimitReached as limit:
                 logger.error("ECSQueueHandler: Limit reached: {}".format(limit))
-                raise QueueHandlerShouldSleep('ECS Limit was reached.')
+                raise QueueHandlerShouldSleep('ECS Limit was reached.', throttled=True)
             except ECSConnectionError as conn_error:
                 logger.error("ECSQueueHandler: Connection issue: {}".format(conn_error))
                 raise QueueHandlerShouldSleep('ECS Connection issue detected.')
@@ -85,7 +85,7 @@ class ECSQueueHandler(ContainerHandler, Injectable):
                 logger.error("ECSQueueHandler: ClientError: {}".format(param_exception))
 
                 if 'RequestLimitExceeded' in param_str:
-                    raise QueueHandlerShouldSleep('ECS Request Limit Exceeded')
+                    raise QueueHandlerShouldSleep('ECS Request Limit Exceeded', throttled=True)
                 if 'Capacity is unavailable at this time' in param_str:
                     raise QueueHandlerShouldSleep('ECS Capacity is unavailable')
                 if 'Service Unavailable.' in param_str:
@@ -135,6 +135,9 @@ class K8SQueueHandler(ContainerHandler, Injectable):
                     # 409 - Already exists and will not re-run.
                     # 400 - Waiting to start?
                     raise K8SServiceUnavailable(exception.body)
+                elif exception.status == 429:
+                    # 429 - Too many requests, the API server is throttling us.
+                    raise QueueHandlerShouldSleep("The API server is throttling requests.", throttled=True)
                 else:
                     raise QueueHandlerShouldSleep("An error occurred, let's wait.")
             except urllib3.exceptions.RequestError as exception:
@@ -1,5 +1,4 @@
 import logging
-import datetime
 import random
 from typing import Dict, List
 
@@ -10,6 +9,8 @@ from rapid.master.master_configuration import MasterConfiguration
 from rapid.lib.constants import StatusConstants
 from rapid.lib.framework.injectable import Injectable
 from rapid.lib.store_service import StoreService
+from rapid.master.communicator.client_registry import ClientRegistry
+from rapid.master.communicator.grain_index import GrainIndex
 from rapid.master.communicator.master_communicator import MasterCommunicator
 from rapid.workflow.action_instances_service import ActionInstanceService
 from rapid.workflow.queue_handlers.queue_handler import QueueHandler
@@ -37,23 +38,24 @@ class StandardQueueHandler(QueueHandler, Injectable):
         1. Find a client that can do the work based off the label
           1a. If no label, any client that takes something that is not restricted to only its type
           1b. If label, only clients that that have at least that label, or only restricted to that type
-          1c. First client to respond
+          1c. First client to respond, of the dispatch_probe_count that answer first
         2. Save who was assigned the work
-          2a. Store IP and set status to INPROGRESS
+          2a. Claim the work for the client's IP, INPROGRESS, unless another dispatcher already claimed it
         3. Send the work to the client
           3a. If the client fails, unassign the work
         """
-        clients_array = list(clients.values())
+        clients_array = GrainIndex.get_index(clients).get_clients(clients, work_request.grain)
         random.shuffle(clients_array)
-        pages = MasterCommunicator.find_available_clients(clients_array, work_request.grain, self.rapid_config.verify_certs)
+        pages = MasterCommunicator.get_available_clients(clients_array, self.rapid_config.dispatch_probe_count,
+                                                         self.rapid_config.verify_certs, self.rapid_config.probe_workers)
         for client in pages:
             if client:
                 if hasattr(client, 'sleep') and client.sleep:
                     continue
                 try:
-                    self.action_instance_service.edit_action_instance(work_request.action_instance_id, {"status_id": StatusConstants.INPROGRESS,
-                                                                                                        "start_date": datetime.datetime.utcnow(),
-                                                                                                        "assigned_to": "{}:{}".format(client.ip_address, client.port)})
+                    if not self.action_instance_service.claim_action_instance(work_request.action_instance_id, "{}:{}".format(client.ip_address, client.port)):
+                        logger.info("ActionInstance:{} was already claimed, not sending it.".format(work_request.action_instance_id))
+                        break
                     try:
                         response = client.send_work(work_request, self.rapid_config.verify_certs)
                         if response.status_code == 423:
@@ -88,11 +90,77 @@ class StandardQueueHandler(QueueHandler, Injectable):
         pages = None
         clients_array = None
 
+    @property
+    def can_batch_work_requests(self):
+        return True
+
+    def process_work_requests(self, work_requests, clients):
+        """
+        1. Group the work requests by grain
+        2. Probe the clients that can handle each grain once, keeping the first few to answer
+        3. Send each available client up to dispatch_batch_size work requests in a single request
+          3a. Anything the client did not accept goes to the next available client
+        """
+        grains = {}
+        for work_request in work_requests:
+            grains.setdefault(work_request.grain, []).append(work_request)
+
+        grain_index = GrainIndex.get_index(clients)
+        for grain, pending in grains.items():
+            clients_array = grain_index.get_clients(clients, grain)
+            random.shuffle(clients_array)
+            count = -(-len(pending) // self.rapid_config.dispatch_batch_size) + self.rapid_config.dispatch_probe_count - 1
+            for client in MasterCommunicator.get_available_clients(clients_array, count, self.rapid_config.verify_certs,
+                                                                   self.rapid_config.probe_workers):
+                if not pending:
+                    break
+                if client:
+                    if hasattr(client, 'sleep') and client.sleep:
+                        continue
+                    done = self._send_work_batch(client, pending[:self.rapid_config.dispatch_batch_size])
+                    pending = [work_request for work_request in pending if work_request.action_instance_id not in done]
+
+    def _send_work_batch(self, client, work_requests):
+        """
+        :return: the action instance ids that are no longer pending, sent to the client or claimed by someone else
+        :rtype: set
+        """
+        assigned_to = "{}:{}".format(client.ip_address, client.port)
+        claimed = [work_request for work_request in work_requests
+                   if self.action_instance_service.claim_action_instance(work_request.action_instance_id, assigned_to)]
+        lost = {work_request.action_instance_id for work_request in work_requests} - {work_request.action_instance_id for work_request in claimed}
+        if not claimed:
+            return lost
+        work_requests = claimed
+
+        accepted = set()
+        try:
+            response = client.send_work_batch(work_requests, self.rapid_config.verify_certs)
+            if response.status_code in (201, 423):
+                accepted = {int(action_instance_id) for action_instance_id in response.json().get('accepted', [])}
+                if response.status_code == 423 or 'X-Exclude-Resource'.lower() in response.headers:
+                    client.sleep = True
+            else:
+                logger.info("Client didn't respond right: {} returned {}".format(client.ip_address, response.status_code))
+        except Exception as exception:
+            logger.error("Could not send work to worker: [{}]".format(str(exception)))
+
+        for work_request in work_requests:
+            if work_request.action_instance_id not in accepted:
+                self.action_instance_service.edit_action_instance(work_request.action_instance_id, {"status_id": StatusConstants.READY,
+                                                                                                    "start_date": None,
+                                                                                                    "assigned_to": None})
+        return accepted | lost
+
     def __init__(self, rapid_config: MasterConfiguration, action_instance_service: ActionInstanceService, flask_app: Flask):
         super(StandardQueueHandler, self).__init__(rapid_config)
         self.action_instance_service = action_instance_service
         self.flask_app = flask_app
 
+    @property
+    def grain_type(self):
+        return ''
+
     def can_process_work_request(self, work_request):
         return len(self._get_grain_type_split(work_request.grain)) < 2
 
@@ -100,6 +168,10 @@ class StandardQueueHandler(QueueHandler, Injectable):
         return len(self._get_grain_type_split(action_instance['grain'])) < 2
 
     def process_action_instance(self, action_instance, clients):  # type: (dict, list) -> bool
+        if action_instance.get('lease_expiration'):
+            # Leased work is put back on the queue by expire_leases when the client stops renewing.
+            return True
+
         reset_action_instance = False
         if ':' not in action_instance['assigned_to']:
             logger.info("Action Instance {} assigned without port: {}".format(action_instance['id'], action_instance['assigned_to']))
@@ -107,9 +179,11 @@ class StandardQueueHandler(QueueHandler, Injectable):
         else:
             ip_address, port = action_instance['assigned_to'].split(':')  # pylint: disable=unused-variable
             if ip_address in clients:
-                client = clients[ip_address]
-                reset_action_instance = MasterCommunicator.is_still_working_on(action_instance['id'], client,
-                                                                               self.rapid_config.verify_certs) is False
+                is_still_working = ClientRegistry.is_still_working_on(action_instance['id'], ip_address, self.rapid_config.heartbeat_timeout)
+                if is_still_working is None:
+                    is_still_working = MasterCommunicator.is_still_working_on(action_instance['id'], clients[ip_address],
+                                                                              self.rapid_config.verify_certs)
+                reset_action_instance = is_still_working is False
 
         if reset_action_instance and not StoreService.is_completing(action_instance['id']):
             if self.action_instance_service.reset_action_instance(action_instance['id'], check_status=True):
@@ -117,8 +191,7 @@ class StandardQueueHandler(QueueHandler, Injectable):
         return True
 
     def cancel_worker(self, action_instance):  # type: (dict) -> bool
-        for client in StoreService.get_clients(self.flask_app).values():
-            if client.get_uri() == action_instance['assigned_to']:
-                client.cancel_work(action_instance['id'], self.flask_app.rapid_config.verify_certs)
-                break
+        client = ClientRegistry.get_assigned_client(StoreService.get_clients(self.flask_app), action_instance['assigned_to'])
+        if client is not None:
+            client.cancel_work(action_instance['id'], self.flask_app.rapid_config.verify_certs)
         return True
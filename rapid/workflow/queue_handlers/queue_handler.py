@@ -14,6 +14,38 @@ class QueueHandler(ABC):
     def process_work_request(self, work_request, clients):
         ...
 
+    def process_work_requests(self, work_requests, clients):
+        """
+        Dispatch several work requests at once. Only called when can_batch_work_requests is True.
+        """
+        for work_request in work_requests:
+            self.process_work_request(work_request, clients)
+
+    @property
+    def can_batch_work_requests(self):
+        return False
+
+    @property
+    def is_rate_limited(self):
+        """
+        True when each work request makes a create call against an outside API, limited by handler_create_rate.
+        """
+        return False
+
+    @property
+    def grain_type(self):
+        """
+        The grain type (the part of the grain before ://) this handler processes, '' for grains without one.
+        Handlers returning None are asked can_process_work_request for every work request instead.
+        """
+        return None
+
+    @staticmethod
+    def get_grain_type(grain):
+        if isinstance(grain, str) and QueueHandler._GRAIN_SPLIT in grain:
+            return grain.split(QueueHandler._GRAIN_SPLIT, 1)[0]
+        return ''
+
     @abstractmethod
     def can_process_work_request(self, work_request):
         # type: (WorkRequest) -> bool
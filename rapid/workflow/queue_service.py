@@ -26,5 +26,8 @@ class QueueService(Injectable):
     def get_current_work(self):
         return self.action_dal.get_workable_work_requests()
 
+    def claim_current_work(self, claimant, count, claim_time):
+        return self.action_dal.claim_workable_work_requests(claimant, count, claim_time)
+
     def get_verify_working(self, time_difference):
         return self.action_dal.get_verify_working(time_difference)
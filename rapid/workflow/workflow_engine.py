@@ -17,7 +17,6 @@
 import datetime
 import logging
 
-from rapid.lib.store_service import StoreService
 from rapid.lib.constants import StatusTypes, status_type_severity_mapping, StatusConstants
 from rapid.workflow.data.dal.status_dal import StatusDal
 from rapid.workflow.data.models import Pipeline, PipelineInstance, Stage, StageInstance, Action, \
@@ -80,10 +79,16 @@ class WorkflowEngine(object):
 
 
 class InstanceWorkflowEngine(WorkflowEngine):
+    """
+    Given a session, instances are looked up by id and their relationships loaded lazily, so completing an action
+    only loads its workflow's action instances and the workflow and stage rows next to it, instead of the whole
+    pipeline instance.
+    """
 
-    def __init__(self, status_dal: StatusDal, pipeline_instance):
+    def __init__(self, status_dal: StatusDal, pipeline_instance, session=None):
         super(InstanceWorkflowEngine, self).__init__(pipeline_instance)
         self.status_dal = status_dal
+        self.session = session
 
         self.pipeline_class = PipelineInstance
         self.stage_class = StageInstance
@@ -100,6 +105,26 @@ class InstanceWorkflowEngine(WorkflowEngine):
     def _get_actions(self, workflow):
         return workflow.action_instances
 
+    def _load_pipeline(self):
+        if self.session is not None:
+            return self.pipeline
+        return super(InstanceWorkflowEngine, self)._load_pipeline()
+
+    def _get_action(self, _id):
+        if self.session is not None:
+            return self.session.query(ActionInstance).get(_id)
+        return super(InstanceWorkflowEngine, self)._get_action(_id)
+
+    def _get_workflow(self, _id):
+        if self.session is not None:
+            return self.session.query(WorkflowInstance).get(_id)
+        return super(InstanceWorkflowEngine, self)._get_workflow(_id)
+
+    def _get_stage(self, _id):
+        if self.session is not None:
+            return self.session.query(StageInstance).get(_id)
+        return super(InstanceWorkflowEngine, self)._get_stage(_id)
+
     def complete_an_action(self, action_instance_id, status_id):
         """
         1. Load all the action_instances
@@ -110,29 +135,24 @@ class InstanceWorkflowEngine(WorkflowEngine):
         4. If successful workflow, check all other workflows. If done, set status and date for stage.
         5. Create new stageInstance if another exists.
         6. If last stage, complete the Pipeline Instance
+        Callers hold the pipeline instance's lock (PipelineLocks) around this.
         :param status_id:
         :param action_instance_id:
         """
-        pipeline_id = self.pipeline.id
-        StoreService.set_calculating_workflow(pipeline_id)
-
-        try:
-            action_instance = self._get_action(action_instance_id)
-            self._mark_action_instance_complete(action_instance, status_id)
-
-            action_instances = self._get_actions_by_workflow_id(action_instance.workflow_instance_id)
-            if self._can_continue_workflow(action_instances):
-                if self._activate_next_action_all_complete(action_instances):
-                    self.complete_a_workflow(action_instance.workflow_instance_id, StatusConstants.SUCCESS)
-            else:
-                for instance in action_instances:
-                    if instance.status_id == StatusConstants.NEW:
-                        self._mark_action_instance_complete(instance, StatusConstants.CANCELED)
-                status = StatusConstants.FAILED if status_id != StatusConstants.CANCELED else StatusConstants.CANCELED
-
-                self.complete_a_workflow(action_instance.workflow_instance_id, status)
-        finally:
-            StoreService.clear_calculating_workflow(pipeline_id)
+        action_instance = self._get_action(action_instance_id)
+        self._mark_action_instance_complete(action_instance, status_id)
+
+        action_instances = self._get_actions_by_workflow_id(action_instance.workflow_instance_id)
+        if self._can_continue_workflow(action_instances):
+            if self._activate_next_action_all_complete(action_instances):
+                self.complete_a_workflow(action_instance.workflow_instance_id, StatusConstants.SUCCESS)
+        else:
+            for instance in action_instances:
+                if instance.status_id == StatusConstants.NEW:
+                    self._mark_action_instance_complete(instance, StatusConstants.CANCELED)
+            status = StatusConstants.FAILED if status_id != StatusConstants.CANCELED else StatusConstants.CANCELED
+
+            self.complete_a_workflow(action_instance.workflow_instance_id, status)
 
     def complete_a_workflow(self, workflow_instance_id, status_id):
         workflow_instance = self._get_workflow(workflow_instance_id)
@@ -14,6 +14,7 @@
  limitations under the License.
 """
 import datetime
+import json
 
 import sys
 from mock.mock import Mock, patch
@@ -85,25 +86,26 @@ class TestWorkController(UnitTest):
         store_service.get_executors.return_value = [1, 1]
         self.assertEqual(False, controller.can_work_on())
 
-    @patch("rapid.lib.store_service.os")
-    def test_can_work_on_with_work(self, os):
+    @patch("rapid.lib.store_service.ExecutorRegistry")
+    def test_can_work_on_with_work(self, executor_registry):
         controller = WorkController()
         controller.app = Mock()
         controller.app.rapid_config.executor_count = 1
-        os.listdir.return_value = []
+        executor_registry.get_executors.return_value = []
+        executor_registry.get_pid.return_value = None
 
-        self.assertEqual(True, controller.can_work_on(Mock(action_instance_id=1111)))
+        self.assertEqual(True, controller.can_work_on({'action_instance_id': 1111}))
 
-    @patch("rapid.lib.store_service.os")
-    @patch("rapid.lib.store_service.psutil")
-    def test_can_work_on_with_work_existing_action_instance(self, psutil, os):
-        psutil.pids.return_value = [11111]
+    @patch("rapid.lib.store_service.ExecutorRegistry")
+    def test_can_work_on_with_work_existing_action_instance(self, executor_registry):
         controller = WorkController()
         controller.app = Mock()
-        controller.app.rapid_config.executor_count = 1
-        os.listdir.return_value = ['rapid-11-11111']
+        controller.app.rapid_config.executor_count = 2
+        executor_registry.get_executors.return_value = [{'action_instance_id': '11', 'pid': '11111'}]
+        executor_registry.get_pid.return_value = '11111'
 
-        self.assertEqual(False, controller.can_work_on(Mock(action_instance_id=11)))
+        self.assertFalse(controller.can_work_on({'action_instance_id': 11}))
+        executor_registry.get_pid.assert_called_with(11)
 
     def test_check_version_empty_header(self):
         controller = WorkController()
@@ -201,12 +203,45 @@ class TestWorkController(UnitTest):
         controller._perform_upgrade("12345")
         upgrade_util.upgrade_version.assert_called_with("12345", "testing")
 
+    @patch.object(WorkController, 'start_work')
+    @patch("rapid.client.controllers.work_controller.StoreService")
+    @patch("rapid.client.controllers.work_controller.Response")
+    def test_work_execute_batch_accepts_up_to_free_executors(self, response, store_service, start_work):
+        controller = WorkController()
+        controller.app = Mock()
+        controller.app.rapid_config.executor_count = 3
+        store_service.get_executors.return_value = [1]
+        store_service.get_executor_pid.return_value = None
+
+        controller.work_execute_batch([{'action_instance_id': 1}, {'action_instance_id': 2}, {'action_instance_id': 3}])
+
+        self.assertEqual(2, start_work.call_count)
+        self.assertEqual({'message': 'Work started', 'accepted': [1, 2], 'rejected': [3]}, json.loads(response.call_args[0][0]))
+        self.assertEqual(201, response.call_args[1]['status'])
+        self.assertEqual({'X-Exclude-Resource': 'true'}, response.call_args[1]['headers'])
+
+    @patch.object(WorkController, 'start_work')
+    @patch("rapid.client.controllers.work_controller.StoreService")
+    @patch("rapid.client.controllers.work_controller.Response")
+    def test_work_execute_batch_rejects_work_already_running(self, response, store_service, start_work):
+        controller = WorkController()
+        controller.app = Mock()
+        controller.app.rapid_config.executor_count = 2
+        store_service.get_executors.return_value = []
+        store_service.get_executor_pid.return_value = '1234'
+
+        controller.work_execute_batch([{'action_instance_id': 1}])
+
+        start_work.assert_not_called()
+        self.assertEqual([1], json.loads(response.call_args[0][0])['rejected'])
+        self.assertEqual(423, response.call_args[1]['status'])
+
     @patch("rapid.client.controllers.work_controller.StoreService")
     @patch("rapid.client.controllers.work_controller.os")
     @patch("rapid.client.controllers.work_controller.Response")
     def test_work_cancel_should_not_cancel_if_action_instance_not_found(self, response, mock_os, store_service):
         controller = WorkController()
-        store_service.check_for_pidfile.return_value = None
+        store_service.get_executor_pid.return_value = None
 
         controller.work_cancel(12345)
         self.assertEqual(501, response.call_args_list[0][0][1])
@@ -216,19 +251,19 @@ class TestWorkController(UnitTest):
     @patch("rapid.client.controllers.work_controller.Response")
     def test_work_cancel_should_cancel_if_action_instance_found(self, response, mock_psutil, store_service):
         controller = WorkController()
-        store_service.check_for_pidfile.return_value = 'testing-1-2-3'
+        store_service.get_executor_pid.return_value = '3'
 
         controller.work_cancel(12345)
         mock_psutil.Process.assert_called_with(3)
         mock_psutil.Process().kill.assert_called_with()
 
     @patch("rapid.client.controllers.work_controller.StoreService")
-    @patch("rapid.client.controllers.work_controller.os")
+    @patch("rapid.client.controllers.work_controller.psutil")
     @patch("rapid.client.controllers.work_controller.Response")
-    def test_work_cancel_should_not_cancel_if_pid_not_found(self, response, mock_os, store_service):
+    def test_work_cancel_should_not_cancel_if_pid_not_found(self, response, mock_psutil, store_service):
         controller = WorkController()
-        store_service.check_for_pidfile.return_value = "testing-1-2-3"
-        mock_os.kill.side_effect = Exception("Booo")
+        store_service.get_executor_pid.return_value = '3'
+        mock_psutil.Process.side_effect = Exception("Booo")
 
         controller.work_cancel(124545)
         self.assertEqual(501, response.call_args_list[0][0][1])
@@ -0,0 +1,70 @@
+"""
+ Copyright (c) 2015 Michael Bright and Bamboo HR LLC
+
+ Licensed under the Apache License, Version 2.0 (the "License");
+ you may not use this file except in compliance with the License.
+ You may obtain a copy of the License at
+
+ http://www.apache.org/licenses/LICENSE-2.0
+
+ Unless required by applicable law or agreed to in writing, software
+ distributed under the License is distributed on an "AS IS" BASIS,
+ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ See the License for the specific language governing permissions and
+ limitations under the License.
+"""
+from unittest import TestCase
+
+from mock import Mock, patch
+
+from rapid.client.client_heartbeat import ClientHeartbeat
+
+
+class TestClientHeartbeat(TestCase):
+
+    def setUp(self):
+        self.app = Mock()
+        self.app.rapid_config.executor_count = 2
+        self.app.rapid_config.quarantine_directory = None
+        self.communicator = Mock()
+        self.heartbeat = ClientHeartbeat(self.app, self.communicator)
+
+    @patch('rapid.client.client_heartbeat.StoreService')
+    def test_get_heartbeat_reports_current_work_and_free_slots(self, store_service):
+        store_service.get_executors.return_value = [{'action_instance_id': '1', 'pid': '2'}]
+
+        heartbeat = self.heartbeat.get_heartbeat()
+
+        self.assertEqual([{'action_instance_id': '1', 'pid': '2'}], heartbeat['current_work'])
+        self.assertEqual(1, heartbeat['free_slots'])
+        self.assertEqual(self.app.rapid_config.port, heartbeat['port'])
+
+    @patch('rapid.client.client_heartbeat.os')
+    @patch('rapid.client.client_heartbeat.StoreService')
+    def test_get_heartbeat_includes_quarantined_work(self, store_service, mock_os):
+        self.app.rapid_config.quarantine_directory = '/tmp/quarantine'
+        store_service.get_executors.return_value = []
+        mock_os.listdir.return_value = ['12', 'junk']
+
+        heartbeat = self.heartbeat.get_heartbeat()
+
+        self.assertEqual([{'action_instance_id': 12, 'pid': 'quarantined'}], heartbeat['current_work'])
+        self.assertEqual(2, heartbeat['free_slots'])
+
+    @patch('rapid.client.client_heartbeat.StoreService')
+    def test_beat_registers_when_master_forgot_client(self, store_service):
+        store_service.get_executors.return_value = []
+        self.communicator.send_heartbeat.return_value = False
+
+        self.heartbeat.beat()
+
+        self.communicator.register.assert_called_with(self.app.rapid_config)
+
+    @patch('rapid.client.client_heartbeat.StoreService')
+    def test_beat_does_not_raise_when_master_unreachable(self, store_service):
+        store_service.get_executors.return_value = []
+        self.communicator.send_heartbeat.side_effect = Exception("Status Code Failure: 502")
+
+        self.heartbeat.beat()
+
+        self.communicator.register.assert_not_called()
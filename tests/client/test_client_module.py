@@ -6,6 +6,7 @@ from rapid.client import configure_application
 
 
 class TestClientModule(TestCase):
+    @patch('rapid.client.setup_executor_registry')
     @patch('rapid.client.setup_status_route')
     @patch('rapid.client.setup_config_from_file')
     @patch('rapid.client.setup_logger')
@@ -15,7 +16,7 @@ class TestClientModule(TestCase):
     @patch('rapid.client.setup_client_register_thread')
     @patch('rapid.client.clean_workspace')
     @patch('rapid.client.load_extensions')
-    def test_configure_application_register_thread(self, le, cw, scrt, ipw, rc, lp, sl, scff, ssr):
+    def test_configure_application_register_thread(self, le, cw, scrt, ipw, rc, lp, sl, scff, ssr, ser):
         ipw.return_value = True
         mock_app = Mock()
         args = Mock(run=False, upgrade=False)
@@ -28,7 +29,9 @@ class TestClientModule(TestCase):
         sl.assert_called_with(mock_app)
         scff.assert_called_with(mock_app, args)
         ssr.assert_called_with(mock_app)
+        ser.assert_called_with(mock_app, args)
 
+    @patch('rapid.client.setup_executor_registry')
     @patch('rapid.client.setup_status_route')
     @patch('rapid.client.setup_config_from_file')
     @patch('rapid.client.setup_logger')
@@ -38,7 +41,7 @@ class TestClientModule(TestCase):
     @patch('rapid.client.setup_client_register_thread')
     @patch('rapid.client.clean_workspace')
     @patch('rapid.client.load_extensions')
-    def test_configure_application_does_not_register_when_not_primary(self, le, cw, scrt, ipw, rc, lp, sl, scff, ssr):
+    def test_configure_application_does_not_register_when_not_primary(self, le, cw, scrt, ipw, rc, lp, sl, scff, ssr, ser):
         ipw.return_value = False
         mock_app = Mock()
         args = Mock(run=False)
@@ -47,6 +50,7 @@ class TestClientModule(TestCase):
         self.assertEqual(0, scrt.call_count)
         le.assert_called_with(mock_app)
 
+    @patch('rapid.client.setup_executor_registry')
     @patch('rapid.client.setup_status_route')
     @patch('rapid.client.setup_config_from_file')
     @patch('rapid.client.setup_logger')
@@ -56,7 +60,7 @@ class TestClientModule(TestCase):
     @patch('rapid.client.setup_client_register_thread')
     @patch('rapid.client.clean_workspace')
     @patch('rapid.client.load_extensions')
-    def test_configure_application_does_not_register_when_runs_an_action_instance(self, le, cw, scrt, ipw, rc, lp, sl, scff, ssr):
+    def test_configure_application_does_not_register_when_runs_an_action_instance(self, le, cw, scrt, ipw, rc, lp, sl, scff, ssr, ser):
         ipw.return_value = True
         mock_app = Mock()
         args = Mock(run=True)
@@ -0,0 +1,69 @@
+"""
+ Copyright (c) 2015 Michael Bright and Bamboo HR LLC
+
+ Licensed under the Apache License, Version 2.0 (the "License");
+ you may not use this file except in compliance with the License.
+ You may obtain a copy of the License at
+
+ http://www.apache.org/licenses/LICENSE-2.0
+
+ Unless required by applicable law or agreed to in writing, software
+ distributed under the License is distributed on an "AS IS" BASIS,
+ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ See the License for the specific language governing permissions and
+ limitations under the License.
+"""
+from unittest import TestCase
+
+from mock import Mock, patch
+
+from rapid.client.work_leaser import WorkLeaser
+
+
+class TestWorkLeaser(TestCase):
+
+    def setUp(self):
+        self.app = Mock()
+        self.app.rapid_config.executor_count = 3
+        self.communicator = Mock()
+        self.work_controller = Mock()
+        self.leaser = WorkLeaser(self.app, self.communicator, self.work_controller)
+
+    @patch('rapid.client.work_leaser.StoreService')
+    def test_lease_once_asks_for_free_slots(self, store_service):
+        store_service.get_executors.return_value = [{'action_instance_id': '7', 'pid': '1'}]
+        store_service.is_updating.return_value = False
+        self.communicator.lease_work.return_value = [{'action_instance_id': 8}]
+
+        self.assertTrue(self.leaser.lease_once())
+
+        self.communicator.renew_leases.assert_called_with(self.app.rapid_config, [7])
+        self.communicator.lease_work.assert_called_with(self.app.rapid_config, 2)
+        self.work_controller.start_work.assert_called_with({'action_instance_id': 8})
+
+    @patch('rapid.client.work_leaser.StoreService')
+    def test_lease_once_counts_work_that_is_still_starting(self, store_service):
+        store_service.get_executors.return_value = []
+        store_service.is_updating.return_value = False
+        self.communicator.lease_work.return_value = [{'action_instance_id': 8}]
+        self.leaser.lease_once()
+
+        self.leaser.lease_once()
+
+        self.communicator.renew_leases.assert_called_with(self.app.rapid_config, [8])
+        self.communicator.lease_work.assert_called_with(self.app.rapid_config, 2)
+
+    @patch('rapid.client.work_leaser.StoreService')
+    def test_lease_once_backs_off_when_full(self, store_service):
+        store_service.get_executors.return_value = [{'action_instance_id': str(_id), 'pid': '1'} for _id in range(3)]
+
+        self.assertFalse(self.leaser.lease_once())
+        self.communicator.lease_work.assert_not_called()
+
+    @patch('rapid.client.work_leaser.StoreService')
+    def test_lease_once_backs_off_when_master_unreachable(self, store_service):
+        store_service.get_executors.return_value = []
+        store_service.is_updating.return_value = False
+        self.communicator.lease_work.side_effect = Exception("Status Code Failure: 502")
+
+        self.assertFalse(self.leaser.lease_once())
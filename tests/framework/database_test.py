@@ -0,0 +1,51 @@
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session, sessionmaker
+
+from rapid.lib import get_declarative_base
+from rapid.lib.constants import StatusConstants
+from rapid.workflow.data.dal.ready_queue_dal import ReadyQueueDal
+from rapid.workflow.data.models import ActionInstance, PipelineInstance
+from tests.framework.unit_test import UnitTest
+
+
+class DatabaseTest(UnitTest):
+    """
+    Runs against a fresh in memory SQLite database holding every model's table, for DALs whose SQL has to run to be
+    tested. The ready queue listeners are registered for the length of the test.
+    """
+
+    def setUp(self):
+        import rapid.qa.data.models  # pylint: disable=unused-import
+        import rapid.ci.data.models  # pylint: disable=unused-import
+        import rapid.release.data.models  # pylint: disable=unused-import
+
+        self.engine = create_engine('sqlite://')
+        get_declarative_base().metadata.create_all(self.engine)
+        self.session_factory = sessionmaker(bind=self.engine, expire_on_commit=False)
+        self.session = self.session_factory()
+
+        self._registered_listeners = not event.contains(Session, 'after_flush', ReadyQueueDal.after_flush)
+        ReadyQueueDal.register_listeners()
+
+    def tearDown(self):
+        if self._registered_listeners:
+            event.remove(Session, 'after_flush', ReadyQueueDal.after_flush)
+        self.session.close()
+        self.engine.dispose()
+
+    def add_pipeline_instance(self, priority=0, status_id=StatusConstants.INPROGRESS):
+        pipeline_instance = PipelineInstance(pipeline_id=1, status_id=status_id, priority=priority)
+        self.session.add(pipeline_instance)
+        self.session.flush()
+        return pipeline_instance
+
+    def add_action_instances(self, pipeline_instance, grains, status_id=StatusConstants.READY):
+        """
+        One ActionInstance per grain, in that order, committed so the ready queue holds the READY ones.
+        """
+        action_instances = [ActionInstance(cmd='/bin/sh', executable='run.sh', args='', order=order, grain=grain, status_id=status_id,
+                                           action_id=1, workflow_instance_id=1, pipeline_instance_id=pipeline_instance.id)
+                            for (order, grain) in enumerate(grains)]
+        self.session.add_all(action_instances)
+        self.session.commit()
+        return action_instances
@@ -0,0 +1,87 @@
+"""
+ Copyright (c) 2015 Michael Bright and Bamboo HR LLC
+
+ Licensed under the Apache License, Version 2.0 (the "License");
+ you may not use this file except in compliance with the License.
+ You may obtain a copy of the License at
+
+ http://www.apache.org/licenses/LICENSE-2.0
+
+ Unless required by applicable law or agreed to in writing, software
+ distributed under the License is distributed on an "AS IS" BASIS,
+ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ See the License for the specific language governing permissions and
+ limitations under the License.
+"""
+import json
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+from unittest.mock import patch
+
+from rapid.lib.executor_registry import ExecutorRegistry
+
+
+class TestExecutorRegistry(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.state_file = os.path.join(self.directory, 'executors.json')
+        ExecutorRegistry.configure(None)
+        ExecutorRegistry.clear()
+        ExecutorRegistry._last_recovered_check = 0
+
+    def tearDown(self):
+        ExecutorRegistry.configure(None)
+        ExecutorRegistry.clear()
+        shutil.rmtree(self.directory)
+
+    def test_register_and_unregister_update_the_snapshot(self):
+        ExecutorRegistry.register(1, 12)
+        ExecutorRegistry.register(2, 13)
+
+        self.assertEqual([{'action_instance_id': '1', 'pid': '12'}, {'action_instance_id': '2', 'pid': '13'}], ExecutorRegistry.get_executors())
+        self.assertEqual('13', ExecutorRegistry.get_pid('2'))
+
+        ExecutorRegistry.unregister('1')
+
+        self.assertEqual([{'action_instance_id': '2', 'pid': '13'}], ExecutorRegistry.get_executors())
+        self.assertIsNone(ExecutorRegistry.get_pid(1))
+
+    def test_changes_are_written_to_the_state_file(self):
+        ExecutorRegistry.configure(self.state_file)
+
+        ExecutorRegistry.register(1, 12)
+
+        with open(self.state_file) as file_in:
+            self.assertEqual({'1': '12'}, json.load(file_in))
+
+    @patch('rapid.lib.executor_registry.psutil')
+    def test_configure_recovers_executors_still_alive(self, psutil):
+        psutil.pid_exists.side_effect = lambda pid: pid == 12
+        with open(self.state_file, 'w') as file_out:
+            json.dump({'1': '12', '2': '13'}, file_out)
+
+        ExecutorRegistry.configure(self.state_file)
+
+        self.assertEqual([{'action_instance_id': '1', 'pid': '12'}], ExecutorRegistry.get_executors())
+
+    @patch('rapid.lib.executor_registry.psutil')
+    def test_recovered_executors_are_dropped_when_their_process_ends(self, psutil):
+        psutil.pid_exists.return_value = True
+        with open(self.state_file, 'w') as file_out:
+            json.dump({'1': '12'}, file_out)
+        ExecutorRegistry.configure(self.state_file)
+        ExecutorRegistry.register(2, 13)
+
+        psutil.pid_exists.return_value = False
+
+        self.assertEqual([{'action_instance_id': '2', 'pid': '13'}], ExecutorRegistry.get_executors())
+        psutil.pid_exists.assert_called_with(12)
+
+    def test_missing_state_file_starts_empty(self):
+        ExecutorRegistry.configure(os.path.join(self.directory, 'nested', 'executors.json'))
+
+        self.assertEqual([], ExecutorRegistry.get_executors())
+        self.assertTrue(os.path.isfile(os.path.join(self.directory, 'nested', 'executors.json')))
@@ -0,0 +1,107 @@
+"""
+ Copyright (c) 2015 Michael Bright and Bamboo HR LLC
+
+ Licensed under the Apache License, Version 2.0 (the "License");
+ you may not use this file except in compliance with the License.
+ You may obtain a copy of the License at
+
+ http://www.apache.org/licenses/LICENSE-2.0
+
+ Unless required by applicable law or agreed to in writing, software
+ distributed under the License is distributed on an "AS IS" BASIS,
+ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ See the License for the specific language governing permissions and
+ limitations under the License.
+"""
+from unittest import TestCase
+
+from mock import patch
+
+from rapid.lib.handler_backoff import HandlerBackoff
+
+
+class TestHandlerBackoff(TestCase):
+
+    def _get_backoff(self, **kwargs):
+        settings = {'backoff_time': 2, 'max_backoff_time': 30, 'breaker_threshold': 5, 'breaker_time': 120}
+        settings.update(kwargs)
+        return HandlerBackoff('ECSQueueHandler', **settings)
+
+    @patch('rapid.lib.handler_backoff.random')
+    def test_failures_back_off_exponentially_up_to_the_max(self, random):
+        random.uniform.side_effect = lambda low, high: high
+        backoff = self._get_backoff(breaker_threshold=10)
+
+        self.assertEqual([2, 4, 8, 16, 30, 30], [backoff.record_failure(now=1000) for _ in range(6)])
+        random.uniform.assert_called_with(15.0, 30)
+
+    def test_backed_off_handler_is_not_allowed_until_it_resumes(self):
+        backoff = self._get_backoff()
+        delay = backoff.record_failure(now=1000)
+
+        self.assertFalse(backoff.allow(now=1000))
+        self.assertTrue(backoff.allow(now=1000 + delay))
+
+    def test_success_resets_the_backoff(self):
+        backoff = self._get_backoff()
+        backoff.record_failure(now=1000)
+        backoff.record_success()
+
+        self.assertTrue(backoff.allow(now=1000))
+        self.assertEqual(0, backoff.failures)
+
+    def test_circuit_opens_after_threshold(self):
+        backoff = self._get_backoff(breaker_threshold=2)
+        backoff.record_failure(now=1000)
+
+        self.assertEqual(120, backoff.record_failure(now=1000))
+        self.assertEqual(HandlerBackoff.OPEN, backoff.state)
+        self.assertFalse(backoff.allow(now=1119))
+
+    def test_half_open_circuit_closes_on_success(self):
+        backoff = self._get_backoff(breaker_threshold=1)
+        backoff.record_failure(now=1000)
+
+        self.assertTrue(backoff.allow(now=1120))
+        self.assertEqual(HandlerBackoff.HALF_OPEN, backoff.state)
+        backoff.record_success()
+        self.assertEqual(HandlerBackoff.CLOSED, backoff.state)
+
+    def test_half_open_circuit_reopens_on_a_single_failure(self):
+        backoff = self._get_backoff(breaker_threshold=3)
+        for _ in range(3):
+            backoff.record_failure(now=1000)
+        backoff.allow(now=1120)
+        backoff.failures = 0
+
+        self.assertEqual(120, backoff.record_failure(now=1120))
+        self.assertEqual(HandlerBackoff.OPEN, backoff.state)
+
+    def test_token_bucket_limits_and_refills(self):
+        backoff = self._get_backoff(rate=1, burst=2)
+
+        self.assertEqual([True, True, False], [backoff.allow(now=1000, take_token=True) for _ in range(3)])
+        self.assertTrue(backoff.allow(now=1001, take_token=True))
+        self.assertFalse(backoff.allow(now=1001, take_token=True))
+
+    def test_tokens_are_only_taken_when_asked(self):
+        backoff = self._get_backoff(rate=1, burst=1)
+
+        self.assertEqual([True, True], [backoff.allow(now=1000) for _ in range(2)])
+        self.assertTrue(backoff.allow(now=1000, take_token=True))
+
+    def test_throttling_halves_the_rate_which_recovers_on_success(self):
+        backoff = self._get_backoff(rate=4, burst=4)
+        backoff.record_failure(now=1000, throttled=True)
+        backoff.record_failure(now=1000, throttled=True)
+
+        self.assertEqual(1, backoff.rate)
+        backoff.record_success()
+        self.assertEqual(1.4, backoff.rate)
+
+    def test_rate_never_drops_below_recovery_share(self):
+        backoff = self._get_backoff(rate=10, burst=4, breaker_threshold=10)
+        for _ in range(8):
+            backoff.record_failure(now=1000, throttled=True)
+
+        self.assertEqual(1, backoff.rate)
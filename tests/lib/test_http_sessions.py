@@ -0,0 +1,68 @@
+"""
+ Copyright (c) 2015 Michael Bright and Bamboo HR LLC
+
+ Licensed under the Apache License, Version 2.0 (the "License");
+ you may not use this file except in compliance with the License.
+ You may obtain a copy of the License at
+
+ http://www.apache.org/licenses/LICENSE-2.0
+
+ Unless required by applicable law or agreed to in writing, software
+ distributed under the License is distributed on an "AS IS" BASIS,
+ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ See the License for the specific language governing permissions and
+ limitations under the License.
+"""
+from unittest import TestCase
+
+from mock import patch
+
+from rapid.lib.http_sessions import HttpSessions
+
+
+class TestHttpSessions(TestCase):
+
+    def setUp(self):
+        HttpSessions.configure(10, 300)
+        HttpSessions.close()
+        HttpSessions._last_sweep = 0
+
+    def tearDown(self):
+        HttpSessions.close()
+
+    def test_sessions_are_reused_per_host(self):
+        session = HttpSessions.get_session('http://127.0.0.1:8081')
+
+        self.assertIs(session, HttpSessions.get_session('http://127.0.0.1:8081'))
+        self.assertIsNot(session, HttpSessions.get_session('https://127.0.0.1:8081'))
+
+    def test_sessions_use_the_configured_pool_size(self):
+        HttpSessions.configure(4, 300)
+
+        adapter = HttpSessions.get_session('http://127.0.0.1:8081').get_adapter('http://127.0.0.1:8081')
+        self.assertEqual(4, adapter._pool_maxsize)
+
+    def test_configure_replaces_existing_sessions(self):
+        session = HttpSessions.get_session('http://127.0.0.1:8081')
+        HttpSessions.configure(4, 300)
+
+        self.assertIsNot(session, HttpSessions.get_session('http://127.0.0.1:8081'))
+
+    @patch('rapid.lib.http_sessions.time')
+    def test_idle_sessions_are_closed(self, time):
+        time.time.return_value = 1000
+        idle = HttpSessions.get_session('http://idle:8081')
+        time.time.return_value = 1200
+        busy = HttpSessions.get_session('http://busy:8081')
+        time.time.return_value = 1400
+
+        self.assertIs(busy, HttpSessions.get_session('http://busy:8081'))
+        self.assertIsNot(idle, HttpSessions.get_session('http://idle:8081'))
+
+    def test_close_single_host(self):
+        session = HttpSessions.get_session('http://127.0.0.1:8081')
+        other = HttpSessions.get_session('http://127.0.0.2:8081')
+        HttpSessions.close('http://127.0.0.1:8081')
+
+        self.assertIsNot(session, HttpSessions.get_session('http://127.0.0.1:8081'))
+        self.assertIs(other, HttpSessions.get_session('http://127.0.0.2:8081'))
@@ -0,0 +1,83 @@
+"""
+ Copyright (c) 2015 Michael Bright and Bamboo HR LLC
+
+ Licensed under the Apache License, Version 2.0 (the "License");
+ you may not use this file except in compliance with the License.
+ You may obtain a copy of the License at
+
+ http://www.apache.org/licenses/LICENSE-2.0
+
+ Unless required by applicable law or agreed to in writing, software
+ distributed under the License is distributed on an "AS IS" BASIS,
+ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ See the License for the specific language governing permissions and
+ limitations under the License.
+"""
+import threading
+from unittest import TestCase
+
+from mock import Mock
+
+from rapid.lib.phase_scheduler import Phase, PhaseScheduler
+
+
+class TestPhaseScheduler(TestCase):
+
+    def test_run_pending_runs_due_phases(self):
+        fast = Phase('fast', Mock(), 1, 10)
+        slow = Phase('slow', Mock(), 100, 10)
+        scheduler = PhaseScheduler([fast, slow], 2)
+
+        scheduler.run_pending(now=1000)
+        fast.future.result()
+        slow.future.result()
+        scheduler.run_pending(now=1050)
+        fast.future.result()
+
+        self.assertEqual(2, fast.target.call_count)
+        self.assertEqual(1, slow.target.call_count)
+
+    def test_slow_phase_does_not_block_other_phases(self):
+        release = threading.Event()
+        slow = Phase('slow', lambda: release.wait(5), 1, 10)
+        fast = Phase('fast', Mock(), 1, 10)
+        scheduler = PhaseScheduler([slow, fast], 2)
+
+        scheduler.run_pending(now=1000)
+        fast.future.result()
+        scheduler.run_pending(now=1005)
+        fast.future.result()
+        release.set()
+
+        self.assertEqual(2, fast.target.call_count)
+        self.assertEqual(1000, slow.last_start)
+
+    def test_phase_running_past_timeout_is_flagged_once(self):
+        release = threading.Event()
+        slow = Phase('slow', lambda: release.wait(5), 1, 10)
+        scheduler = PhaseScheduler([slow], 1)
+
+        scheduler.run_pending(now=1000)
+        scheduler.run_pending(now=1020)
+        release.set()
+        slow.future.result()
+
+        self.assertTrue(slow.timed_out)
+
+    def test_failing_phase_is_run_again(self):
+        phase = Phase('failing', Mock(side_effect=Exception()), 1, 10)
+        scheduler = PhaseScheduler([phase], 1)
+
+        scheduler.run_pending(now=1000)
+        phase.future.result()
+        scheduler.run_pending(now=1002)
+        phase.future.result()
+
+        self.assertEqual(2, phase.target.call_count)
+
+    def test_get_wait_time_is_until_next_phase(self):
+        phase = Phase('phase', Mock(), 0.5, 10)
+        phase.last_start = 1000
+
+        self.assertEqual(0.25, PhaseScheduler([phase], 1).get_wait_time(now=1000.25))
+        self.assertEqual(0, PhaseScheduler([phase], 1).get_wait_time(now=1002))
@@ -0,0 +1,85 @@
+"""
+ Copyright (c) 2015 Michael Bright and Bamboo HR LLC
+
+ Licensed under the Apache License, Version 2.0 (the "License");
+ you may not use this file except in compliance with the License.
+ You may obtain a copy of the License at
+
+ http://www.apache.org/licenses/LICENSE-2.0
+
+ Unless required by applicable law or agreed to in writing, software
+ distributed under the License is distributed on an "AS IS" BASIS,
+ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ See the License for the specific language governing permissions and
+ limitations under the License.
+"""
+import datetime
+from unittest import TestCase
+
+from mock import patch
+
+from rapid.lib.queue_metrics import QueueMetrics
+
+
+class TestQueueMetrics(TestCase):
+
+    def setUp(self):
+        QueueMetrics.reset()
+
+    def tearDown(self):
+        QueueMetrics.reset()
+
+    def test_percentiles(self):
+        self.assertEqual({'count': 0}, QueueMetrics.percentiles([]))
+        self.assertEqual({'count': 100, 'p50': 51, 'p90': 90, 'p99': 99, 'max': 100}, QueueMetrics.percentiles(range(1, 101)))
+
+    def test_phase_durations_are_bounded(self):
+        for duration in range(QueueMetrics.SIZE + 10):
+            QueueMetrics.record_phase('dispatch', duration)
+
+        summary = QueueMetrics.get_summary()['phases']['dispatch']
+        self.assertEqual(QueueMetrics.SIZE, summary['count'])
+        self.assertEqual(QueueMetrics.SIZE + 9, summary['max'])
+
+    def test_ticks_count_work_dispatched_since_the_last_tick(self):
+        QueueMetrics.record_dispatch([None, None])
+        QueueMetrics.record_dispatch([None], leased=True)
+        QueueMetrics.record_tick(5)
+        QueueMetrics.record_tick(3)
+
+        summary = QueueMetrics.get_summary()
+        self.assertEqual([(5, 2), (3, 0)], [(tick['considered'], tick['dispatched']) for tick in summary['queue_depth']])
+        self.assertEqual(2, summary['counts']['dispatched'])
+        self.assertEqual(1, summary['counts']['leased'])
+
+    def test_ready_wait_is_recorded_from_queued_date(self):
+        QueueMetrics.record_dispatch([datetime.datetime.utcnow() - datetime.timedelta(seconds=30), None])
+
+        ready_wait = QueueMetrics.get_summary()['ready_wait']
+        self.assertEqual(1, ready_wait['count'])
+        self.assertAlmostEqual(30, ready_wait['max'], delta=5)
+
+    def test_probes_count_failures(self):
+        QueueMetrics.record_probe()
+        QueueMetrics.record_probe(failed=True)
+
+        counts = QueueMetrics.get_summary()['counts']
+        self.assertEqual((2, 1), (counts['probes'], counts['probe_failures']))
+
+    @patch('rapid.lib.queue_metrics.StoreService')
+    def test_publish_merges_with_other_processes_and_drops_stale_ones(self, store_service):
+        store_service.get_queue_metrics.return_value = {'other:1': {'updated': 9e12}, 'gone:2': {'updated': 0}}
+
+        QueueMetrics.publish()
+
+        published = store_service.save_queue_metrics.call_args[0][0]
+        self.assertEqual({'other:1', QueueMetrics.get_process_name()}, set(published))
+
+    @patch('rapid.lib.queue_metrics.StoreService')
+    def test_publish_is_throttled(self, store_service):
+        store_service.get_queue_metrics.return_value = {}
+
+        QueueMetrics.publish()
+        QueueMetrics.publish()
+
+        self.assertEqual(1, store_service.save_queue_metrics.call_count)
@@ -0,0 +1,54 @@
+"""
+ Copyright (c) 2015 Michael Bright and Bamboo HR LLC
+
+ Licensed under the Apache License, Version 2.0 (the "License");
+ you may not use this file except in compliance with the License.
+ You may obtain a copy of the License at
+
+ http://www.apache.org/licenses/LICENSE-2.0
+
+ Unless required by applicable law or agreed to in writing, software
+ distributed under the License is distributed on an "AS IS" BASIS,
+ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ See the License for the specific language governing permissions and
+ limitations under the License.
+"""
+import threading
+from unittest import TestCase
+
+from mock import patch
+
+from rapid.lib.queue_notifier import QueueNotifier
+
+
+class TestQueueNotifier(TestCase):
+
+    def setUp(self):
+        QueueNotifier._event.clear()
+
+    def test_wait_times_out_without_signal(self):
+        self.assertFalse(QueueNotifier.wait(0.01))
+
+    def test_wait_returns_after_notify(self):
+        QueueNotifier.notify()
+        self.assertTrue(QueueNotifier.wait(5))
+        self.assertFalse(QueueNotifier._event.is_set())
+
+    def test_wait_wakes_up_from_another_thread(self):
+        timer = threading.Timer(0.05, QueueNotifier.notify)
+        timer.start()
+        self.assertTrue(QueueNotifier.wait(5))
+        timer.join()
+
+    @patch('rapid.lib.queue_notifier.StoreService')
+    def test_wait_picks_up_signal_from_another_worker(self, store_service):
+        QueueNotifier._last_signal = '1'
+        store_service.get_queue_signal.return_value = '2'
+
+        self.assertTrue(QueueNotifier.wait(5))
+        self.assertEqual('2', QueueNotifier._last_signal)
+
+    @patch('rapid.lib.queue_notifier.StoreService')
+    def test_notify_sets_shared_signal(self, store_service):
+        QueueNotifier.notify()
+        store_service.set_queue_signal.assert_called_with()
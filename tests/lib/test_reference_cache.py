@@ -0,0 +1,86 @@
+"""
+ Copyright (c) 2015 Michael Bright and Bamboo HR LLC
+
+ Licensed under the Apache License, Version 2.0 (the "License");
+ you may not use this file except in compliance with the License.
+ You may obtain a copy of the License at
+
+ http://www.apache.org/licenses/LICENSE-2.0
+
+ Unless required by applicable law or agreed to in writing, software
+ distributed under the License is distributed on an "AS IS" BASIS,
+ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ See the License for the specific language governing permissions and
+ limitations under the License.
+"""
+from unittest import TestCase
+from unittest.mock import Mock, patch
+
+from rapid.lib.in_memory_store import InMemoryStore
+from rapid.lib.reference_cache import ReferenceCache
+
+
+@patch('rapid.lib.store_service.uwsgi', new_callable=InMemoryStore)
+class TestReferenceCache(TestCase):
+
+    def setUp(self):
+        ReferenceCache.clear()
+
+    def tearDown(self):
+        ReferenceCache.clear()
+
+    def test_get_loads_once(self, uwsgi):
+        loader = Mock(return_value={'id': 1})
+
+        self.assertEqual({'id': 1}, ReferenceCache.get('statuses', 1, loader))
+        self.assertEqual({'id': 1}, ReferenceCache.get('statuses', 1, loader))
+
+        self.assertEqual(1, loader.call_count)
+
+    def test_get_does_not_cache_missing_rows(self, uwsgi):
+        loader = Mock(return_value=None)
+
+        ReferenceCache.get('vcs', 'repo', loader)
+        ReferenceCache.get('vcs', 'repo', loader)
+
+        self.assertEqual(2, loader.call_count)
+
+    def test_invalidate_reloads_the_table(self, uwsgi):
+        ReferenceCache.get('statuses', 1, Mock(return_value={'id': 1}))
+        ReferenceCache.get('vcs', 'repo', Mock(return_value={'id': 2}))
+
+        ReferenceCache.invalidate('statuses')
+
+        self.assertEqual({'id': 3}, ReferenceCache.get('statuses', 1, Mock(return_value={'id': 3})))
+        self.assertEqual({'id': 2}, ReferenceCache.get('vcs', 'repo', Mock(return_value={'id': 4})))
+
+    def test_version_change_from_another_worker_reloads_the_table(self, uwsgi):
+        ReferenceCache.get('statuses', 1, Mock(return_value={'id': 1}))
+
+        uwsgi['_rapidci_reference_statuses'] = 'newer'
+
+        self.assertEqual({'id': 3}, ReferenceCache.get('statuses', 1, Mock(return_value={'id': 3})))
+
+    def test_invalidate_ignores_other_tables(self, uwsgi):
+        ReferenceCache.invalidate('action_instances')
+
+        self.assertNotIn('_rapidci_reference_action_instances', uwsgi)
+
+    def test_get_many_only_loads_what_is_missing(self, uwsgi):
+        ReferenceCache.put('statistics', 'lines', 1)
+        loader = Mock(return_value={'coverage': 2})
+
+        self.assertEqual({'lines': 1, 'coverage': 2}, ReferenceCache.get_many('statistics', ['lines', 'coverage', 'unknown'], loader))
+
+        loader.assert_called_with(['coverage', 'unknown'])
+
+    @patch.dict(ReferenceCache.SIZES, {'qa_tests': 2})
+    def test_sized_tables_drop_the_least_recently_used_entries(self, uwsgi):
+        ReferenceCache.put('qa_tests', 'first', 1)
+        ReferenceCache.put('qa_tests', 'second', 2)
+        ReferenceCache.get('qa_tests', 'first', Mock())
+        ReferenceCache.put('qa_tests', 'third', 3)
+
+        loader = Mock(return_value={})
+        self.assertEqual({'first': 1, 'third': 3}, ReferenceCache.get_many('qa_tests', ['first', 'second', 'third'], loader))
+        loader.assert_called_with(['second'])
@@ -14,11 +14,14 @@
  limitations under the License.
 """
 
+import json
 from unittest.mock import Mock, patch
 
 import jsonpickle
 
+from rapid.lib.in_memory_store import InMemoryStore
 from rapid.lib.store_service import StoreService
+from rapid.master.communicator.client import Client
 from tests.framework.unit_test import UnitTest
 
 
@@ -73,61 +76,99 @@ class TestStoreService(UnitTest):
 
         uwsgi.cache_update.assert_called_with("_rapidci_master_key", jsonpickle.dumps("API_KEY"))
 
-    @patch("rapid.lib.store_service.os")
-    def test_check_pidfile(self, os):
-        os.listdir.return_value = ['rapid-111-1111']
-        self.assertTrue(StoreService.check_for_pidfile(111), "Pidfile should be found")
+    @patch("rapid.lib.store_service.logger")
+    @patch("rapid.lib.store_service.uwsgi")
+    def test_save_client_heartbeat_logs_when_the_cache_is_full(self, uwsgi, logger):
+        uwsgi.cache_update.return_value = None
+
+        self.assertFalse(StoreService.save_client_heartbeat('10.0.0.1', {'executors': []}))
+        self.assertEqual(1, logger.warning.call_count)
+
+    @patch("rapid.lib.store_service.logger")
+    @patch("rapid.lib.store_service.uwsgi")
+    def test_save_client_heartbeat_logs_when_the_cache_raises(self, uwsgi, logger):
+        uwsgi.cache_update.side_effect = Exception("cache full")
 
-    @patch("rapid.lib.store_service.os")
-    def test_check_pidfile(self, os):
-        os.listdir.return_value = ['rapid-11-1111']
-        self.assertTrue(not StoreService.check_for_pidfile(111), "Pidfile should not be found")
+        self.assertFalse(StoreService.save_client_heartbeat('10.0.0.1', {'executors': []}))
+        self.assertEqual(1, logger.warning.call_count)
 
     def test_inmemory_store_for_service(self):
-        StoreService.set_calculating_workflow(12345)
         StoreService.set_completing(12345)
         StoreService.set_updating(12345)
         self.assertTrue(StoreService.is_updating(12345))
-        self.assertTrue(StoreService.is_calculating_workflow(12345))
         self.assertTrue(StoreService.is_completing(12345))
-        StoreService.clear_calculating_workflow(12345)
         StoreService.clear_completing(12345)
-        self.assertFalse(StoreService.is_calculating_workflow(12345))
         self.assertFalse(StoreService.is_completing(12345))
 
-    @patch('rapid.lib.store_service.os')
-    def test_check_for_pid_file(self, os):
-        os.listdir.return_value = ['rapid-12345.txt']
-        self.assertEqual('rapid-12345.txt', StoreService.check_for_pidfile('12345'))
-
-    @patch('rapid.lib.store_service.tempfile')
-    @patch('rapid.lib.store_service.os')
-    def test_get_executors_with_nothing_to_see_returns_empty(self, os, tempfile):
-        os.listdir.return_value = []
-        self.assertEqual([], StoreService.get_executors())
-
-    @patch('rapid.lib.store_service.tempfile')
-    @patch('rapid.lib.store_service.psutil')
-    @patch('rapid.lib.store_service.os')
-    def test_get_executors_returns_what_is_running(self, os, psutil, tempfile):
-        os.listdir.return_value = ['rapid-1-12']
-        psutil.pids.return_value = [12]
-        tempfile.gettempdir.return_value = '/tmp/boo'
-
-        self.assertEqual([{'action_instance_id': '1', 'pid': '12'}], StoreService.get_executors())
-        psutil.pids.assert_called_with()
-
-    @patch('rapid.lib.store_service.tempfile')
-    @patch('rapid.lib.store_service.psutil')
-    @patch('rapid.lib.store_service.os')
-    def test_get_executors_filters_invalid_running_pids(self, os, psutil, tempfile):
-        psutil.pids.return_value = [12345]
-        os.listdir.return_value = ['rapid-1-12']
-        os.path.join.return_value = 'flibertygibet'
-        tempfile.gettempdir.return_value = '/tmp/boo'
-
-        os.kill.side_effect = OSError('foobar')
-
-        self.assertEqual([], StoreService.get_executors())
-        psutil.pids.assert_called_with()
-        os.remove.assert_called_with('flibertygibet')
+    @patch('rapid.lib.store_service.ExecutorRegistry')
+    def test_save_executor_registers_the_pid(self, executor_registry):
+        StoreService.save_executor(Mock(work_request=Mock(action_instance_id=1), pid=12))
+
+        executor_registry.register.assert_called_with(1, 12)
+
+    @patch('rapid.lib.store_service.ExecutorRegistry')
+    def test_clear_executor_unregisters_it(self, executor_registry):
+        StoreService.clear_executor(Mock(work_request=Mock(action_instance_id=1), pid=12))
+
+        executor_registry.unregister.assert_called_with(1)
+
+    @patch("rapid.lib.store_service.uwsgi", new_callable=InMemoryStore)
+    def test_save_client_only_writes_its_own_record(self, uwsgi):
+        StoreService.save_client('10.0.0.1', Client('10.0.0.1', 9090, 'one', False))
+        other_record = uwsgi['_rapidci_client_10.0.0.1']
+
+        StoreService.save_client('10.0.0.2', Client('10.0.0.2', 9090, 'two', False))
+
+        self.assertEqual(other_record, uwsgi['_rapidci_client_10.0.0.1'])
+        self.assertEqual(['10.0.0.1', '10.0.0.2'], json.loads(uwsgi['_rapidci_client_ids']))
+        self.assertEqual(['10.0.0.1', '10.0.0.2'], sorted(StoreService.get_clients(Mock())))
+
+    @patch("rapid.lib.store_service.uwsgi", new_callable=InMemoryStore)
+    def test_get_clients_returns_new_client_objects(self, uwsgi):
+        StoreService.save_client('10.0.0.1', Client('10.0.0.1', 9090, 'one;two', False, api_key='key'))
+
+        client = StoreService.get_clients(Mock())['10.0.0.1']
+        client.sleep = True
+
+        client = StoreService.get_clients(Mock())['10.0.0.1']
+        self.assertIsInstance(client, Client)
+        self.assertEqual(['one', 'two'], client.grains)
+        self.assertEqual('key', client.api_key)
+        self.assertFalse(client.sleep)
+
+    @patch("rapid.lib.store_service.json")
+    @patch("rapid.lib.store_service.uwsgi", new_callable=InMemoryStore)
+    def test_get_clients_only_decodes_changed_records(self, uwsgi, json_module):
+        json_module.dumps.side_effect = json.dumps
+        json_module.loads.side_effect = json.loads
+        StoreService.save_client('10.0.0.1', Client('10.0.0.1', 9090, 'one', False))
+        StoreService.save_client('10.0.0.2', Client('10.0.0.2', 9090, 'two', False))
+        StoreService.get_clients(Mock())
+
+        json_module.loads.reset_mock()
+        StoreService.get_clients(Mock())
+        self.assertEqual(0, json_module.loads.call_count)
+
+        StoreService.save_client('10.0.0.2', Client('10.0.0.2', 9091, 'two', False))
+        json_module.loads.reset_mock()
+        self.assertEqual(9091, StoreService.get_clients(Mock())['10.0.0.2'].port)
+        self.assertEqual(2, json_module.loads.call_count)
+
+    @patch("rapid.lib.store_service.uwsgi", new_callable=InMemoryStore)
+    def test_remove_clients_drops_records_and_ids(self, uwsgi):
+        StoreService.save_client('10.0.0.1', Client('10.0.0.1', 9090, 'one', False))
+        StoreService.save_client('10.0.0.2', Client('10.0.0.2', 9090, 'two', False))
+
+        StoreService.remove_clients(['10.0.0.1'])
+
+        self.assertNotIn('_rapidci_client_10.0.0.1', uwsgi)
+        self.assertEqual(['10.0.0.2'], list(StoreService.get_clients(Mock())))
+
+    @patch("rapid.lib.store_service.uwsgi", new_callable=InMemoryStore)
+    def test_save_clients_replaces_the_registry(self, uwsgi):
+        StoreService.save_client('10.0.0.1', Client('10.0.0.1', 9090, 'one', False))
+
+        StoreService.save_clients({'10.0.0.2': Client('10.0.0.2', 9090, 'two', False)}, Mock())
+
+        self.assertNotIn('_rapidci_client_10.0.0.1', uwsgi)
+        self.assertEqual(['10.0.0.2'], list(StoreService.get_clients(Mock())))
@@ -45,7 +45,7 @@ class TestClientCommunicator(UnitTest):
 
         socket.gethostname.return_value = "bogus"
 
-        test = {"grains": "one;two", "grain_restrict": False, "hostname": 'bogus'}
+        test = {"grains": "one;two", "grain_restrict": False, "hostname": 'bogus', "pull": False}
         self.assertEqual(test, json.loads(ClientCommunicator._get_register_post_data(config)))
 
     @patch("rapid.client.communicator.client_communicator.time")
@@ -63,50 +63,64 @@ class TestClientCommunicator(UnitTest):
         self.assertEqual(test, ClientCommunicator._get_register_headers(config))
 
     @patch('rapid.client.communicator.client_communicator.StoreService')
-    @patch('rapid.client.communicator.client_communicator.requests')
-    def test_default_send_includes_the_master_api_key(self, requests, store_service):
+    @patch('rapid.client.communicator.client_communicator.HttpSessions')
+    def test_default_send_includes_the_master_api_key(self, http_sessions, store_service):
+        session = http_sessions.get_session.return_value
         mock_app = Mock(rapid_config=Mock(verify_certs=False))
         store_service.get_master_key.return_value='bogus_key'
         communicator = ClientCommunicator(None, flask_app=mock_app)
-        requests.put.return_value = Mock(status_code=200)
+        session.put.return_value = Mock(status_code=200)
         communicator._default_send('bogus', None)
 
         store_service.get_master_key.assert_called_with(mock_app)
-        requests.put.assert_called_with('bogus', data=None, json=None, headers={'X-Rapidci-Api-Key': 'bogus_key'}, verify=False)
+        session.put.assert_called_with('bogus', data=None, json=None, headers={'X-Rapidci-Api-Key': 'bogus_key'}, verify=False)
 
     @patch('rapid.client.communicator.client_communicator.StoreService')
-    @patch('rapid.client.communicator.client_communicator.requests')
+    @patch('rapid.client.communicator.client_communicator.HttpSessions')
     @patch('rapid.client.communicator.client_communicator.ClientCommunicator._string_header_values')
-    def test_default_send_stringifies_headers(self, header_values, requests, store_service):
+    def test_default_send_stringifies_headers(self, header_values, http_sessions, store_service):
+        session = http_sessions.get_session.return_value
         communicator = ClientCommunicator(None, flask_app=Mock())
-        requests.put.return_value = Mock(status_code=200)
+        session.put.return_value = Mock(status_code=200)
         communicator._default_send('bogus', None)
 
         header_values.assert_called_with(None)
 
     @patch('rapid.client.communicator.client_communicator.StoreService')
-    @patch('rapid.client.communicator.client_communicator.requests')
-    def test_default_send_defaults_to_put(self, requests, store_service):
+    @patch('rapid.client.communicator.client_communicator.HttpSessions')
+    def test_default_send_defaults_to_put(self, http_sessions, store_service):
+        session = http_sessions.get_session.return_value
         communicator = ClientCommunicator(None, flask_app=Mock())
-        requests.put.return_value = Mock(status_code=200)
+        session.put.return_value = Mock(status_code=200)
         communicator._default_send('bogus', None)
 
-        requests.put.assert_called()
+        session.put.assert_called()
 
     @patch('rapid.client.communicator.client_communicator.StoreService')
-    @patch('rapid.client.communicator.client_communicator.requests')
-    def test_default_send_supports_post(self, requests, store_service):
+    @patch('rapid.client.communicator.client_communicator.HttpSessions')
+    def test_default_send_supports_post(self, http_sessions, store_service):
+        session = http_sessions.get_session.return_value
         communicator = ClientCommunicator(None, flask_app=Mock())
-        requests.post.return_value = Mock(status_code=200)
+        session.post.return_value = Mock(status_code=200)
         communicator._default_send('bogus', None, 'post')
 
-        requests.post.assert_called()
+        session.post.assert_called()
 
     @patch('rapid.client.communicator.client_communicator.StoreService')
-    @patch('rapid.client.communicator.client_communicator.requests')
-    def test_default_send_throws_exception(self, requests, store_service):
+    @patch('rapid.client.communicator.client_communicator.HttpSessions')
+    def test_default_send_accepts_202(self, http_sessions, store_service):
+        session = http_sessions.get_session.return_value
         communicator = ClientCommunicator(None, flask_app=Mock())
-        requests.put.return_value = Mock(status_code=404)
+        session.post.return_value = Mock(status_code=202)
+
+        self.assertEqual(session.post.return_value, communicator._default_send('bogus', None, 'post'))
+
+    @patch('rapid.client.communicator.client_communicator.StoreService')
+    @patch('rapid.client.communicator.client_communicator.HttpSessions')
+    def test_default_send_throws_exception(self, http_sessions, store_service):
+        session = http_sessions.get_session.return_value
+        communicator = ClientCommunicator(None, flask_app=Mock())
+        session.put.return_value = Mock(status_code=404)
         with self.assertRaises(Exception) as exception:
             communicator._default_send('bogus', None)
 
@@ -25,6 +25,7 @@ from mock.mock import patch
 from rapid.lib import version
 from rapid.lib.work_request import WorkRequest
 from rapid.master.communicator.client import Client
+from rapid.master.communicator.master_communicator import MasterCommunicator
 
 
 class TestClientObject(UnitTest):
@@ -96,7 +97,8 @@ class TestClientObject(UnitTest):
              'ip_address': '127.0.0.1',
              'port': 9000,
              'time_elapse': 1.5,
-             'hostname': 'bogus'}, client.__getstate__())
+             'hostname': 'bogus',
+             'pull': False}, client.__getstate__())
 
     def test_get_headers(self):
         client = Client(None, None, None, None, 'trial', False)
@@ -114,11 +116,26 @@ class TestClientObject(UnitTest):
         client = Client("127.0.0.1", '8097', None, False)
         self.assertEqual("http://127.0.0.1:8097/status", client.get_status_uri())
 
-    @patch("rapid.master.communicator.client.requests")
-    def test_send_work(self, requests):
+    @patch("rapid.master.communicator.client.HttpSessions")
+    def test_send_work(self, http_sessions):
         client = Client(None, None, None, False)
         work_request = WorkRequest()
+        session = http_sessions.get_session.return_value
 
         client.send_work(work_request)
-        self.assertEqual(1, requests.post.call_count)
-        requests.post.assert_called_with(client.get_work_uri(), json=work_request.__dict__, headers=client.get_headers(), verify=True, timeout=4)
+        self.assertEqual(1, session.post.call_count)
+        session.post.assert_called_with(client.get_work_uri(), json=work_request.__dict__, headers=client.get_headers(), verify=True, timeout=4)
+
+    @patch("rapid.master.communicator.client.HttpSessions")
+    def test_sessions_are_shared_per_client_address(self, http_sessions):
+        Client("127.0.0.1", '8097', None, False).get_session()
+        Client("127.0.0.1", '443', None, False, is_ssl=True).get_session()
+
+        http_sessions.get_session.assert_any_call("http://127.0.0.1:8097")
+        http_sessions.get_session.assert_any_call("https://127.0.0.1:443")
+
+    def test_pull_clients_are_not_pushed_work(self):
+        push_client = Client("127.0.0.1", '8097', None, False)
+        pull_client = Client("127.0.0.2", '8097', None, False, pull=True)
+
+        self.assertEqual([push_client], MasterCommunicator.filter_clients([push_client, pull_client], None))
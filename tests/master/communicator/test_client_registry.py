@@ -0,0 +1,65 @@
+"""
+ Copyright (c) 2015 Michael Bright and Bamboo HR LLC
+
+ Licensed under the Apache License, Version 2.0 (the "License");
+ you may not use this file except in compliance with the License.
+ You may obtain a copy of the License at
+
+ http://www.apache.org/licenses/LICENSE-2.0
+
+ Unless required by applicable law or agreed to in writing, software
+ distributed under the License is distributed on an "AS IS" BASIS,
+ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ See the License for the specific language governing permissions and
+ limitations under the License.
+"""
+from unittest import TestCase
+
+from mock import patch
+
+from rapid.master.communicator.client import Client
+from rapid.master.communicator.client_registry import ClientRegistry
+
+
+class TestClientRegistry(TestCase):
+
+    @patch('rapid.master.communicator.client_registry.time')
+    @patch('rapid.master.communicator.client_registry.StoreService')
+    def test_is_still_working_on_uses_fresh_heartbeat(self, store_service, mock_time):
+        mock_time.time.return_value = 100
+        store_service.get_client_heartbeat.return_value = {'last_seen': 90, 'current_work': [{'action_instance_id': '12', 'pid': '1'}]}
+
+        self.assertTrue(ClientRegistry.is_still_working_on(12, '1.2.3.4', 45))
+        self.assertFalse(ClientRegistry.is_still_working_on(13, '1.2.3.4', 45))
+
+    @patch('rapid.master.communicator.client_registry.time')
+    @patch('rapid.master.communicator.client_registry.StoreService')
+    def test_is_still_working_on_is_unknown_for_stale_heartbeat(self, store_service, mock_time):
+        mock_time.time.return_value = 100
+        store_service.get_client_heartbeat.return_value = {'last_seen': 10, 'current_work': [{'action_instance_id': '12', 'pid': '1'}]}
+
+        self.assertIsNone(ClientRegistry.is_still_working_on(12, '1.2.3.4', 45))
+
+    @patch('rapid.master.communicator.client_registry.StoreService')
+    def test_is_still_working_on_is_unknown_without_heartbeat(self, store_service):
+        store_service.get_client_heartbeat.return_value = None
+
+        self.assertIsNone(ClientRegistry.is_still_working_on(12, '1.2.3.4', 45))
+
+    @patch('rapid.master.communicator.client_registry.time')
+    @patch('rapid.master.communicator.client_registry.StoreService')
+    def test_record_heartbeat_stamps_last_seen(self, store_service, mock_time):
+        mock_time.time.return_value = 100
+
+        heartbeat = ClientRegistry.record_heartbeat('1.2.3.4', {'current_work': []})
+
+        self.assertEqual({'current_work': [], 'ip_address': '1.2.3.4', 'last_seen': 100}, heartbeat)
+        store_service.save_client_heartbeat.assert_called_with('1.2.3.4', heartbeat)
+
+    def test_get_assigned_client_matches_port(self):
+        client = Client('1.2.3.4', 8081, None, False)
+        clients = {'1.2.3.4': client}
+
+        self.assertEqual(client, ClientRegistry.get_assigned_client(clients, '1.2.3.4:8081'))
+        self.assertIsNone(ClientRegistry.get_assigned_client(clients, '1.2.3.4:9000'))
+        self.assertIsNone(ClientRegistry.get_assigned_client(clients, None))
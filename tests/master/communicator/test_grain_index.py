@@ -0,0 +1,71 @@
+"""
+ Copyright (c) 2015 Michael Bright and Bamboo HR LLC
+
+ Licensed under the Apache License, Version 2.0 (the "License");
+ you may not use this file except in compliance with the License.
+ You may obtain a copy of the License at
+
+ http://www.apache.org/licenses/LICENSE-2.0
+
+ Unless required by applicable law or agreed to in writing, software
+ distributed under the License is distributed on an "AS IS" BASIS,
+ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ See the License for the specific language governing permissions and
+ limitations under the License.
+"""
+from unittest import TestCase
+
+from mock import patch
+
+from rapid.master.communicator.client import Client
+from rapid.master.communicator.grain_index import GrainIndex
+
+
+class TestGrainIndex(TestCase):
+
+    def setUp(self):
+        GrainIndex._current = None
+        self.clients = {'1': Client('1', 9000, None, False),
+                        '2': Client('2', 9000, None, True),
+                        '3': Client('3', 9000, 'one;two;three', False),
+                        '4': Client('4', 9000, 'one;two;three', True),
+                        '5': Client('5', 9000, 'one', True),
+                        '6': Client('6', 9000, '', False)}
+
+    def test_candidates_match_can_handle(self):
+        index = GrainIndex(self.clients)
+
+        for grain in [None, '', 'one', 'one;two', 'two;three;one', 'one;one;one', 'four', 'one;four']:
+            expected = {key for key, client in self.clients.items() if client.can_handle(grain)}
+            self.assertEqual(expected, {client.ip_address for client in index.get_clients(self.clients, grain)}, grain)
+
+    def test_get_clients_skips_sleeping_inactive_and_pull_clients(self):
+        self.clients['1'].sleep = True
+        setattr(self.clients['3'], 'no-longer-active', True)
+        self.clients['6'].pull = True
+        index = GrainIndex(self.clients)
+
+        self.assertEqual([], index.get_clients(self.clients, 'one;two'))
+
+    def test_candidate_keys_are_memoized(self):
+        index = GrainIndex(self.clients)
+
+        self.assertIs(index.get_candidate_keys('one'), index.get_candidate_keys('one'))
+
+    @patch('rapid.master.communicator.grain_index.StoreService')
+    def test_get_index_is_reused_until_clients_change(self, store_service):
+        store_service.get_clients_version.return_value = '1'
+        index = GrainIndex.get_index(self.clients)
+
+        self.assertIs(index, GrainIndex.get_index(self.clients))
+
+        store_service.get_clients_version.return_value = '2'
+        self.assertIsNot(index, GrainIndex.get_index(self.clients))
+
+    @patch('rapid.master.communicator.grain_index.StoreService')
+    def test_get_index_rebuilds_when_clients_are_missing_from_index(self, store_service):
+        store_service.get_clients_version.return_value = '1'
+        index = GrainIndex.get_index(self.clients)
+        self.clients['7'] = Client('7', 9000, 'one', False)
+
+        self.assertIsNot(index, GrainIndex.get_index(self.clients))
@@ -0,0 +1,78 @@
+"""
+ Copyright (c) 2015 Michael Bright and Bamboo HR LLC
+
+ Licensed under the Apache License, Version 2.0 (the "License");
+ you may not use this file except in compliance with the License.
+ You may obtain a copy of the License at
+
+ http://www.apache.org/licenses/LICENSE-2.0
+
+ Unless required by applicable law or agreed to in writing, software
+ distributed under the License is distributed on an "AS IS" BASIS,
+ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ See the License for the specific language governing permissions and
+ limitations under the License.
+"""
+import threading
+from unittest import TestCase
+
+from mock import Mock, patch
+
+from rapid.master.communicator.master_communicator import MasterCommunicator
+
+
+class TestMasterCommunicator(TestCase):
+
+    def test_executor_is_reused_until_workers_change(self):
+        executor = MasterCommunicator.get_executor(4)
+
+        self.assertIs(executor, MasterCommunicator.get_executor(4))
+        self.assertIsNot(executor, MasterCommunicator.get_executor(5))
+
+    @patch.object(MasterCommunicator, 'check_availability')
+    def test_check_clients_availability_keeps_client_order(self, check_availability):
+        clients = [Mock(), Mock(), Mock()]
+        check_availability.side_effect = lambda to_check: to_check[0]
+
+        self.assertEqual(clients, MasterCommunicator.check_clients_availability(clients, False, 2))
+
+    @patch.object(MasterCommunicator, 'check_availability')
+    def test_get_available_clients_skips_unavailable_and_sleeping(self, check_availability):
+        available = Mock(sleep=False)
+        sleeping = Mock(sleep=True)
+        check_availability.side_effect = lambda to_check: to_check[0] if to_check[0] is not None else None
+
+        self.assertEqual([available], MasterCommunicator.get_available_clients([None, sleeping, available], 2, False, 3))
+
+    @patch.object(MasterCommunicator, 'check_availability')
+    def test_get_available_clients_does_not_wait_for_slow_clients(self, check_availability):
+        release = threading.Event()
+        fast = Mock(sleep=False)
+        slow = Mock(sleep=False)
+
+        def _check(to_check):
+            if to_check[0] is slow:
+                release.wait(5)
+            return to_check[0]
+        check_availability.side_effect = _check
+
+        try:
+            self.assertEqual([fast], MasterCommunicator.get_available_clients([slow, fast], 1, False, 2))
+            self.assertFalse(release.is_set())
+        finally:
+            release.set()
+
+    @patch('rapid.master.communicator.master_communicator.as_completed')
+    @patch.object(MasterCommunicator, 'get_executor')
+    def test_get_available_clients_cancels_outstanding_probes(self, get_executor, as_completed):
+        clients = [Mock(sleep=False), Mock(sleep=False), Mock(sleep=False)]
+        futures = [Mock(result=Mock(return_value=client)) for client in clients]
+        get_executor.return_value.submit.side_effect = futures
+        as_completed.side_effect = iter
+
+        self.assertEqual(clients[:2], MasterCommunicator.get_available_clients(clients, 2, False, 3))
+        for future in futures:
+            future.cancel.assert_called_once_with()
+
+    def test_get_available_clients_without_clients(self):
+        self.assertEqual([], MasterCommunicator.get_available_clients([], 3))
@@ -15,6 +15,7 @@
 """
 
 import datetime
+from contextlib import contextmanager
 from unittest.mock import MagicMock, call
 
 from mock.mock import patch, Mock
@@ -22,8 +23,13 @@ from sqlalchemy import Boolean
 
 from rapid.lib.exceptions import InvalidObjectException
 from rapid.lib.constants import StatusConstants
+from rapid.lib.work_request import WorkRequest
+from rapid.master.communicator.client import Client
 from rapid.workflow.action_dal import ActionDal
-from rapid.workflow.data.models import ActionInstance, PipelineParameters, PipelineInstance, ActionInstanceConfig, AppConfiguration
+from rapid.workflow.data.dal.completion_journal_dal import CompletionJournalDal
+from rapid.workflow.data.models import ActionInstance, PipelineParameters, PipelineInstance, ActionInstanceConfig, AppConfiguration, \
+    QueuedActionInstance, StageInstance, WorkflowInstance, PendingCompletion
+from tests.framework.database_test import DatabaseTest
 from tests.framework.unit_test import UnitTest
 
 
@@ -43,7 +49,7 @@ class TestActionDal(UnitTest):
 
         action_dal.get_workable_work_requests()
 
-        self.assertEqual([AppConfiguration, ActionInstance, PipelineParameters, ActionInstanceConfig, ActionInstance, PipelineParameters, ActionInstanceConfig], session.query_args)
+        self.assertEqual([AppConfiguration, ActionInstance, PipelineParameters, ActionInstanceConfig], session.query_args)
 
     @patch('rapid.workflow.action_dal.get_db_session')
     def test_get_workable_work_requests_verify_outerjoin(self, get_db_session):
@@ -78,28 +84,25 @@ class TestActionDal(UnitTest):
 
         action_dal.get_workable_work_requests()
 
-        self.assertEqual(8, len(session.filter_args))
+        self.assertEqual(1, len(session.filter_args))
 
         filter_1 = session.filter_args[0]
-        filter_2 = session.filter_args[1]
-        filter_3 = session.filter_args[2]
-        filter_4 = session.filter_args[3]
-        filter_5 = session.filter_args[4]
-        filter_6 = session.filter_args[5]
-        filter_7 = session.filter_args[6]
-        filter_8 = session.filter_args[7]
 
         self.assertEqual(ActionInstance.__table__.columns['status_id'], filter_1.left)
         self.assertEqual(StatusConstants.READY, filter_1.right.value)
 
-        self.assertEqual(ActionInstance.__table__.columns['manual'], filter_2.left)
-        self.assertEqual(0, filter_2.right.value)
+    @patch('rapid.workflow.action_dal.get_db_session')
+    def test_get_workable_work_requests_verify_queue_join(self, get_db_session):
+        action_dal = ActionDal()
 
-        self.assertEqual(ActionInstance.__table__.columns['pipeline_instance_id'], filter_3.left)
-        self.assertEqual(PipelineInstance.__table__.columns['id'], filter_3.right)
+        session = WrapperHelper()
+        get_db_session.return_value = [session]
 
-        self.assertEqual(PipelineInstance.__table__.columns['status_id'], filter_4.left)
-        self.assertEqual(StatusConstants.INPROGRESS, filter_4.right.value)
+        action_dal.get_workable_work_requests()
+
+        self.assertEqual(QueuedActionInstance, session.join_args[0])
+        self.assertEqual(QueuedActionInstance.__table__.columns['action_instance_id'], session.join_args[1].left)
+        self.assertEqual(ActionInstance.__table__.columns['id'], session.join_args[1].right)
 
     @patch('rapid.workflow.action_dal.get_db_session')
     def test_get_workable_work_requests_verify_order_by(self, get_db_session):
@@ -115,11 +118,161 @@ class TestActionDal(UnitTest):
 
         action_dal.get_workable_work_requests()
 
-        self.assertEqual(PipelineInstance.__table__.columns['priority'], session.order_by_args[0].element)
-        self.assertEqual(PipelineInstance.__table__.columns['created_date'], session.order_by_args[1].element)
-        self.assertEqual(PipelineInstance.__table__.columns['id'], session.order_by_args[2].element)
-        self.assertEqual(ActionInstance.__table__.columns['order'], session.order_by_args[3].element)
-        self.assertEqual(ActionInstance.__table__.columns['slice'], session.order_by_args[4].element)
+        self.assertEqual(QueuedActionInstance.__table__.columns['priority'], session.order_by_args[0].element)
+        self.assertEqual(QueuedActionInstance.__table__.columns['pipeline_created_date'], session.order_by_args[1].element)
+        self.assertEqual(QueuedActionInstance.__table__.columns['pipeline_instance_id'], session.order_by_args[2].element)
+        self.assertEqual(QueuedActionInstance.__table__.columns['order'], session.order_by_args[3].element)
+        self.assertEqual(QueuedActionInstance.__table__.columns['slice'], session.order_by_args[4].element)
+
+    @patch('rapid.workflow.action_dal.ReadyQueueDal')
+    @patch('rapid.workflow.action_dal.get_db_session')
+    def test_claim_action_instance_is_a_conditional_update(self, get_db_session, ready_queue_dal):
+        session = MagicMock()
+        session.execute.return_value = Mock(rowcount=1)
+        get_db_session.return_value = [session]
+
+        self.assertTrue(ActionDal().claim_action_instance(12, '1.2.3.4:8081'))
+
+        update = str(session.execute.call_args[0][0])
+        self.assertIn('action_instances.status_id = :status_id_1', update)
+        self.assertIn('action_instances.assigned_to IS NULL', update)
+        ready_queue_dal.dequeue_dispatched.assert_called_with(session.connection(), [12])
+        session.commit.assert_called_with()
+
+    @patch('rapid.workflow.action_dal.ReadyQueueDal')
+    @patch('rapid.workflow.action_dal.get_db_session')
+    def test_claim_action_instance_fails_when_already_claimed(self, get_db_session, ready_queue_dal):
+        session = MagicMock()
+        session.execute.return_value = Mock(rowcount=0)
+        get_db_session.return_value = [session]
+
+        self.assertFalse(ActionDal().claim_action_instance(12, '1.2.3.4:8081'))
+        ready_queue_dal.dequeue_dispatched.assert_not_called()
+
+    @patch('rapid.workflow.action_dal.QueueNotifier')
+    @patch('rapid.workflow.action_dal.ReadyQueueDal')
+    @patch('rapid.workflow.action_dal.get_db_session')
+    def test_claim_workable_work_requests_only_returns_claimed_work(self, get_db_session, ready_queue_dal, queue_notifier):
+        action_dal = ActionDal()
+
+        session = WrapperHelper()
+        session.commit = Mock()
+        get_db_session.return_value = [session]
+        ready_queue_dal.claim.return_value = 3
+
+        action_dal.claim_workable_work_requests('master:1', 10, 30)
+
+        ready_queue_dal.claim.assert_called_with(session, 'master:1', 10, 30)
+        ready_queue_dal.is_claimed_by.assert_called_with('master:1')
+        self.assertEqual(ready_queue_dal.is_claimed_by.return_value, session.filter_args[1])
+        session.commit.assert_called_with()
+        queue_notifier.notify.assert_not_called()
+
+    @patch('rapid.workflow.action_dal.QueueNotifier')
+    @patch('rapid.workflow.action_dal.get_db_session')
+    def test_reconcile_ready_queue_promotes_stalled_action_instances(self, get_db_session, queue_notifier):
+        ready_queue_dal = Mock()
+        ready_queue_dal.reconcile.return_value = 0
+        action_dal = ActionDal(ready_queue_dal=ready_queue_dal)
+
+        session = WrapperHelper()
+        session.flush = Mock()
+        session.commit = Mock()
+        get_db_session.return_value = [session]
+
+        action_instance = ActionInstance(id=1, status_id=StatusConstants.NEW)
+        session.results.append(action_instance)
+
+        action_dal.reconcile_ready_queue()
+
+        self.assertEqual(StatusConstants.READY, action_instance.status_id)
+        ready_queue_dal.reconcile.assert_called_with(session)
+        session.commit.assert_called_with()
+        queue_notifier.notify.assert_called_with()
+
+    @patch('rapid.workflow.action_dal.QueueNotifier')
+    @patch('rapid.workflow.action_dal.get_db_session')
+    def test_reconcile_ready_queue_does_not_notify_when_nothing_changed(self, get_db_session, queue_notifier):
+        ready_queue_dal = Mock()
+        ready_queue_dal.reconcile.return_value = 0
+        action_dal = ActionDal(ready_queue_dal=ready_queue_dal)
+
+        session = WrapperHelper()
+        session.flush = Mock()
+        session.commit = Mock()
+        get_db_session.return_value = [session]
+
+        action_dal.reconcile_ready_queue()
+
+        queue_notifier.notify.assert_not_called()
+
+    @patch.object(ActionDal, '_get_stuck_workflow_rollups')
+    @patch('rapid.workflow.action_dal.get_db_session')
+    def test_reconcile_pipeline_instances_rolls_up_with_bulk_updates(self, get_db_session, get_stuck_workflow_rollups):
+        session = Mock()
+        get_db_session.return_value = [session]
+        early = datetime.datetime(2020, 1, 1)
+        late = datetime.datetime(2020, 1, 2)
+        get_stuck_workflow_rollups.return_value = [
+            Mock(pipeline_instance_id=1, stage_instance_id=10, stage_status_id=StatusConstants.INPROGRESS, workflow_instance_id=100,
+                 workflow_status_id=StatusConstants.INPROGRESS, workflow_end_date=None, highest_status_id=StatusConstants.FAILED, highest_end_date=late),
+            Mock(pipeline_instance_id=1, stage_instance_id=10, stage_status_id=StatusConstants.INPROGRESS, workflow_instance_id=101,
+                 workflow_status_id=StatusConstants.SUCCESS, workflow_end_date=early, highest_status_id=StatusConstants.SUCCESS, highest_end_date=early)]
+
+        ActionDal().reconcile_pipeline_instances()
+
+        session.bulk_update_mappings.assert_has_calls([
+            call(WorkflowInstance, [{'id': 100, 'status_id': StatusConstants.FAILED, 'end_date': late}]),
+            call(StageInstance, [{'id': 10, 'status_id': StatusConstants.FAILED, 'end_date': late}]),
+            call(PipelineInstance, [{'id': 1, 'status_id': StatusConstants.FAILED, 'end_date': late}])])
+        session.commit.assert_called_with()
+
+    @patch.object(ActionDal, '_get_stuck_workflow_rollups')
+    @patch('rapid.workflow.action_dal.get_db_session')
+    def test_reconcile_pipeline_instances_leaves_pipeline_without_end_date(self, get_db_session, get_stuck_workflow_rollups):
+        session = Mock()
+        get_db_session.return_value = [session]
+        get_stuck_workflow_rollups.return_value = [
+            Mock(pipeline_instance_id=1, stage_instance_id=10, stage_status_id=StatusConstants.INPROGRESS, workflow_instance_id=100,
+                 workflow_status_id=StatusConstants.INPROGRESS, workflow_end_date=None, highest_status_id=StatusConstants.SUCCESS, highest_end_date=None)]
+
+        ActionDal().reconcile_pipeline_instances()
+
+        self.assertEqual([call(WorkflowInstance, [{'id': 100, 'status_id': StatusConstants.SUCCESS, 'end_date': None}]),
+                          call(StageInstance, [{'id': 10, 'status_id': StatusConstants.SUCCESS}])], session.bulk_update_mappings.call_args_list)
+
+    @patch('rapid.workflow.action_dal.get_db_session')
+    def test_lease_work_requests_leases_nothing_to_a_client_that_can_handle_nothing(self, get_db_session):
+        self.assertEqual([], ActionDal().lease_work_requests(Client('1.2.3.4', 8081, None, True), 5, 60))
+
+        get_db_session.assert_not_called()
+
+    @patch('rapid.workflow.action_dal.QueueNotifier')
+    @patch('rapid.workflow.action_dal.StoreService')
+    @patch('rapid.workflow.action_dal.get_db_session')
+    def test_expire_leases_puts_work_back_on_the_queue(self, get_db_session, store_service, queue_notifier):
+        action_instance = ActionInstance(id=1, status_id=StatusConstants.INPROGRESS, assigned_to='1.2.3.4:8081', lease_expiration=datetime.datetime(2020, 1, 1))
+        session = WrapperHelper()
+        session.commit = Mock()
+        session.results.append(action_instance)
+        get_db_session.return_value = [session]
+        store_service.is_completing.return_value = False
+
+        self.assertEqual(1, ActionDal().expire_leases())
+
+        self.assertEqual(StatusConstants.READY, action_instance.status_id)
+        self.assertIsNone(action_instance.assigned_to)
+        self.assertIsNone(action_instance.lease_expiration)
+        queue_notifier.notify.assert_called_with()
+
+    @patch.object(ActionDal, 'edit_object')
+    @patch('rapid.workflow.action_dal.get_db_session')
+    def test_partial_edit_clears_lease_on_status_change(self, get_db_session, edit_object):
+        get_db_session.return_value = [Mock()]
+
+        ActionDal().partial_edit(1, {'status_id': StatusConstants.INPROGRESS})
+
+        self.assertEqual({'status_id': StatusConstants.INPROGRESS, 'lease_expiration': None}, edit_object.call_args[0][3])
 
     @patch('rapid.workflow.action_dal.get_db_session')
     def test_get_workable_work_requests_work_request_validation(self, get_db_session):
@@ -262,22 +415,34 @@ class TestActionDal(UnitTest):
         mock_workflow.complete_an_action.assert_called_with(123455, StatusConstants.CANCELED)
         mock_constants.cancel_worker.assert_called_with(get_action_instance().serialize())
 
+    @patch('rapid.workflow.action_dal.QueueNotifier')
+    @patch('rapid.workflow.action_dal.PipelineLocks')
+    @patch('rapid.workflow.action_dal.InstanceWorkflowEngine')
+    @patch('rapid.workflow.action_dal.get_db_session')
+    def test_reset_pipeline_instance_holds_the_pipeline_lock(self, get_db_session, instance_workflow_engine, pipeline_locks, queue_notifier):
+        session = MagicMock()
+        get_db_session.return_value = [session]
+        instance_workflow_engine.return_value.reset_pipeline.side_effect = lambda: self.assertTrue(pipeline_locks.hold.return_value.__enter__.called)
+
+        self.assertTrue(ActionDal().reset_pipeline_instance(12))
+
+        pipeline_locks.hold.assert_called_with(session, 12)
+        instance_workflow_engine.return_value.reset_pipeline.assert_called_with()
+        pipeline_locks.hold.return_value.__exit__.assert_called_once()
+        session.commit.assert_called_with()
+
     @patch('rapid.workflow.action_dal.get_db_session')
     @patch('rapid.workflow.action_dal.ActionInstance')
-    @patch.object(ActionDal, ActionDal._get_loaded_pipeline_instance.__name__)
     @patch('rapid.workflow.action_dal.InstanceWorkflowEngine')
     def test_reset_action_instance_contract(self, mock_instance_engine,
-                                            mock_loaded_pipeline_instance,
                                             mock_action_instance,
                                             mock_get_session):
         mock_engine = Mock()
         mock_session = Mock()
         mock_get_session.return_value = [mock_session]
         mock_instance = Mock(status_id=StatusConstants.INPROGRESS)
-        mock_pi_instance = Mock(action_instances=[mock_instance])
 
         mock_session.query().get.return_value = mock_instance
-        mock_loaded_pipeline_instance.return_value = mock_pi_instance
         mock_instance_engine.return_value = mock_engine
 
         dal = ActionDal()
@@ -286,41 +451,132 @@ class TestActionDal(UnitTest):
 
         mock_session.query.assert_called_with(mock_action_instance)
         mock_session.commit.assert_called_with()
-        
-        mock_loaded_pipeline_instance.assert_called_with(mock_session, mock_instance)
-        mock_instance_engine.assert_called_with(dal.status_dal, mock_pi_instance)
-
-    @patch('rapid.workflow.action_dal.PipelineInstance')
-    @patch('rapid.workflow.action_dal.StageInstance')
-    @patch('rapid.workflow.action_dal.WorkflowInstance')
-    @patch('rapid.workflow.action_dal.joinedload')
-    def test_get_loaded_pipeline_instance_contract(self, mock_load,
-                                                   mock_workflow,
-                                                   mock_stage,
-                                                   mock_pipeline):
-        mock_session = Mock()
-        mock_action_instance = Mock()
 
-        mock_load_second = Mock()
-        mock_load_second.joinedload().joinedload.return_value = 'foobie'
-        mock_load.side_effect = ['foobar', mock_load_second]
+        mock_instance_engine.assert_called_with(dal.status_dal, mock_instance.pipeline_instance, mock_session)
+        mock_engine.reset_action.assert_called_with(mock_instance, complete_reset=False)
 
-        dal = ActionDal()
+    @patch('rapid.workflow.action_dal.ActionDal.get_action_instance_by_id')
+    @patch('rapid.workflow.action_dal.get_db_session')
+    def test_journal_completion_returns_404_when_not_found(self, get_db_session, get_action_instance):
+        get_db_session.return_value = [Mock()]
+        get_action_instance.return_value = None
+
+        with self.assertRaises(InvalidObjectException) as exception:
+            ActionDal().journal_completion(12345, {})
+
+        self.assertEqual(404, exception.exception.code)
 
-        dal._get_loaded_pipeline_instance(mock_session, mock_action_instance)
+    @patch('rapid.workflow.action_dal.CompletionJournalDal')
+    @patch('rapid.workflow.action_dal.ActionDal.get_action_instance_by_id')
+    @patch('rapid.workflow.action_dal.get_db_session')
+    def test_journal_completion_flags_the_action_instance_as_completing(self, get_db_session, get_action_instance, journal_dal):
+        session = Mock()
+        get_db_session.return_value = [session]
+        store_service = Mock()
 
-        mock_session.query.assert_called_with(mock_pipeline)
+        ActionDal(store_service=store_service).journal_completion(12345, {'status': 'SUCCESS'})
 
-        mock_load_second.joinedload.assert_called_with(mock_stage.workflow_instances)
-        mock_load_second.joinedload().joinedload.assert_called_with(mock_workflow.action_instances)
+        journal_dal.append.assert_called_with(session, get_action_instance.return_value, {'status': 'SUCCESS'})
+        store_service.set_completing.assert_called_with(12345)
+        session.commit.assert_called_with()
 
-        mock_session.query().options.assert_called_with('foobar', 'foobie')
-        mock_session.query().options().get.assert_called_with(mock_action_instance.pipeline_instance_id)
+    @patch('rapid.workflow.action_dal.QueueNotifier')
+    @patch('rapid.workflow.action_dal.ActionDal._apply_completions')
+    @patch('rapid.workflow.action_dal.CompletionJournalDal')
+    @patch('rapid.workflow.action_dal.get_db_session')
+    def test_drain_completions_applies_them_by_pipeline_instance(self, get_db_session, journal_dal, apply_completions, queue_notifier):
+        session = Mock()
+        get_db_session.return_value = [session]
+        first, second, other = PendingCompletion(id=1, pipeline_instance_id=5), PendingCompletion(id=2, pipeline_instance_id=5), PendingCompletion(id=3, pipeline_instance_id=6)
+        journal_dal.claim.return_value = [first, other, second]
+
+        self.assertEqual(3, ActionDal().drain_completions('master:1', 10, 30))
+
+        journal_dal.claim.assert_called_with(session, 'master:1', 10, 30)
+        apply_completions.assert_has_calls([call(session, 5, [first, second]), call(session, 6, [other])])
+        queue_notifier.notify.assert_called_with()
+
+    @patch('rapid.workflow.action_dal.QueueNotifier')
+    @patch('rapid.workflow.action_dal.ActionDal._apply_completions')
+    @patch('rapid.workflow.action_dal.CompletionJournalDal')
+    @patch('rapid.workflow.action_dal.get_db_session')
+    def test_drain_completions_rolls_back_a_failed_pipeline_instance(self, get_db_session, journal_dal, apply_completions, queue_notifier):
+        session = Mock()
+        get_db_session.return_value = [session]
+        journal_dal.claim.return_value = [PendingCompletion(id=1, pipeline_instance_id=5), PendingCompletion(id=2, pipeline_instance_id=6)]
+        apply_completions.side_effect = [Exception("Locked"), None]
+
+        self.assertEqual(1, ActionDal().drain_completions('master:1', 10, 30))
+
+        session.rollback.assert_called_once_with()
+        self.assertEqual(2, apply_completions.call_count)
+
+    @patch('rapid.workflow.action_dal.StatusDal')
+    @patch('rapid.workflow.action_dal.CompletionJournalDal')
+    @patch('rapid.workflow.action_dal.InstanceWorkflowEngine')
+    @patch('rapid.workflow.action_dal.ActionDal._get_final_status')
+    @patch('rapid.workflow.action_dal.ActionDal._save_statistics')
+    def test_apply_completions_completes_the_pipeline_in_one_engine_pass(self, save_statistics, get_final_status, workflow_engine, journal_dal, status_dal):
+        session = Mock()
+        session.query().get.side_effect = lambda _id: Mock(id=_id)
+        get_final_status.return_value = Mock(id=StatusConstants.SUCCESS)
+        workflow_engine.return_value.instances_to_add = []
+        store_service = Mock()
+        event_service = Mock()
+        completions = [PendingCompletion(id=1, action_instance_id=10, attempts=1, statistics_saved=False),
+                       PendingCompletion(id=2, action_instance_id=11, attempts=1, statistics_saved=False)]
+
+        ActionDal(store_service=store_service, event_service=event_service)._apply_completions(session, 5, completions)
+
+        self.assertEqual(1, workflow_engine.call_count)
+        workflow_engine.return_value.complete_an_action.assert_has_calls([call(10, StatusConstants.SUCCESS), call(11, StatusConstants.SUCCESS)])
+        self.assertEqual(2, save_statistics.call_count)
+        journal_dal.remove.assert_called_with(session, completions)
+        self.assertEqual(2, event_service.trigger_possible_event.call_count)
+        store_service.clear_completing.assert_has_calls([call(10), call(11)], any_order=True)
+
+    @patch('rapid.workflow.action_dal.StatusDal')
+    @patch('rapid.workflow.action_dal.CompletionJournalDal')
+    @patch('rapid.workflow.action_dal.InstanceWorkflowEngine')
+    @patch('rapid.workflow.action_dal.ActionDal._get_final_status')
+    @patch('rapid.workflow.action_dal.ActionDal._save_statistics')
+    def test_apply_completions_applies_repeated_completions_once(self, save_statistics, get_final_status, workflow_engine, journal_dal, status_dal):
+        session = Mock()
+        workflow_engine.return_value.instances_to_add = []
+        first = PendingCompletion(id=1, action_instance_id=10, attempts=1, statistics_saved=False)
+        again = PendingCompletion(id=2, action_instance_id=10, attempts=1, statistics_saved=False)
+
+        ActionDal(store_service=Mock(), event_service=Mock())._apply_completions(session, 5, [first, again])
+
+        self.assertEqual(1, save_statistics.call_count)
+        workflow_engine.return_value.complete_an_action.assert_called_once()
+        journal_dal.remove.assert_called_with(session, [first, again])
+
+    @patch('rapid.workflow.action_dal.CompletionJournalDal')
+    @patch('rapid.workflow.action_dal.InstanceWorkflowEngine')
+    @patch('rapid.workflow.action_dal.ActionDal._get_final_status')
+    @patch('rapid.workflow.action_dal.ActionDal._save_statistics')
+    def test_apply_completions_does_not_save_statistics_twice(self, save_statistics, get_final_status, workflow_engine, journal_dal):
+        get_final_status.return_value = None
+        completion = PendingCompletion(id=1, action_instance_id=10, attempts=2, statistics_saved=True)
 
+        ActionDal(store_service=Mock(), event_service=Mock())._apply_completions(Mock(), 5, [completion])
 
+        save_statistics.assert_not_called()
+        workflow_engine.assert_not_called()
 
+    @patch('rapid.workflow.action_dal.CompletionJournalDal')
+    @patch('rapid.workflow.action_dal.ActionDal._save_statistics')
+    def test_apply_completions_drops_completions_tried_too_often(self, save_statistics, journal_dal):
+        session = Mock()
+        store_service = Mock()
+        completion = PendingCompletion(id=1, action_instance_id=10, attempts=ActionDal.COMPLETION_ATTEMPTS + 1, statistics_saved=False)
 
+        ActionDal(store_service=store_service, event_service=Mock())._apply_completions(session, 5, [completion])
 
+        save_statistics.assert_not_called()
+        journal_dal.remove.assert_called_with(session, [completion])
+        store_service.clear_completing.assert_called_with(10)
 
 
 class WrapperHelper(object):
@@ -357,3 +613,108 @@ class WrapperHelper(object):
 
     def get(self, number: int):
         return MagicMock(process_queue=True)
+
+
+class TestActionDalLeases(DatabaseTest):
+
+    def _lease(self, grains, count, grain_restrict=False, ip_address='1.2.3.4'):
+        with patch('rapid.workflow.action_dal.get_db_session', return_value=[self.session]):
+            return ActionDal().lease_work_requests(Client(ip_address, 8081, grains, grain_restrict), count, 60)
+
+    def test_lease_work_requests_leases_the_work_the_client_can_handle_in_queue_order(self):
+        action_instances = self.add_action_instances(self.add_pipeline_instance(), [None, 'linux', 'windows', 'linux://image', 'linux;gpu', 'linux'])
+
+        leased = self._lease('linux;gpu', 10)
+
+        self.assertEqual([action_instances[index].id for index in [0, 1, 4, 5]], [work_request.action_instance_id for work_request in leased])
+        for index in [0, 1, 4, 5]:
+            self.session.refresh(action_instances[index])
+            self.assertEqual((StatusConstants.INPROGRESS, '1.2.3.4:8081'), (action_instances[index].status_id, action_instances[index].assigned_to))
+            self.assertIsNotNone(action_instances[index].lease_expiration)
+        self.assertEqual([action_instances[2].id, action_instances[3].id], [row.action_instance_id for row in self.session.query(QueuedActionInstance).all()])
+
+    def test_lease_work_requests_pages_past_compound_grains_it_can_not_handle(self):
+        action_instances = self.add_action_instances(self.add_pipeline_instance(), ['linux;gpu', 'linux;gpu', 'linux;gpu', 'linux', 'linux'])
+
+        leased = self._lease('linux', 2)
+
+        self.assertEqual([action_instances[3].id, action_instances[4].id], [work_request.action_instance_id for work_request in leased])
+
+    def test_lease_work_requests_honors_grain_restrict(self):
+        action_instances = self.add_action_instances(self.add_pipeline_instance(), [None, 'linux', 'gpu', 'gpu;linux'])
+
+        self.assertEqual([action_instances[2].id], [work_request.action_instance_id for work_request in self._lease('gpu', 5, grain_restrict=True)])
+        self.assertEqual([action_instances[3].id], [work_request.action_instance_id for work_request in self._lease('linux;gpu', 5, grain_restrict=True)])
+
+    def test_lease_work_requests_never_leases_the_same_work_twice(self):
+        action_instances = self.add_action_instances(self.add_pipeline_instance(), [None, None, None])
+
+        first = self._lease(None, 2)
+        second = self._lease(None, 5, ip_address='5.6.7.8')
+
+        self.assertEqual([action_instances[0].id, action_instances[1].id], [work_request.action_instance_id for work_request in first])
+        self.assertEqual([action_instances[2].id], [work_request.action_instance_id for work_request in second])
+        self.assertEqual([], self._lease(None, 5))
+
+
+class TestActionDalClaims(DatabaseTest):
+
+    def _claim(self, claimant, count, claim_time=30):
+        with patch('rapid.workflow.action_dal.get_db_session', return_value=[self.session]):
+            return [work_request.action_instance_id for work_request in ActionDal().claim_workable_work_requests(claimant, count, claim_time)]
+
+    @patch('rapid.workflow.action_dal.QueueNotifier')
+    def test_claim_workable_work_requests_moves_past_work_it_could_not_dispatch(self, queue_notifier):
+        ids = [action_instance.id for action_instance in self.add_action_instances(self.add_pipeline_instance(), [None] * 5)]
+
+        self.assertEqual(ids[:2], self._claim('master:1', 2))
+        self.assertEqual(ids[:4], self._claim('master:1', 2))
+        self.assertEqual(2, queue_notifier.notify.call_count)
+
+        self.assertEqual(ids, self._claim('master:1', 2))
+        self.assertEqual(2, queue_notifier.notify.call_count)
+
+
+class TestActionDalResets(DatabaseTest):
+
+    def test_reset_action_instance_checks_the_status_after_taking_the_lock(self):
+        action_instance = self.add_action_instances(self.add_pipeline_instance(), [None], status_id=StatusConstants.INPROGRESS)[0]
+        self.assertEqual(StatusConstants.INPROGRESS, self.session.query(ActionInstance).get(action_instance.id).status_id)
+
+        @contextmanager
+        def completed_while_waiting(session, pipeline_instance_id):
+            session.execute(ActionInstance.__table__.update().where(ActionInstance.id == action_instance.id).values(status_id=StatusConstants.SUCCESS))
+            yield
+
+        with patch('rapid.workflow.action_dal.get_db_session', return_value=[self.session]), \
+                patch('rapid.workflow.action_dal.PipelineLocks.hold', side_effect=completed_while_waiting), \
+                patch('rapid.workflow.action_dal.InstanceWorkflowEngine') as instance_workflow_engine:
+            self.assertFalse(ActionDal().reset_action_instance(action_instance.id, check_status=True))
+
+        instance_workflow_engine.return_value.reset_action.assert_not_called()
+        self.assertEqual(StatusConstants.SUCCESS, action_instance.status_id)
+
+
+class TestActionDalCompletions(DatabaseTest):
+
+    def _drain(self, claim_time=30):
+        with patch('rapid.workflow.action_dal.get_db_session', return_value=[self.session]), \
+                patch('rapid.workflow.action_dal.QueueNotifier'):
+            return ActionDal().drain_completions('master:1', 10, claim_time)
+
+    def test_a_failed_batch_is_not_claimed_again_before_its_claim_expires(self):
+        action_instance = self.add_action_instances(self.add_pipeline_instance(), [None], status_id=StatusConstants.INPROGRESS)[0]
+        CompletionJournalDal.append(self.session, action_instance, {'status': 'SUCCESS'})
+        self.session.commit()
+
+        with patch.object(ActionDal, '_apply_completions', side_effect=Exception("Lock wait timeout")) as apply_completions:
+            self.assertEqual(0, self._drain())
+            self.assertEqual(0, self._drain())
+            self.assertEqual(1, apply_completions.call_count)
+
+            self.session.execute(PendingCompletion.__table__.update().values(claim_expiration=datetime.datetime.utcnow() - datetime.timedelta(seconds=1)))
+            self.session.commit()
+            self.assertEqual(0, self._drain())
+            self.assertEqual(2, apply_completions.call_count)
+
+        self.assertEqual([2], [completion.attempts for completion in self.session.query(PendingCompletion).populate_existing().all()])
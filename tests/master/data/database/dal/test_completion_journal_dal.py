@@ -0,0 +1,63 @@
+"""
+ Copyright (c) 2015 Michael Bright and Bamboo HR LLC
+
+ Licensed under the Apache License, Version 2.0 (the "License");
+ you may not use this file except in compliance with the License.
+ You may obtain a copy of the License at
+
+ http://www.apache.org/licenses/LICENSE-2.0
+
+ Unless required by applicable law or agreed to in writing, software
+ distributed under the License is distributed on an "AS IS" BASIS,
+ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ See the License for the specific language governing permissions and
+ limitations under the License.
+"""
+import json
+from unittest import TestCase
+
+from mock import Mock
+
+from rapid.workflow.data.dal.completion_journal_dal import CompletionJournalDal
+from rapid.workflow.data.models import ActionInstance
+
+
+class TestCompletionJournalDal(TestCase):
+
+    def test_append_keeps_the_payload_with_its_pipeline_instance(self):
+        session = Mock()
+
+        completion = CompletionJournalDal.append(session, ActionInstance(id=1, pipeline_instance_id=2), {'status': 'SUCCESS'})
+
+        session.add.assert_called_with(completion)
+        self.assertEqual(1, completion.action_instance_id)
+        self.assertEqual(2, completion.pipeline_instance_id)
+        self.assertEqual({'status': 'SUCCESS'}, json.loads(completion.payload))
+        self.assertEqual({'status': 'SUCCESS'}, CompletionJournalDal.get_post_data(completion))
+
+    def test_claim_skips_update_without_candidates(self):
+        session = Mock()
+        session.execute.return_value = []
+
+        self.assertEqual([], CompletionJournalDal.claim(session, 'master:1', 10, 30))
+        self.assertEqual(1, session.execute.call_count)
+
+    def test_claim_only_updates_rows_that_are_still_claimable(self):
+        session = Mock()
+        session.execute.side_effect = [[(1,), (2,)], Mock(rowcount=1)]
+
+        claimed = CompletionJournalDal.claim(session, 'master:1', 10, 30)
+
+        self.assertEqual(session.query().filter().filter().order_by().populate_existing().all(), claimed)
+        update = session.execute.call_args[0][0]
+        self.assertIn('claimed_by IS NULL', str(update))
+        self.assertIn('claim_expiration <', str(update))
+        self.assertNotIn('claimed_by =', str(update))
+        self.assertIn('attempts=(pending_completions.attempts +', str(update))
+
+    def test_remove_skips_nothing_to_remove(self):
+        session = Mock()
+
+        CompletionJournalDal.remove(session, [])
+
+        session.execute.assert_not_called()
@@ -13,8 +13,10 @@
  See the License for the specific language governing permissions and
  limitations under the License.
 """
+from unittest.mock import Mock, patch
 
 from rapid.master.data.database.dal.general_dal import GeneralDal
+from rapid.workflow.data.models import Status
 from tests.framework.unit_test import UnitTest
 
 
@@ -54,6 +56,18 @@ class TestGeneralDal(UnitTest):
 
         self.assertTrue(not hasattr(instance, 'foo'))
 
+    @patch('rapid.master.data.database.dal.general_dal.ReferenceCache')
+    def test_edit_object_invalidates_the_reference_cache(self, reference_cache):
+        GeneralDal().edit_object(Mock(), Status, 1, {'name': 'Passed'})
+
+        reference_cache.invalidate.assert_called_with('statuses')
+
+    @patch('rapid.master.data.database.dal.general_dal.ReferenceCache')
+    def test_delete_object_invalidates_the_reference_cache(self, reference_cache):
+        GeneralDal().delete_object(Mock(), Status, 1)
+
+        reference_cache.invalidate.assert_called_with('statuses')
+
 
 class TestStatus(object):
     type = None
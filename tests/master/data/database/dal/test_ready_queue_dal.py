@@ -0,0 +1,191 @@
+"""
+ Copyright (c) 2015 Michael Bright and Bamboo HR LLC
+
+ Licensed under the Apache License, Version 2.0 (the "License");
+ you may not use this file except in compliance with the License.
+ You may obtain a copy of the License at
+
+ http://www.apache.org/licenses/LICENSE-2.0
+
+ Unless required by applicable law or agreed to in writing, software
+ distributed under the License is distributed on an "AS IS" BASIS,
+ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ See the License for the specific language governing permissions and
+ limitations under the License.
+"""
+from unittest import TestCase
+
+from mock import Mock, patch
+
+from rapid.lib.constants import StatusConstants
+from rapid.workflow.data.dal.ready_queue_dal import ReadyQueueDal
+from rapid.workflow.data.models import ActionInstance, PipelineInstance, QueuedActionInstance
+from tests.framework.database_test import DatabaseTest
+
+
+class TestReadyQueueDal(TestCase):
+
+    def _session(self, new=None, dirty=None, deleted=None):
+        session = Mock()
+        session.new = new or []
+        session.dirty = dirty or []
+        session.deleted = deleted or []
+        return session
+
+    @patch.object(ReadyQueueDal, 'enqueue')
+    @patch.object(ReadyQueueDal, 'dequeue')
+    def test_after_flush_enqueues_new_ready_action_instances(self, dequeue, enqueue):
+        ready = ActionInstance(id=1, status_id=StatusConstants.READY, manual=False)
+        waiting = ActionInstance(id=2, status_id=StatusConstants.NEW, manual=False)
+        session = self._session(new=[ready, waiting])
+
+        ReadyQueueDal.after_flush(session, None)
+
+        enqueue.assert_called_with(session.connection(), [ready])
+        self.assertEqual({1, 2}, set(dequeue.call_args[0][1]))
+
+    @patch.object(ReadyQueueDal, 'enqueue')
+    @patch.object(ReadyQueueDal, 'dequeue')
+    def test_after_flush_does_not_enqueue_manual_action_instances(self, dequeue, enqueue):
+        manual = ActionInstance(id=1, status_id=StatusConstants.READY, manual=True)
+        session = self._session(new=[manual])
+
+        ReadyQueueDal.after_flush(session, None)
+
+        enqueue.assert_called_with(session.connection(), [])
+
+    @patch.object(ReadyQueueDal, '_has_changes')
+    @patch.object(ReadyQueueDal, '_dequeue_pipelines')
+    def test_after_flush_dequeues_finished_pipelines(self, dequeue_pipelines, has_changes):
+        has_changes.return_value = True
+        pipeline_instance = PipelineInstance(id=5, status_id=StatusConstants.SUCCESS)
+        session = self._session(dirty=[pipeline_instance])
+
+        ReadyQueueDal.after_flush(session, None)
+
+        dequeue_pipelines.assert_called_with(session.connection(), {5})
+
+    def test_after_flush_skips_unrelated_flushes(self):
+        session = self._session(new=[PipelineInstance(id=1)])
+
+        ReadyQueueDal.after_flush(session, None)
+
+        session.connection.assert_not_called()
+
+    def test_enqueue_skips_action_instances_of_finished_pipelines(self):
+        connection = Mock()
+        connection.execute.return_value = []
+
+        ReadyQueueDal.enqueue(connection, [ActionInstance(id=1, pipeline_instance_id=2)])
+
+        self.assertEqual(1, connection.execute.call_count)
+
+    def test_claim_skips_update_without_candidates(self):
+        session = Mock()
+        session.execute.return_value = []
+
+        self.assertEqual(0, ReadyQueueDal.claim(session, 'master:1', 10, 30))
+        self.assertEqual(1, session.execute.call_count)
+
+    def test_claim_only_updates_rows_that_are_still_claimable(self):
+        session = Mock()
+        session.execute.side_effect = [[(1,), (2,)], Mock(rowcount=1)]
+
+        self.assertEqual(1, ReadyQueueDal.claim(session, 'master:1', 10, 30))
+
+        update = session.execute.call_args[0][0]
+        self.assertIn('claimed_by IS NULL', str(update))
+        self.assertIn('claim_expiration <', str(update))
+        self.assertNotIn('claimed_by =', str(update))
+
+    def test_supports_skip_locked(self):
+        for name, version, is_mariadb, expected in [('postgresql', (13,), False, True),
+                                                    ('mysql', (8, 0, 21), False, True),
+                                                    ('mysql', (5, 7, 30), False, False),
+                                                    ('mysql', (10, 6, 0), True, False),
+                                                    ('sqlite', (3, 31), False, False)]:
+            session = Mock()
+            session.get_bind().dialect = Mock(server_version_info=version, is_mariadb=is_mariadb)
+            session.get_bind().dialect.name = name
+            self.assertEqual(expected, ReadyQueueDal.supports_skip_locked(session), name)
+
+    @patch.object(ReadyQueueDal, 'dequeue')
+    def test_dequeue_dispatched_returns_queued_dates(self, dequeue):
+        connection = Mock()
+        connection.execute.return_value = [('date',)]
+
+        self.assertEqual(['date'], ReadyQueueDal.dequeue_dispatched(connection, [1]))
+        dequeue.assert_called_with(connection, [1])
+
+
+class TestReadyQueueDalDatabase(DatabaseTest):
+
+    def _claimed_by(self):
+        return dict(self.session.query(QueuedActionInstance.action_instance_id, QueuedActionInstance.claimed_by).all())
+
+    def _claim(self, claimant, count, claim_time=30):
+        claimed = ReadyQueueDal.claim(self.session, claimant, count, claim_time)
+        self.session.commit()
+        return claimed
+
+    def test_after_flush_keeps_the_queue_in_step_with_statuses(self):
+        action_instances = self.add_action_instances(self.add_pipeline_instance(), [None, None, None])
+        self.add_action_instances(self.add_pipeline_instance(), [None], status_id=StatusConstants.NEW)
+
+        action_instances[1].status_id = StatusConstants.INPROGRESS
+        self.session.commit()
+
+        self.assertEqual([action_instances[0].id, action_instances[2].id], sorted(self._claimed_by()))
+
+    def test_claim_follows_dispatch_order(self):
+        older = self.add_action_instances(self.add_pipeline_instance(), [None, None])
+        urgent = self.add_action_instances(self.add_pipeline_instance(priority=5), [None])
+
+        self.assertEqual(2, self._claim('master:1', 2))
+
+        claimed = [_id for (_id, claimed_by) in self._claimed_by().items() if claimed_by == 'master:1']
+        self.assertEqual(sorted([urgent[0].id, older[0].id]), sorted(claimed))
+
+    def test_claim_does_not_renew_its_own_claims(self):
+        ids = [action_instance.id for action_instance in self.add_action_instances(self.add_pipeline_instance(), [None] * 4)]
+        self._claim('master:1', 2)
+        expirations = dict(self.session.query(QueuedActionInstance.action_instance_id, QueuedActionInstance.claim_expiration).all())
+
+        self.assertEqual(2, self._claim('master:1', 2, claim_time=300))
+
+        self.assertEqual({_id: 'master:1' for _id in ids}, self._claimed_by())
+        for action_instance_id, claim_expiration in self.session.query(QueuedActionInstance.action_instance_id, QueuedActionInstance.claim_expiration).all():
+            if action_instance_id in ids[:2]:
+                self.assertEqual(expirations[action_instance_id], claim_expiration)
+        self.assertEqual(0, self._claim('master:1', 2))
+
+    def test_claim_takes_back_expired_claims(self):
+        ids = [action_instance.id for action_instance in self.add_action_instances(self.add_pipeline_instance(), [None] * 3)]
+        self._claim('master:1', 2, claim_time=-1)
+
+        self.assertEqual(2, self._claim('master:2', 2))
+
+        self.assertEqual({ids[0]: 'master:2', ids[1]: 'master:2', ids[2]: None}, self._claimed_by())
+
+    def test_two_claimants_claim_different_rows(self):
+        ids = [action_instance.id for action_instance in self.add_action_instances(self.add_pipeline_instance(), [None] * 5)]
+
+        self.assertEqual(2, self._claim('master:1', 2))
+        self.assertEqual(2, self._claim('master:2', 2))
+        self.assertEqual(1, self._claim('master:1', 0))
+
+        self.assertEqual({ids[0]: 'master:1', ids[1]: 'master:1', ids[2]: 'master:2', ids[3]: 'master:2', ids[4]: 'master:1'}, self._claimed_by())
+
+    def test_reconcile_queues_and_removes_what_changed_outside_the_orm(self):
+        action_instances = self.add_action_instances(self.add_pipeline_instance(), [None, None])
+        table = ActionInstance.__table__
+        self.session.execute(table.update().where(table.c.id == action_instances[0].id).values(status_id=StatusConstants.FAILED))
+        self.session.execute(QueuedActionInstance.__table__.delete().where(QueuedActionInstance.__table__.c.action_instance_id == action_instances[1].id))
+        self.session.execute(table.insert().values(cmd='/bin/sh', executable='run.sh', args='', order=2, status_id=StatusConstants.READY, manual=False,
+                                                   callback_required=False, action_id=1, workflow_instance_id=1,
+                                                   pipeline_instance_id=action_instances[0].pipeline_instance_id))
+
+        self.assertEqual(2, ReadyQueueDal().reconcile(self.session))
+
+        self.assertEqual(2, len(self._claimed_by()))
+        self.assertNotIn(action_instances[0].id, self._claimed_by())
@@ -0,0 +1,38 @@
+"""
+ Copyright (c) 2015 Michael Bright and Bamboo HR LLC
+
+ Licensed under the Apache License, Version 2.0 (the "License");
+ you may not use this file except in compliance with the License.
+ You may obtain a copy of the License at
+
+ http://www.apache.org/licenses/LICENSE-2.0
+
+ Unless required by applicable law or agreed to in writing, software
+ distributed under the License is distributed on an "AS IS" BASIS,
+ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ See the License for the specific language governing permissions and
+ limitations under the License.
+"""
+from mock.mock import MagicMock, patch
+
+from rapid.master import get_housekeeping_phases
+from rapid.master.communicator.client import Client
+from tests.framework.unit_test import UnitTest
+
+
+class TestHousekeeping(UnitTest):
+
+    @patch('rapid.lib.store_service.StoreService')
+    @patch('rapid.master.IOC')
+    def test_verify_phase_expires_clients_that_are_no_longer_active(self, ioc, store_service):
+        active = Client('1.2.3.4', 8081, None, False)
+        inactive = Client('5.6.7.8', 8081, None, False)
+        store_service.get_clients.return_value = {'1.2.3.4': active, '5.6.7.8': inactive}
+        queue = ioc.get_class_instance.return_value
+        queue.verify_still_working.side_effect = lambda clients: setattr(clients['5.6.7.8'], 'no-longer-active', True)
+
+        verify = [phase for phase in get_housekeeping_phases(MagicMock()) if phase.name == 'verify'][0]
+        verify.target()
+
+        queue.verify_still_working.assert_called_with({'1.2.3.4': active, '5.6.7.8': inactive})
+        store_service.remove_clients.assert_called_with(['5.6.7.8'])
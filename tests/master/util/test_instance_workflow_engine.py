@@ -414,6 +414,44 @@ class TestInstanceWorkflowEngine(UnitTest):
         self.assertEqual(StatusConstants.SUCCESS, pipeline_instance.stage_instances[0].workflow_instances[0].action_instances[0].status_id)
         self.assertEqual(StatusConstants.READY, pipeline_instance.stage_instances[0].workflow_instances[0].action_instances[1].status_id)
 
+    def test_complete_an_action_with_session_only_loads_its_workflow(self):
+        pipeline_instance = self._build_pipeline_instance(['1:2', '1:1'])
+        pipeline_instance.status_id = StatusConstants.INPROGRESS
+        session = self._get_session(pipeline_instance)
+
+        workflow_engine = InstanceWorkflowEngine(self._get_mocked_dal(), pipeline_instance, session)
+        workflow_engine.complete_an_action(1, StatusConstants.SUCCESS)
+
+        self.assertEqual(StatusConstants.READY, pipeline_instance.stage_instances[0].workflow_instances[0].action_instances[1].status_id)
+        self.assertEqual({}, workflow_engine.action_mapper)
+        self.assertEqual([ActionInstance, WorkflowInstance], [call[0][0] for call in session.query.call_args_list])
+
+    def test_complete_an_action_with_session_completes_the_stage(self):
+        pipeline_instance = self._build_pipeline_instance(['1:1', '1:1'])
+        pipeline_instance.status_id = StatusConstants.INPROGRESS
+        session = self._get_session(pipeline_instance)
+
+        workflow_engine = InstanceWorkflowEngine(self._get_mocked_dal(), pipeline_instance, session)
+        workflow_engine.complete_an_action(1, StatusConstants.SUCCESS)
+
+        self.assertEqual(StatusConstants.SUCCESS, pipeline_instance.stage_instances[0].status_id)
+        self.assertEqual(StatusConstants.INPROGRESS, pipeline_instance.stage_instances[1].status_id)
+        self.assertEqual({}, workflow_engine.stage_mapper)
+
+    @staticmethod
+    def _get_session(pipeline_instance):
+        instances = {PipelineInstance: {pipeline_instance.id: pipeline_instance}, StageInstance: {}, WorkflowInstance: {}, ActionInstance: {}}
+        for stage_instance in pipeline_instance.stage_instances:
+            instances[StageInstance][stage_instance.id] = stage_instance
+            for workflow_instance in stage_instance.workflow_instances:
+                instances[WorkflowInstance][workflow_instance.id] = workflow_instance
+                for action_instance in workflow_instance.action_instances:
+                    instances[ActionInstance][action_instance.id] = action_instance
+
+        session = Mock()
+        session.query.side_effect = lambda cls: Mock(get=instances[cls].get)
+        return session
+
     @staticmethod
     def _print_pipeline_instance(pipeline_instance):
         print("pipeline: {}, Status: {}, Start Date: {}, End Date:{}".format(pipeline_instance.id, pipeline_instance.status_id, pipeline_instance.start_date, pipeline_instance.end_date))
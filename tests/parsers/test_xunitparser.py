@@ -13,7 +13,10 @@
  See the License for the specific language governing permissions and
  limitations under the License.
 """
+from io import StringIO
+
 from rapid.lib.constants import Constants
+from rapid.client.parsers import parse_stream, load_parsers
 from rapid.client.parsers.xunit_parser import XUnitParser
 from tests.framework.unit_test import UnitTest
 
@@ -94,3 +97,37 @@ class TestXunitParser(UnitTest):
         parser = XUnitParser('/home/trial')
 
         self.assertEqual({'__summary__': {'FAILED': 1, 'SKIPPED': 0, 'SUCCESS': 0, Constants.FAILURES_COUNT: False}, '/testing.php~should default path to an empty string': {'status': 'FAILED', 'stacktrace': 'Assertion failed', 'time': '0.006'}}, parser.parse(['<testsuite name="trial">', '<testcase classname="/home/trial/testing.php" name="/home/trialshould default path to an empty string" time="0.006">', '<failure message="test failure">Assertion failed</failure>', '</testcase>', "</testsuite>"], True))
+
+    def test_parse_stream_matches_parse(self):
+        parser = XUnitParser()
+        identifier, report = self.example.split("\n", 1)
+
+        results = parser.parse_stream(StringIO(identifier + "\n" + report.replace("\n", "")))
+
+        self.assertEqual(parser.parse(self.example.split("\n")), results)
+
+    def test_parse_stream_detects_the_parser(self):
+        load_parsers()
+
+        results = parse_stream(StringIO(self.example))
+
+        self.assertEqual({'FAILED': 2, 'SKIPPED': 1, 'SUCCESS': 1, Constants.FAILURES_COUNT: False}, results['__summary__'])
+
+    def test_nested_suites_namespaces_and_errors(self):
+        parser = XUnitParser()
+
+        results = parser.parse_stream(StringIO('<testsuites xmlns="urn:test"><testsuite><testcase classname="A" name="one" time="1"/>'
+                                               '<testsuite><testcase class="B" name="two"><error message="boom"/><error message="bang">trace</error></testcase></testsuite>'
+                                               '</testsuite><testcase classname="C" name="not in a suite"/></testsuites>'), ignore_type_check=True)
+
+        self.assertEqual({'A~one': {'status': 'SUCCESS', 'time': '1'},
+                          'B~two': {'status': 'FAILED', 'time': '', 'stacktrace': 'Error - boomError - trace'},
+                          '__summary__': {'FAILED': 1, 'SKIPPED': 0, 'SUCCESS': 1, Constants.FAILURES_COUNT: False}}, results)
+
+    def test_failures_only(self):
+        parser = XUnitParser(failures_only=True)
+
+        results = parser.parse(self.example.split("\n"))
+
+        self.assertEqual(['JUnitXmlReporter.constructor~should default path to an empty string', '__summary__',
+                          'tests.api.routing.test_api_routing.TestAPIRouting~test_configure_routing_features_enabled'], sorted(results.keys()))
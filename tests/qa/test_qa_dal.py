@@ -13,6 +13,11 @@ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 See the License for the specific language governing permissions and
 limitations under the License.
 """
+from mock import Mock, patch
+
+from rapid.lib.constants import StatusConstants
+from rapid.qa.data.dals.qa_dal import QaDal
+from rapid.qa.data.models import QaTest
 from rapid.testmapper import PythonFile
 from tests.framework.unit_test import UnitTest
 
@@ -25,3 +30,109 @@ class TestQaDal(UnitTest):
         self.assertEqual("unit", python_file.parse_action("@rapid-unit Test:Test:Testing"))
         self.assertEqual("unit", python_file.parse_action("rapid-unit: Test:Test:Testing"))
         self.assertEqual(None, python_file.parse_action("@@@@rapid-unit12: Test:Test:Testing"))
+
+    @patch('rapid.qa.data.dals.qa_dal.StatusDal')
+    @patch.object(QaDal, '_insert_test_histories')
+    @patch.object(QaDal, '_get_test_ids')
+    def test_save_results_inserts_histories_and_stacktraces_in_bulk(self, get_test_ids, insert_test_histories, status_dal):
+        session = Mock()
+        get_test_ids.return_value = {'passes': 1, 'fails': 2}
+        insert_test_histories.return_value = {2: 20}
+        status_dal.return_value.get_status_by_name.side_effect = lambda name: Mock(id=StatusConstants.FAILED if name == 'FAILED' else StatusConstants.SUCCESS)
+
+        QaDal()._save_results(Mock(id=5, pipeline_instance_id=6), session, {'results': {'passes': {'status': 'SUCCESS', 'time': 3},
+                                                                                      'fails': {'status': 'FAILED', 'stacktrace': 'boom'}}})
+
+        action_instance_id, histories, stacktrace_test_ids = insert_test_histories.call_args[0][1:]
+        self.assertEqual(5, action_instance_id)
+        self.assertEqual([{'test_id': 1, 'pipeline_instance_id': 6, 'action_instance_id': 5, 'status_id': StatusConstants.SUCCESS, 'duration': 3},
+                          {'test_id': 2, 'pipeline_instance_id': 6, 'action_instance_id': 5, 'status_id': StatusConstants.FAILED, 'duration': 0}],
+                         sorted(histories, key=lambda history: history['test_id']))
+        self.assertEqual([2], stacktrace_test_ids)
+        self.assertEqual([{'qa_test_history_id': 20, 'stacktrace': 'boom'}], session.execute.call_args[0][1])
+        session.commit.assert_called_with()
+
+    @patch('rapid.qa.data.dals.qa_dal.ReferenceCache')
+    @patch('rapid.qa.data.dals.qa_dal.StatusDal')
+    @patch.object(QaDal, '_insert_test_histories')
+    @patch.object(QaDal, '_get_test_ids')
+    def test_save_results_caches_new_tests_once_committed(self, get_test_ids, insert_test_histories, status_dal, reference_cache):
+        session = Mock()
+        get_test_ids.side_effect = lambda _session, names, created: created.update({'new': 2}) or {'new': 2}
+        insert_test_histories.return_value = {}
+        session.commit.side_effect = lambda: reference_cache.put.assert_not_called()
+
+        QaDal()._save_results(Mock(id=5, pipeline_instance_id=6), session, {'results': {'new': {'status': 'SUCCESS'}}})
+
+        reference_cache.put.assert_called_once_with('qa_tests', 'new', 2)
+
+    @patch('rapid.qa.data.dals.qa_dal.ReferenceCache')
+    @patch('rapid.qa.data.dals.qa_dal.StatusDal')
+    @patch.object(QaDal, '_insert_test_histories')
+    @patch.object(QaDal, '_get_test_ids')
+    def test_save_results_does_not_cache_new_tests_rolled_back(self, get_test_ids, insert_test_histories, status_dal, reference_cache):
+        session = Mock()
+        get_test_ids.side_effect = lambda _session, names, created: created.update({'new': 2}) or {'new': 2}
+        insert_test_histories.side_effect = Exception("Deadlock")
+
+        QaDal()._save_results(Mock(id=5, pipeline_instance_id=6), session, {'results': {'new': {'status': 'SUCCESS'}}})
+
+        session.commit.assert_not_called()
+        reference_cache.put.assert_not_called()
+
+    def test_insert_test_histories_uses_returning_when_supported(self):
+        session = Mock()
+        session.get_bind().dialect.insert_executemany_returning = True
+        session.execute.return_value = [(20, 2)]
+
+        self.assertEqual({2: 20}, QaDal._insert_test_histories(session, 5, [{'test_id': 2}], [2]))
+        self.assertIn('RETURNING', str(session.execute.call_args[0][0]))
+
+    def test_insert_test_histories_looks_up_the_newest_ids_without_returning(self):
+        session = Mock()
+        session.get_bind().dialect.insert_executemany_returning = False
+        session.query().filter().filter().group_by.return_value = [(2, 20)]
+
+        self.assertEqual({2: 20}, QaDal._insert_test_histories(session, 5, [{'test_id': 2}], [2]))
+        self.assertNotIn('RETURNING', str(session.execute.call_args[0][0]))
+
+    @patch.object(QaDal, 'CHUNK_SIZE', 2)
+    def test_insert_test_histories_looks_up_the_newest_ids_in_chunks(self):
+        session = Mock()
+        session.get_bind().dialect.insert_executemany_returning = False
+        session.query().filter().filter().group_by.side_effect = [[(1, 10), (2, 20)], [(3, 30)]]
+
+        self.assertEqual({1: 10, 2: 20, 3: 30}, QaDal._insert_test_histories(session, 5, [{'test_id': 1}, {'test_id': 2}, {'test_id': 3}], [1, 2, 3]))
+        self.assertEqual(2, session.query().filter().filter().group_by.call_count)
+
+    @patch('rapid.qa.data.dals.qa_dal.ReferenceCache')
+    def test_get_test_ids_inserts_new_tests_at_once(self, reference_cache):
+        session = Mock()
+        reference_cache.get_many.return_value = {'known': 1}
+        session.query().filter.return_value = [(2, 'new', QaTest.hash_name('new')), (3, 'newer', QaTest.hash_name('newer'))]
+
+        created = {}
+
+        self.assertEqual({'known': 1, 'new': 2, 'newer': 3}, QaDal._get_test_ids(session, ['known', 'new', 'newer'], created=created))
+        self.assertEqual([{'name': 'new', 'name_hash': QaTest.hash_name('new'), 'active': True},
+                          {'name': 'newer', 'name_hash': QaTest.hash_name('newer'), 'active': True}],
+                         sorted(session.execute.call_args[0][1], key=lambda row: row['name']))
+        self.assertEqual({'new': 2, 'newer': 3}, created)
+        reference_cache.put.assert_not_called()
+
+    @patch('rapid.qa.data.dals.qa_dal.ReferenceCache')
+    def test_get_test_ids_does_not_create_when_told_not_to(self, reference_cache):
+        session = Mock()
+        reference_cache.get_many.return_value = {}
+
+        self.assertEqual({}, QaDal._get_test_ids(session, ['unknown'], create=False))
+        session.execute.assert_not_called()
+
+    @patch.object(QaDal, 'CHUNK_SIZE', 2)
+    def test_load_test_ids_queries_in_chunks_and_checks_the_names(self):
+        session = Mock()
+        session.query().filter.side_effect = [[(1, 'first', QaTest.hash_name('first')), (9, 'collision', QaTest.hash_name('second'))],
+                                              [(3, 'third', QaTest.hash_name('third'))]]
+
+        self.assertEqual({'first': 1, 'third': 3}, QaDal._load_test_ids(session, ['first', 'second', 'third']))
+        self.assertEqual(2, session.query().filter.call_count)
@@ -14,7 +14,11 @@
  limitations under the License.
 """
 import os
+import pickle
+import sys
 import tempfile
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
 
 from mock.mock import Mock, patch
 
@@ -22,6 +26,7 @@ from rapid.client import load_parsers
 from rapid.client.executor import Executor
 from rapid.lib.communication import Communication
 from rapid.lib.constants import Constants
+from rapid.lib.exceptions import ResultsFileNotFoundException, ResultsFileNotParsedException
 from rapid.lib.work_request import WorkRequest
 from tests.framework.unit_test import UnitTest
 
@@ -160,6 +165,159 @@ class TestExecutor(UnitTest):
             },
             '__summary__': {'FAILED': 1, 'SKIPPED': 1, 'SUCCESS': 1, Constants.FAILURES_COUNT: False}}, executor._get_results('/', [file_name]))
 
+    def _write_results_files(self, directory, count):
+        for index in range(count):
+            with open(os.path.join(directory, 'results-{}.xml'.format(index)), 'w') as results_file:
+                results_file.write('XUnit\n<testsuite><testcase classname="module{0}" name="test" time="{0}"/>'
+                                   '<testcase classname="shared" name="test" time="{0}"><failure>failed in {0}</failure></testcase>'
+                                   '</testsuite>'.format(index))
+
+    def test_get_results_parses_on_the_pool_in_order(self):
+        """
+        rapid-unit: Rapid Client:Can gather test results
+        :return:
+        :rtype:
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            self._write_results_files(directory, 5)
+            serial = Executor(WorkRequest(), None, rapid_config=Mock(results_parse_workers=1, results_parse_python=None, log_to_directory=None))
+            parallel = Executor(WorkRequest(), None, rapid_config=Mock(results_parse_workers=2, results_parse_python=None, log_to_directory=None))
+
+            with patch('rapid.client.executor.os.cpu_count', return_value=4), \
+                    patch.object(Executor, 'get_parse_pool', wraps=Executor.get_parse_pool) as get_parse_pool:
+                results = parallel._get_results(directory, ['results-*.xml'])
+            get_parse_pool.assert_called_with(2, sys.executable)
+
+            self.assertEqual(serial._get_results(directory, ['results-*.xml']), results)
+            self.assertEqual({'status': 'FAILED', 'time': '4', 'stacktrace': 'failed in 4'}, results['shared~test'])
+            self.assertEqual({'FAILED': 5, 'SKIPPED': 0, 'SUCCESS': 5, Constants.FAILURES_COUNT: False}, results['__summary__'])
+
+    def test_get_results_parse_workers_never_outnumber_the_cpus(self):
+        executor = Executor(WorkRequest(), None, rapid_config=Mock(results_parse_workers=8, results_parse_python=None, log_to_directory=None))
+
+        with patch('rapid.client.executor.os.cpu_count', return_value=2):
+            self.assertEqual(2, executor._get_results_parse_workers())
+
+    def test_get_results_raises_when_a_glob_has_no_files(self):
+        """
+        rapid-unit: Rapid Client:Can gather test results
+        :return:
+        :rtype:
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            self._write_results_files(directory, 2)
+            executor = Executor(WorkRequest(), None)
+
+            with self.assertRaises(ResultsFileNotFoundException):
+                executor._get_results(directory, ['results-*.xml', 'missing-*.xml'])
+
+    def test_get_results_raises_when_a_file_does_not_parse_on_the_pool(self):
+        """
+        rapid-unit: Rapid Client:Can gather test results
+        :return:
+        :rtype:
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            self._write_results_files(directory, 2)
+            with open(os.path.join(directory, 'results-bad.xml'), 'w') as results_file:
+                results_file.write('XUnit\n<testsuite><testcase')
+            executor = Executor(WorkRequest(), None, rapid_config=Mock(results_parse_workers=2, results_parse_python=None, log_to_directory=None))
+
+            with patch('rapid.client.executor.os.cpu_count', return_value=4), self.assertRaises(ResultsFileNotParsedException):
+                executor._get_results(directory, ['results-*.xml'])
+
+    def test_parse_jobs_pickle_for_spawned_processes(self):
+        from rapid.client.parsers import FileWrapper, parse_results_file
+        parser = FileWrapper('/workspace', 'XUnit-{}#results-*.xml'.format(Constants.FAILURES)).parser
+
+        function, clone = pickle.loads(pickle.dumps((parse_results_file, parser)))
+
+        self.assertIs(parse_results_file, function)
+        self.assertEqual((type(parser), vars(parser)), (type(clone), vars(clone)))
+        self.assertTrue(clone.failures_only)
+
+    @patch('rapid.client.executor.ProcessPoolExecutor')
+    def test_parse_pool_spawns_its_processes(self, process_pool_executor):
+        with patch.object(Executor, '_parse_pool', None), patch.object(Executor, '_parse_pool_workers', None):
+            self.assertEqual(process_pool_executor.return_value, Executor.get_parse_pool(3))
+
+        self.assertEqual(3, process_pool_executor.call_args[1]['max_workers'])
+        self.assertEqual('spawn', process_pool_executor.call_args[1]['mp_context'].get_start_method())
+
+    @patch('rapid.client.executor.multiprocessing')
+    def test_parse_context_spawns_the_given_python(self, multiprocessing):
+        context = Executor._get_parse_context('/opt/venv/bin/python')
+
+        multiprocessing.get_context.assert_called_with('spawn')
+        context.set_executable.assert_called_with('/opt/venv/bin/python')
+
+    def test_get_results_parse_python_is_configurable(self):
+        executor = Executor(WorkRequest(), None, rapid_config=Mock(results_parse_python='/opt/venv/bin/python', log_to_directory=None))
+
+        with patch('rapid.client.executor.UWSGI', True):
+            self.assertEqual('/opt/venv/bin/python', executor._get_results_parse_python())
+
+    @patch('rapid.client.executor.UWSGI', True)
+    @patch('rapid.client.executor.os.path.exists')
+    def test_get_results_parse_python_under_uwsgi(self, exists):
+        executor = Executor(WorkRequest(), None)
+
+        exists.return_value = True
+        self.assertEqual(os.path.join(sys.exec_prefix, 'bin', 'python'), executor._get_results_parse_python())
+
+        exists.return_value = False
+        self.assertIsNone(executor._get_results_parse_python())
+
+    def test_get_results_parses_in_the_executor_without_a_python_to_spawn(self):
+        """
+        rapid-unit: Rapid Client:Can gather test results
+        :return:
+        :rtype:
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            self._write_results_files(directory, 3)
+            executor = Executor(WorkRequest(), None, rapid_config=Mock(results_parse_workers=2, results_parse_python=None, log_to_directory=None))
+
+            with patch('rapid.client.executor.os.cpu_count', return_value=4), \
+                    patch.object(Executor, '_get_results_parse_python', return_value=None), \
+                    patch.object(Executor, 'get_parse_pool') as get_parse_pool:
+                results = executor._get_results(directory, ['results-*.xml'])
+
+            get_parse_pool.assert_not_called()
+            self.assertEqual({'FAILED': 3, 'SKIPPED': 0, 'SUCCESS': 3, Constants.FAILURES_COUNT: False}, results['__summary__'])
+
+    def test_get_results_parses_the_rest_in_the_executor_when_the_pool_breaks(self):
+        """
+        rapid-unit: Rapid Client:Can gather test results
+        :return:
+        :rtype:
+        """
+        from rapid.client.parsers import parse_results_file
+
+        def submit(_function, results_file, parser):
+            future = Future()
+            if results_file.endswith('results-0.xml'):
+                future.set_result(parse_results_file(results_file, parser))
+            else:
+                future.set_exception(BrokenProcessPool())
+            return future
+
+        with tempfile.TemporaryDirectory() as directory:
+            self._write_results_files(directory, 3)
+            serial = Executor(WorkRequest(), None, rapid_config=Mock(results_parse_workers=1, results_parse_python=None, log_to_directory=None))
+            parallel = Executor(WorkRequest(), None, rapid_config=Mock(results_parse_workers=2, results_parse_python=None, log_to_directory=None))
+            pool = Mock(submit=Mock(side_effect=submit))
+
+            with patch('rapid.client.executor.os.cpu_count', return_value=4), \
+                    patch.object(Executor, 'get_parse_pool', return_value=pool), \
+                    patch.object(Executor, '_discard_parse_pool') as discard_parse_pool, \
+                    patch('rapid.client.parsers.parse_results_file', wraps=parse_results_file) as in_thread:
+                results = parallel._get_results(directory, ['results-*.xml'])
+
+            discard_parse_pool.assert_called_with(pool)
+            self.assertEqual(2, in_thread.call_count)
+            self.assertEqual(serial._get_results(directory, ['results-*.xml']), results)
+
     def test_get_environment(self):
         """
         rapid-unit: Rapid Client:Remote Execution:Can remotely execute code on client
@@ -1,6 +1,9 @@
-from mock.mock import MagicMock, patch
+import json
+
+from mock.mock import MagicMock, patch, call
 
 from rapid.lib.constants import Constants
+from rapid.lib.work_request import WorkRequest
 from tests.framework.unit_test import UnitTest
 from rapid.workflow.api_controller import APIRouter
 
@@ -46,3 +49,85 @@ class TestAPIController(UnitTest):
         mock_args.return_value = {'continuation_token': '123456'}
 
         self.assertEqual('123456', self.controller._get_cursor())
+
+    @patch('rapid.workflow.api_controller.QueueMetrics')
+    def test_get_queue_metrics(self, queue_metrics):
+        queue_metrics.get_metrics.return_value = {'master:1': {'counts': {'dispatched': 3}}}
+
+        response = self.controller.get_queue_metrics()
+
+        self.assertEqual({'master:1': {'counts': {'dispatched': 3}}}, json.loads(response.get_data()))
+
+    @patch('rapid.workflow.api_controller.QueueNotifier')
+    @patch('rapid.workflow.api_controller.StoreService')
+    def test_lease_work_returns_leased_work_requests(self, store_service, queue_notifier):
+        self.controller.app = MagicMock()
+        self.controller.app.rapid_config.lease_time = 60
+        self.controller.app.rapid_config.lease_poll_timeout = 20
+        mock_request = MagicMock(remote_addr='1.2.3.4')
+        mock_request.get_json.return_value = {'port': 8081, 'grains': 'linux', 'grain_restrict': False, 'free_slots': 2}
+        self.controller.http_wrapper.current_request.return_value = mock_request
+        self.controller.action_instance_service.lease_work_requests.return_value = [WorkRequest({'action_instance_id': 5, 'grain': 'linux'})]
+
+        response = self.controller.lease_work()
+
+        client, count, lease_time = self.controller.action_instance_service.lease_work_requests.call_args[0]
+        self.assertEqual('1.2.3.4:8081', client.get_uri())
+        self.assertEqual((2, 60), (count, lease_time))
+        self.assertEqual(5, json.loads(response.get_data())['work_requests'][0]['action_instance_id'])
+        queue_notifier.wait_for_signal.assert_not_called()
+
+    @patch('rapid.workflow.api_controller.time.sleep')
+    @patch('rapid.workflow.api_controller.QueueNotifier')
+    @patch('rapid.workflow.api_controller.StoreService')
+    def test_lease_work_waits_for_signal_until_timeout(self, store_service, queue_notifier, sleep):
+        self.controller.app = MagicMock()
+        self.controller.app.rapid_config.lease_time = 60
+        self.controller.app.rapid_config.lease_poll_timeout = 20
+        mock_request = MagicMock(remote_addr='1.2.3.4')
+        mock_request.get_json.return_value = {'port': 8081, 'free_slots': 1}
+        self.controller.http_wrapper.current_request.return_value = mock_request
+        self.controller.action_instance_service.lease_work_requests.return_value = []
+        queue_notifier.wait_for_signal.side_effect = [True, False]
+
+        response = self.controller.lease_work()
+
+        self.assertEqual(2, self.controller.action_instance_service.lease_work_requests.call_count)
+        self.assertEqual([], json.loads(response.get_data())['work_requests'])
+        self.assertEqual([call(0.25), call(0.5)], sleep.call_args_list)
+
+    def test_renew_work_leases_uses_remote_address(self):
+        self.controller.app = MagicMock()
+        self.controller.app.rapid_config.lease_time = 60
+        mock_request = MagicMock(remote_addr='1.2.3.4')
+        mock_request.get_json.return_value = {'port': 8081, 'action_instance_ids': [1, 2]}
+        self.controller.http_wrapper.current_request.return_value = mock_request
+        self.controller.action_instance_service.renew_leases.return_value = 2
+
+        self.controller.renew_work_leases()
+
+        self.controller.action_instance_service.renew_leases.assert_called_with([1, 2], '1.2.3.4:8081', 60)
+
+    def test_finish_action_instance_accepts_journaled_completions(self):
+        mock_request = MagicMock()
+        mock_request.get_json.return_value = {'status': 'SUCCESS'}
+        self.controller.http_wrapper.current_request.return_value = mock_request
+        self.controller.action_instance_service.journals_completions = True
+
+        response = self.controller.finish_action_instance(12)
+
+        self.assertEqual(202, response.status_code)
+        self.controller.action_instance_service.journal_finished_action_instance.assert_called_with(12, {'status': 'SUCCESS'})
+        self.controller.action_instance_service.finish_action_instance.assert_not_called()
+
+    def test_finish_action_instance_completes_without_the_journal(self):
+        mock_request = MagicMock()
+        mock_request.get_json.return_value = {'status': 'SUCCESS'}
+        self.controller.http_wrapper.current_request.return_value = mock_request
+        self.controller.action_instance_service.journals_completions = False
+        self.controller.action_instance_service.finish_action_instance.return_value = None
+
+        response = self.controller.finish_action_instance(12)
+
+        self.assertEqual(200, response.status_code)
+        self.controller.action_instance_service.finish_action_instance.assert_called_with(12, {'status': 'SUCCESS'})
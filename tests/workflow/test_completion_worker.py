@@ -0,0 +1,47 @@
+"""
+ Copyright (c) 2015 Michael Bright and Bamboo HR LLC
+
+ Licensed under the Apache License, Version 2.0 (the "License");
+ you may not use this file except in compliance with the License.
+ You may obtain a copy of the License at
+
+ http://www.apache.org/licenses/LICENSE-2.0
+
+ Unless required by applicable law or agreed to in writing, software
+ distributed under the License is distributed on an "AS IS" BASIS,
+ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ See the License for the specific language governing permissions and
+ limitations under the License.
+"""
+import time
+from unittest import TestCase
+
+from mock import Mock, patch
+
+from rapid.workflow.completion_worker import CompletionWorker
+
+
+class TestCompletionWorker(TestCase):
+
+    def test_run_once_drains_a_batch(self):
+        drain = Mock(return_value=3)
+        worker = CompletionWorker(drain, 'master:1', 50, 120)
+
+        self.assertEqual(3, worker.run_once())
+        drain.assert_called_with('master:1', 50, 120)
+
+    def test_run_once_survives_a_failed_drain(self):
+        worker = CompletionWorker(Mock(side_effect=Exception("Database went away")), 'master:1', 50, 120)
+
+        self.assertEqual(0, worker.run_once())
+
+    @patch.object(CompletionWorker, 'POLL_TIME', 5)
+    def test_notify_wakes_a_waiting_worker(self):
+        worker = CompletionWorker(Mock(), 'master:1', 50, 120)
+        CompletionWorker.notify()
+
+        start = time.time()
+        worker._wait()
+
+        self.assertLess(time.time() - start, 1)
+        self.assertFalse(CompletionWorker._event.is_set())
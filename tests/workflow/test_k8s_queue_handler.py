@@ -648,6 +648,25 @@ class TestK8SQueueHandler(UnitTest):
         # Call the method
         with self.assertRaises(QueueHandlerShouldSleep):
             self.handler._run_task(mock_work_request, mock_job)
+
+    @patch.object(K8SQueueHandler, K8SQueueHandler._load_k8s_client.__name__)
+    @patch.object(K8SQueueHandler, K8SQueueHandler._job_name.__name__)
+    @patch('rapid.workflow.queue_handlers.handlers.k8s_queue_handler.datetime')
+    def test_run_task_reports_throttling_for_api_exception_429(self, mock_datetime, mock_job_name, mock_load_client):
+        """Test that _run_task tells the queue it is being throttled when ApiException with status 429 occurs."""
+        mock_work_request = Mock(action_instance_id=123, pipeline_instance_id=456, environment=[])
+        mock_job = {'metadata': {'name': 'test-job'}, 'spec': {'template': {'spec': {'containers': [{}]}}}}
+        mock_job_name.return_value = 'test-job-456.123'
+
+        batch_api_mock = Mock()
+        self.handler._batch_api_v1 = batch_api_mock
+
+        from kubernetes.client.rest import ApiException
+        batch_api_mock.create_namespaced_job.side_effect = ApiException(status=429, reason="Too Many Requests")
+
+        with self.assertRaises(QueueHandlerShouldSleep) as context:
+            self.handler._run_task(mock_work_request, mock_job)
+        self.assertTrue(context.exception.throttled)
             
     @patch.object(K8SQueueHandler, K8SQueueHandler._load_k8s_client.__name__)
     @patch.object(K8SQueueHandler, K8SQueueHandler._job_name.__name__)
@@ -0,0 +1,104 @@
+"""
+ Copyright (c) 2015 Michael Bright and Bamboo HR LLC
+
+ Licensed under the Apache License, Version 2.0 (the "License");
+ you may not use this file except in compliance with the License.
+ You may obtain a copy of the License at
+
+ http://www.apache.org/licenses/LICENSE-2.0
+
+ Unless required by applicable law or agreed to in writing, software
+ distributed under the License is distributed on an "AS IS" BASIS,
+ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ See the License for the specific language governing permissions and
+ limitations under the License.
+"""
+import threading
+from unittest import TestCase
+
+from mock import Mock, patch
+
+from rapid.lib.exceptions import PipelineLockTimeout
+from rapid.workflow.pipeline_locks import PipelineLocks
+
+
+def get_session(dialect='sqlite'):
+    session = Mock()
+    session.get_bind().dialect.name = dialect
+    return session
+
+
+class TestPipelineLocks(TestCase):
+
+    def _hold_in_thread(self, pipeline_instance_id, held, release):
+        def run():
+            with PipelineLocks.hold(get_session(), pipeline_instance_id):
+                held.set()
+                release.wait(5)
+        thread = threading.Thread(target=run)
+        thread.start()
+        held.wait(5)
+        return thread
+
+    def test_hold_waits_for_the_same_pipeline_instance(self):
+        held, release = threading.Event(), threading.Event()
+        thread = self._hold_in_thread(1, held, release)
+        entered = threading.Event()
+
+        waiter = threading.Thread(target=lambda: self._enter(1, entered))
+        waiter.start()
+        self.assertFalse(entered.wait(0.1))
+
+        release.set()
+        self.assertTrue(entered.wait(5))
+        thread.join()
+        waiter.join()
+        self.assertEqual({}, PipelineLocks._locks)
+
+    def test_hold_does_not_wait_for_other_pipeline_instances(self):
+        held, release = threading.Event(), threading.Event()
+        thread = self._hold_in_thread(1, held, release)
+        try:
+            entered = threading.Event()
+            self._enter(2, entered)
+            self.assertTrue(entered.is_set())
+        finally:
+            release.set()
+            thread.join()
+
+    @patch('rapid.workflow.pipeline_locks.logger')
+    def test_hold_raises_without_running_after_waiting_too_long(self, logger):
+        held, release = threading.Event(), threading.Event()
+        thread = self._hold_in_thread(1, held, release)
+        try:
+            entered = threading.Event()
+            with self.assertRaises(PipelineLockTimeout):
+                self._enter(1, entered, wait_time=0.05)
+            self.assertFalse(entered.is_set())
+            self.assertEqual(1, logger.warning.call_count)
+        finally:
+            release.set()
+            thread.join()
+        self.assertEqual({}, PipelineLocks._locks)
+
+    def test_hold_locks_the_row_where_supported(self):
+        session = get_session('postgresql')
+
+        with PipelineLocks.hold(session, 1):
+            pass
+
+        session.query().filter().with_for_update().first.assert_called_with()
+        self.assertEqual(1, session.execute.call_count)
+
+    def test_hold_does_not_lock_rows_on_sqlite(self):
+        session = get_session()
+
+        with PipelineLocks.hold(session, 1):
+            pass
+
+        session.query.assert_not_called()
+
+    @staticmethod
+    def _enter(pipeline_instance_id, entered, wait_time=None):
+        with PipelineLocks.hold(get_session(), pipeline_instance_id, wait_time):
+            entered.set()
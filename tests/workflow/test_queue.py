@@ -10,6 +10,13 @@ from rapid.workflow.queue import Queue
 from rapid.workflow.queue_handlers.queue_handler import QueueHandler
 
 
+def get_config(**kwargs):
+    config = {'handler_backoff_time': 2, 'handler_backoff_max_time': 300, 'handler_breaker_threshold': 5,
+              'handler_breaker_time': 120, 'handler_create_rate': 0, 'handler_create_burst': 10}
+    config.update(kwargs)
+    return Mock(**config)
+
+
 class TestQueue(TestCase):
     def test_setup_queue_handlers_fires_correctly(self):
         test_queue = Queue(Mock(), Mock(), Mock(), Mock(queue_handlers=[TestQueueHandler(Mock(), Mock())]), Mock())
@@ -18,8 +25,8 @@ class TestQueue(TestCase):
     def test_process_queue_will_process_appropriately(self):
         mock_queue_service = Mock()
         good_mock = Mock(foo='good')
-        mock_queue_service.get_current_work.return_value = [Mock(foo='bad'), good_mock]
-        queue = Queue(mock_queue_service, Mock(), Mock(), Mock(queue_handlers=[TestQueueHandler(Mock(), Mock())]), Mock())
+        mock_queue_service.claim_current_work.return_value = [Mock(foo='bad'), good_mock]
+        queue = Queue(mock_queue_service, Mock(), get_config(dispatch_batch_size=1), Mock(queue_handlers=[TestQueueHandler(Mock(), Mock())]), Mock())
 
         check = Mock()
         check.side_effect = [False, True]
@@ -37,9 +44,9 @@ class TestQueue(TestCase):
         mock_queue_service = Mock()
         good_mock = Mock(foo='good', action_instance_id='1234')
         bad_mock = Mock(foo='bad')
-        mock_queue_service.get_current_work.return_value = [good_mock, bad_mock]
+        mock_queue_service.claim_current_work.return_value = [good_mock, bad_mock]
         mock_action_service = Mock()
-        queue = Queue(mock_queue_service, mock_action_service, Mock(), Mock(queue_handlers=[TestQueueHandler(Mock(), Mock())]), Mock())
+        queue = Queue(mock_queue_service, mock_action_service, get_config(dispatch_batch_size=1), Mock(queue_handlers=[TestQueueHandler(Mock(), Mock())]), Mock())
 
         check = Mock()
         check.side_effect = [True, False]
@@ -62,7 +69,7 @@ class TestQueue(TestCase):
         mock_queue_service = Mock()
         good_mock = {'foo': 'good'}
         mock_queue_service.get_verify_working.return_value = [{'foo': 'bad'}, good_mock]
-        queue = Queue(mock_queue_service, Mock(), Mock(), Mock(queue_handlers=[TestQueueHandler(Mock(), Mock())]), Mock())
+        queue = Queue(mock_queue_service, Mock(), get_config(dispatch_batch_size=1), Mock(queue_handlers=[TestQueueHandler(Mock(), Mock())]), Mock())
 
         check = Mock()
         check.side_effect = [False, True]
@@ -84,7 +91,7 @@ class TestQueue(TestCase):
         bad_mock = {'foo': 'bad', 'id': 'foo_id'}
         mock_queue_service.get_verify_working.return_value = [good_mock, bad_mock]
         mock_action_service = Mock()
-        queue = Queue(mock_queue_service, mock_action_service, Mock(), Mock(queue_handlers=[TestQueueHandler(Mock(), Mock())]), Mock())
+        queue = Queue(mock_queue_service, mock_action_service, get_config(dispatch_batch_size=1), Mock(queue_handlers=[TestQueueHandler(Mock(), Mock())]), Mock())
 
         check = Mock()
         check.side_effect = [True, False]
@@ -123,14 +130,110 @@ class TestQueue(TestCase):
         mock_handler.can_process_work_request.return_value = True
         mock_handler.process_work_request.side_effect = QueueHandlerShouldSleep
 
+        work_requests = [Mock(grain='a'), Mock(grain='a')]
         mock_queue_service = Mock()
-        mock_queue_service.get_current_work.return_value = [1, 2]
+        mock_queue_service.claim_current_work.return_value = work_requests
 
-        queue = Queue(mock_queue_service, Mock(), Mock(), Mock(queue_handlers=[mock_handler]), Mock())
+        queue = Queue(mock_queue_service, Mock(), get_config(dispatch_batch_size=1), Mock(queue_handlers=[mock_handler]), Mock())
         queue.process_queue([])
 
         self.assertEqual(1, mock_handler.can_process_work_request.call_count)
-        mock_handler.can_process_work_request.assert_called_with(1)
+        mock_handler.can_process_work_request.assert_called_with(work_requests[0])
+
+    def test_queue_handlers_stay_backed_off_across_ticks(self):
+        mock_handler = Mock(grain_type='', can_batch_work_requests=False, is_rate_limited=False)
+        mock_handler.process_work_request.side_effect = QueueHandlerShouldSleep('Capacity unavailable')
+
+        mock_queue_service = Mock()
+        mock_queue_service.claim_current_work.return_value = [Mock(grain='a'), Mock(grain='a')]
+
+        queue = Queue(mock_queue_service, Mock(), get_config(dispatch_batch_size=1), Mock(queue_handlers=[mock_handler]), Mock())
+        queue.process_queue({})
+        queue.process_queue({})
+
+        self.assertEqual(1, mock_handler.process_work_request.call_count)
+
+    def test_queue_handlers_are_rate_limited_across_ticks(self):
+        mock_handler = Mock(grain_type='', can_batch_work_requests=False, is_rate_limited=True)
+
+        mock_queue_service = Mock()
+        mock_queue_service.claim_current_work.return_value = [Mock(grain='a'), Mock(grain='a'), Mock(grain='a')]
+
+        queue = Queue(mock_queue_service, Mock(), get_config(dispatch_batch_size=1, handler_create_rate=0.001, handler_create_burst=2),
+                      Mock(queue_handlers=[mock_handler]), Mock())
+        queue.process_queue({})
+        queue.process_queue({})
+
+        self.assertEqual(2, mock_handler.process_work_request.call_count)
+
+    def test_process_queue_batches_work_requests_per_handler(self):
+        mock_handler = Mock(can_batch_work_requests=True)
+        mock_handler.can_process_work_request.return_value = True
+
+        work_requests = [Mock(grain='a'), Mock(grain='a'), Mock(grain='a')]
+        mock_queue_service = Mock()
+        mock_queue_service.claim_current_work.return_value = work_requests
+
+        queue = Queue(mock_queue_service, Mock(), get_config(dispatch_batch_size=5), Mock(queue_handlers=[mock_handler]), Mock())
+        queue.process_queue({})
+
+        mock_handler.process_work_requests.assert_called_once_with(work_requests, {})
+        mock_handler.process_work_request.assert_not_called()
+
+    def test_process_queue_does_not_batch_for_handlers_that_cannot(self):
+        mock_handler = Mock(can_batch_work_requests=False)
+        mock_handler.can_process_work_request.return_value = True
+
+        mock_queue_service = Mock()
+        mock_queue_service.claim_current_work.return_value = [Mock(grain='a'), Mock(grain='a')]
+
+        queue = Queue(mock_queue_service, Mock(), get_config(dispatch_batch_size=5), Mock(queue_handlers=[mock_handler]), Mock())
+        queue.process_queue({})
+
+        self.assertEqual(2, mock_handler.process_work_request.call_count)
+        mock_handler.process_work_requests.assert_not_called()
+
+    @patch('rapid.workflow.queue.ReadyQueueDal')
+    def test_process_queue_dispatches_claimed_work(self, ready_queue_dal):
+        mock_queue_service = Mock()
+        mock_queue_service.claim_current_work.return_value = []
+        rapid_config = get_config(dispatch_batch_size=1, dispatch_claim_size=10, dispatch_claim_time=30)
+
+        queue = Queue(mock_queue_service, Mock(), rapid_config, Mock(queue_handlers=[]), Mock())
+        queue.process_queue({})
+
+        mock_queue_service.claim_current_work.assert_called_with(ready_queue_dal.get_claimant.return_value, 10, 30)
+
+    def test_process_queue_routes_by_grain_type(self):
+        standard_handler = Mock(grain_type='', can_batch_work_requests=False)
+        ecs_handler = Mock(grain_type='ecs', can_batch_work_requests=False)
+        ecs_work = Mock(grain='ecs://image')
+        standard_work = Mock(grain='linux')
+
+        mock_queue_service = Mock()
+        mock_queue_service.claim_current_work.return_value = [ecs_work, standard_work]
+
+        queue = Queue(mock_queue_service, Mock(), get_config(dispatch_batch_size=1), Mock(queue_handlers=[standard_handler, ecs_handler]), Mock())
+        queue.process_queue({})
+
+        standard_handler.process_work_request.assert_called_once_with(standard_work, {})
+        ecs_handler.process_work_request.assert_called_once_with(ecs_work, {})
+        standard_handler.can_process_work_request.assert_not_called()
+        ecs_handler.can_process_work_request.assert_not_called()
+
+    def test_process_queue_asks_handlers_without_grain_type(self):
+        mock_handler = Mock(grain_type=None, can_batch_work_requests=False)
+        mock_handler.can_process_work_request.return_value = False
+        work_request = Mock(grain='k8s://pod')
+
+        mock_queue_service = Mock()
+        mock_queue_service.claim_current_work.return_value = [work_request]
+
+        queue = Queue(mock_queue_service, Mock(), get_config(dispatch_batch_size=1), Mock(queue_handlers=[mock_handler]), Mock())
+        queue.process_queue({})
+
+        mock_handler.can_process_work_request.assert_called_once_with(work_request)
+        mock_handler.process_work_request.assert_not_called()
 
 
 class TestQueueHandler(QueueHandler, Injectable):
@@ -3,13 +3,14 @@ from unittest.mock import patch
 
 from mock import Mock
 
+from rapid.lib.constants import StatusConstants
 from rapid.workflow.queue_handlers.handlers.standard_queue_handler import StandardQueueHandler
 from rapid.lib.queue_handler_constants import QueueHandlerConstants
 
 
 class TestStandardQueueHandler(TestCase):
     def setUp(self):
-        self.mock_config = Mock()
+        self.mock_config = Mock(dispatch_probe_count=3)
         self.mock_service = Mock()
         self.mock_flask = Mock()
         self.handler = StandardQueueHandler(self.mock_config, self.mock_service, self.mock_flask)
@@ -41,3 +42,121 @@ class TestStandardQueueHandler(TestCase):
         mock_process.assert_called_with(instances[1], [])
         mock_can_process.assert_called_with(instances[1])
 
+
+    def test_can_batch_work_requests(self):
+        self.assertTrue(self.handler.can_batch_work_requests)
+
+    @patch('rapid.workflow.queue_handlers.handlers.standard_queue_handler.GrainIndex')
+    @patch('rapid.workflow.queue_handlers.handlers.standard_queue_handler.MasterCommunicator')
+    def test_process_work_requests_probes_once_per_grain(self, communicator, grain_index):
+        self.mock_config.dispatch_batch_size = 5
+        client = Mock(sleep=False)
+        client.send_work_batch.return_value = Mock(status_code=201, headers={}, json=Mock(return_value={'accepted': [1, 2, 3]}))
+        communicator.get_available_clients.return_value = [client]
+        work_requests = [Mock(grain='a', action_instance_id=1), Mock(grain='a', action_instance_id=2), Mock(grain='a', action_instance_id=3)]
+
+        self.handler.process_work_requests(work_requests, {'client': client})
+
+        self.assertEqual(1, communicator.get_available_clients.call_count)
+        grain_index.get_index.return_value.get_clients.assert_called_once_with({'client': client}, 'a')
+        client.send_work_batch.assert_called_once_with(work_requests, self.mock_config.verify_certs)
+        self.assertEqual(3, self.mock_service.claim_action_instance.call_count)
+        self.mock_service.edit_action_instance.assert_not_called()
+
+    @patch('rapid.workflow.queue_handlers.handlers.standard_queue_handler.GrainIndex')
+    @patch('rapid.workflow.queue_handlers.handlers.standard_queue_handler.MasterCommunicator')
+    def test_process_work_requests_waits_for_enough_clients(self, communicator, grain_index):
+        self.mock_config.dispatch_batch_size = 2
+        communicator.get_available_clients.return_value = []
+        clients_array = grain_index.get_index.return_value.get_clients.return_value = [Mock()]
+
+        self.handler.process_work_requests([Mock(grain='a', action_instance_id=_id) for _id in range(5)], {})
+
+        communicator.get_available_clients.assert_called_once_with(clients_array, 5, self.mock_config.verify_certs, self.mock_config.probe_workers)
+
+    @patch('rapid.workflow.queue_handlers.handlers.standard_queue_handler.GrainIndex')
+    @patch('rapid.workflow.queue_handlers.handlers.standard_queue_handler.MasterCommunicator')
+    def test_process_work_requests_sends_rejected_work_to_next_client(self, communicator, grain_index):
+        self.mock_config.dispatch_batch_size = 5
+        full_client = Mock(sleep=False)
+        full_client.send_work_batch.return_value = Mock(status_code=201, headers={'x-exclude-resource': 'true'}, json=Mock(return_value={'accepted': [1]}))
+        other_client = Mock(sleep=False)
+        other_client.send_work_batch.return_value = Mock(status_code=201, headers={}, json=Mock(return_value={'accepted': [2]}))
+        communicator.get_available_clients.return_value = [full_client, other_client]
+        work_requests = [Mock(grain='a', action_instance_id=1), Mock(grain='a', action_instance_id=2)]
+
+        self.handler.process_work_requests(work_requests, {})
+
+        self.assertTrue(full_client.sleep)
+        other_client.send_work_batch.assert_called_once_with([work_requests[1]], self.mock_config.verify_certs)
+        self.mock_service.edit_action_instance.assert_any_call(2, {'status_id': StatusConstants.READY, 'start_date': None, 'assigned_to': None})
+
+    @patch('rapid.workflow.queue_handlers.handlers.standard_queue_handler.GrainIndex')
+    @patch('rapid.workflow.queue_handlers.handlers.standard_queue_handler.MasterCommunicator')
+    def test_process_work_requests_resets_work_when_send_fails(self, communicator, grain_index):
+        self.mock_config.dispatch_batch_size = 5
+        client = Mock(sleep=False)
+        client.send_work_batch.side_effect = Exception()
+        communicator.get_available_clients.return_value = [client]
+
+        self.handler.process_work_requests([Mock(grain='a', action_instance_id=1)], {})
+
+        self.mock_service.edit_action_instance.assert_called_with(1, {'status_id': StatusConstants.READY, 'start_date': None, 'assigned_to': None})
+
+    @patch('rapid.workflow.queue_handlers.handlers.standard_queue_handler.GrainIndex')
+    @patch('rapid.workflow.queue_handlers.handlers.standard_queue_handler.MasterCommunicator')
+    def test_process_work_requests_does_not_send_work_claimed_elsewhere(self, communicator, grain_index):
+        self.mock_config.dispatch_batch_size = 5
+        client = Mock(sleep=False, ip_address='1.2.3.4', port=8081)
+        client.send_work_batch.return_value = Mock(status_code=201, headers={}, json=Mock(return_value={'accepted': [2]}))
+        communicator.get_available_clients.return_value = [client, Mock(sleep=False)]
+        self.mock_service.claim_action_instance.side_effect = lambda _id, assigned_to: _id == 2
+        work_requests = [Mock(grain='a', action_instance_id=1), Mock(grain='a', action_instance_id=2)]
+
+        self.handler.process_work_requests(work_requests, {})
+
+        client.send_work_batch.assert_called_once_with([work_requests[1]], self.mock_config.verify_certs)
+        self.mock_service.claim_action_instance.assert_any_call(1, '1.2.3.4:8081')
+        self.mock_service.edit_action_instance.assert_not_called()
+
+    @patch('rapid.workflow.queue_handlers.handlers.standard_queue_handler.GrainIndex')
+    @patch('rapid.workflow.queue_handlers.handlers.standard_queue_handler.MasterCommunicator')
+    def test_process_work_request_stops_when_claim_is_lost(self, communicator, grain_index):
+        first = Mock(sleep=False)
+        second = Mock(sleep=False)
+        communicator.get_available_clients.return_value = [first, second]
+        self.mock_service.claim_action_instance.return_value = False
+
+        self.handler.process_work_request(Mock(grain='a', action_instance_id=1), {})
+
+        self.assertEqual(1, self.mock_service.claim_action_instance.call_count)
+        first.send_work.assert_not_called()
+        second.send_work.assert_not_called()
+
+    @patch('rapid.workflow.queue_handlers.handlers.standard_queue_handler.StoreService')
+    @patch('rapid.workflow.queue_handlers.handlers.standard_queue_handler.MasterCommunicator')
+    @patch('rapid.workflow.queue_handlers.handlers.standard_queue_handler.ClientRegistry')
+    def test_process_action_instance_uses_heartbeat_before_probing(self, client_registry, communicator, store_service):
+        client_registry.is_still_working_on.return_value = False
+        store_service.is_completing.return_value = False
+
+        self.handler.process_action_instance({'id': 1, 'assigned_to': '1.2.3.4:8081'}, {'1.2.3.4': Mock()})
+
+        communicator.is_still_working_on.assert_not_called()
+        self.mock_service.reset_action_instance.assert_called_with(1, check_status=True)
+
+    @patch('rapid.workflow.queue_handlers.handlers.standard_queue_handler.MasterCommunicator')
+    @patch('rapid.workflow.queue_handlers.handlers.standard_queue_handler.ClientRegistry')
+    def test_process_action_instance_probes_without_heartbeat(self, client_registry, communicator):
+        client_registry.is_still_working_on.return_value = None
+        communicator.is_still_working_on.return_value = True
+        client = Mock()
+
+        self.handler.process_action_instance({'id': 1, 'assigned_to': '1.2.3.4:8081'}, {'1.2.3.4': client})
+
+        communicator.is_still_working_on.assert_called_with(1, client, self.mock_config.verify_certs)
+        self.mock_service.reset_action_instance.assert_not_called()
+
+    def test_process_action_instance_skips_leased_work(self):
+        self.assertTrue(self.handler.process_action_instance({'id': 1, 'assigned_to': '1.2.3.4:8081', 'lease_expiration': '2020-01-01'}, {}))
+        self.mock_service.reset_action_instance.assert_not_called()